@@ -5,6 +5,32 @@ from typing import Any
 from common import utils
 from common.log_manager import LogManager
 
+# Results of a library scan request. A rejected scan failed for a reason a retry can not fix,
+# the library is missing or the API key is not allowed to scan it
+SCAN_SUCCESS: str = "success"
+SCAN_FAILED: str = "failed"
+SCAN_REJECTED: str = "rejected"
+
+# HTTP status codes returned for a library that is missing or a refused API key
+REJECTED_STATUS_CODES: tuple[int, ...] = (401, 403, 404)
+
+
+def get_request_scan_result(error: Exception) -> str:
+    """
+    Returns the scan result of a failed library scan request.
+
+    Args:
+        error (Exception): The error raised by the request.
+
+    Returns:
+        str: SCAN_REJECTED if the server refused the request, SCAN_FAILED otherwise.
+    """
+    response = getattr(error, "response", None)
+    if response is not None and response.status_code in REJECTED_STATUS_CODES:
+        return SCAN_REJECTED
+    return SCAN_FAILED
+
+
 class ApiBase:
     """
     Base class for API interactions with media servers.
@@ -55,12 +81,34 @@ class ApiBase:
         """
         return self.server_name
 
+    def get_connection_matches(self, url: str, api_key: str) -> bool:
+        """
+        Checks if this API was created for the url and API key.
+
+        Args:
+            url (str): The base URL of the media server.
+            api_key (str): The API key for authenticating with the server.
+
+        Returns:
+            bool: True if the url and API key match, False otherwise.
+        """
+        return self.url == url.rstrip("/") and self.api_key == api_key
+
     def get_name(self) -> str:
         """
         Retrieves the friendly name of the media server. (To be implemented by subclasses)
         """
         return ""
 
+    def get_library_scan_in_progress(self, library_name: str) -> bool:
+        """
+        Checks if the media server is currently scanning the library. (To be implemented by subclasses)
+
+        Args:
+            library_name (str): The name of the library to check.
+        """
+        return False
+
     def get_invalid_type(self) -> Any:
         """
         Get the invalid type for the media servers
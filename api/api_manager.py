@@ -1,10 +1,18 @@
 """ API Manager Module """
 
-from api.plex import PlexAPI
-from api.emby import EmbyAPI
-from api.jellyfin import JellyfinAPI
+from collections.abc import Callable
+from threading import Thread
+from typing import TYPE_CHECKING
+
+from api.api_base import ApiBase
 from common import utils
 from common.log_manager import LogManager
+from common.metrics import Histogram, MetricFamily
+
+if TYPE_CHECKING:
+    from api.emby import EmbyAPI
+    from api.jellyfin import JellyfinAPI
+    from api.plex import PlexAPI
 
 
 class ApiManager:
@@ -18,110 +26,208 @@ class ApiManager:
         log_manager: LogManager
     ):
         """
-        Initializes the ApiManager and establishes connections to configured media servers.
+        Initializes the ApiManager and starts connecting to the configured media servers.
+
+        The connections are checked concurrently in the background so the
+        services can start watching immediately whatever the server state.
         """
-        self.plex_api_list: list[PlexAPI] = []
-        self.emby_api_list: list[EmbyAPI] = []
-        self.jellyfin_api_list: list[JellyfinAPI] = []
+        self.plex_api_list: list[ApiBase] = []
+        self.emby_api_list: list["EmbyAPI"] = []
+        self.jellyfin_api_list: list["JellyfinAPI"] = []
         self.log_manager = log_manager
 
-        # Plex API setup
-        if "plex" in config:
-            for server in config["plex"]:
-                if "server_name" in server and "url" in server and "api_key" in server:
-                    self.plex_api_list.append(
-                        PlexAPI(
-                            server["server_name"], server["url"], server["api_key"], self.log_manager
-                        )
-                    )
-                    if self.plex_api_list[-1].get_valid():
-                        self.log_manager.log_info(
-                            f"Connected to {utils.get_formatted_plex()}({self.plex_api_list[-1].get_server_reported_name()}) successfully"
-                        )
-                    else:
-                        tag_plex_url = utils.get_tag(
-                            "url", server["url"]
-                        )
-                        tag_plex_api = utils.get_tag(
-                            "api_key", server["api_key"]
-                        )
-                        self.log_manager.log_warning(
-                            f"{utils.get_formatted_plex()}({server["server_name"]}) server not available. Is this correct {tag_plex_url} {tag_plex_api}"
-                        )
-                else:
-                    self.log_manager.log_warning(
-                        f"{utils.get_formatted_plex()} configuration error must define name, url and api_key for a server"
-                    )
+        # Notify statistics keyed by server type and server name
+        self.notify_outcome_counts: dict[tuple[str, str, str], int] = {}
+        self.notify_request_histograms: dict[tuple[str, str], Histogram] = {}
+        self.connect_threads: list[Thread] = []
 
-        # Emby API setup
-        if "emby" in config:
-            for server in config["emby"]:
-                if "server_name" in server and "url" in server and "api_key" in server:
-                    self.emby_api_list.append(
-                        EmbyAPI(
-                            server["server_name"], server["url"], server["api_key"], self.log_manager
-                        )
-                    )
-                    if self.emby_api_list[-1].get_valid():
-                        self.log_manager.log_info(
-                            f"Connected to {utils.get_formatted_emby()}({self.emby_api_list[-1].get_server_reported_name()}) successfully"
-                        )
-                    else:
-                        tag_emby_url = utils.get_tag(
-                            "url", server["url"]
-                        )
-                        tag_emby_api = utils.get_tag(
-                            "api_key", server["api_key"]
-                        )
-                        self.log_manager.log_warning(
-                            f"{utils.get_formatted_emby()}({server["server_name"]}) server not available. Is this correct {tag_emby_url} {tag_emby_api}"
-                        )
-                else:
-                    self.log_manager.log_warning(
-                        f"{utils.get_formatted_emby()} configuration error must define name, url and api_key for a server"
-                    )
+        # Connect the configured servers
+        self.reload(config)
 
-        # Jellyfin API setup
-        if "jellyfin" in config:
-            for server in config["jellyfin"]:
+    def __get_api_list(
+        self,
+        config: dict,
+        server_type: str,
+        get_api_class: Callable[[dict], type],
+        formatted_server: str,
+        current_api_list: list
+    ) -> list:
+        """ Get the APIs for the servers of a type reusing the unchanged APIs """
+        api_list = []
+        if server_type in config:
+            for server in config[server_type]:
                 if "server_name" in server and "url" in server and "api_key" in server:
-                    self.jellyfin_api_list.append(
-                        JellyfinAPI(
+                    api_class = get_api_class(server)
+                    api = None
+                    for current_api in current_api_list:
+                        if (
+                            isinstance(current_api, api_class)
+                            and current_api.get_server_name() == server["server_name"]
+                            and current_api.get_connection_matches(server["url"], server["api_key"])
+                        ):
+                            api = current_api
+                            break
+
+                    if api is None:
+                        api = api_class(
                             server["server_name"], server["url"], server["api_key"], self.log_manager
                         )
-                    )
-                    if self.jellyfin_api_list[-1].get_valid():
-                        self.log_manager.log_info(
-                            f"Connected to {utils.get_formatted_jellyfin()}({self.jellyfin_api_list[-1].get_server_reported_name()}) successfully"
-                        )
-                    else:
-                        tag_jellyfin_url = utils.get_tag(
-                            "url", server["url"]
-                        )
-                        tag_jellyfin_api = utils.get_tag(
-                            "api_key", server["api_key"]
-                        )
-                        self.log_manager.log_warning(
-                            f"{utils.get_formatted_jellyfin()}({server["server_name"]}) server not available. Is this correct {tag_jellyfin_url} {tag_jellyfin_api}"
+                        # Connect in the background so one unavailable server does not hold up the others or startup
+                        thread = Thread(
+                            target=self.__check_connection,
+                            args=(api, formatted_server, server["url"], server["api_key"]),
+                            daemon=True
                         )
+                        thread.start()
+                        # Finished checks are dropped so repeated reloads do not keep every thread
+                        self.connect_threads = [
+                            connect_thread for connect_thread in self.connect_threads if connect_thread.is_alive()
+                        ]
+                        self.connect_threads.append(thread)
+                    api_list.append(api)
                 else:
                     self.log_manager.log_warning(
-                        f"{utils.get_formatted_jellyfin()} configuration error must define name, url and api_key for a server"
+                        f"{formatted_server} configuration error must define name, url and api_key for a server"
                     )
+        return api_list
+
+    def __get_plex_api_class(self, server: dict) -> type:
+        """ Get the Plex API class of a server importing only the client it uses """
+        if "direct" in server and server["direct"] == "True":
+            from api.plex_direct import PlexDirectAPI  # pylint: disable=import-outside-toplevel
+            return PlexDirectAPI
+        from api.plex import PlexAPI  # pylint: disable=import-outside-toplevel
+        return PlexAPI
+
+    def __get_emby_api_class(self, _server: dict) -> type:
+        """ Get the Emby API class importing it only when an Emby server is configured """
+        from api.emby import EmbyAPI  # pylint: disable=import-outside-toplevel
+        return EmbyAPI
+
+    def __get_jellyfin_api_class(self, _server: dict) -> type:
+        """ Get the Jellyfin API class importing it only when a Jellyfin server is configured """
+        from api.jellyfin import JellyfinAPI  # pylint: disable=import-outside-toplevel
+        return JellyfinAPI
+
+    def __check_connection(self, api, formatted_server: str, url: str, api_key: str):
+        """ Check the connection to a new server and log the result """
+        if api.get_valid():
+            self.log_manager.log_info(
+                f"Connected to {formatted_server}({api.get_server_reported_name()}) successfully"
+            )
+        else:
+            tag_url = utils.get_tag(
+                "url", url
+            )
+            tag_api = utils.get_tag(
+                "api_key", api_key
+            )
+            self.log_manager.log_warning(
+                f"{formatted_server}({api.get_server_name()}) server not available. Is this correct {tag_url} {tag_api}"
+            )
+
+    def wait_for_connections(self, timeout: float = None):
+        """
+        Waits for the background connection checks to finish.
+
+        Args:
+            timeout (float): Seconds to wait for each check. Waits until finished if None.
+        """
+        for thread in list(self.connect_threads):
+            thread.join(timeout)
+        self.connect_threads = [thread for thread in self.connect_threads if thread.is_alive()]
+
+    def reload(self, config: dict):
+        """
+        Reloads the media server configuration.
+
+        Servers whose name, url and API key are unchanged keep their existing
+        connection. New or changed servers are connected and servers no longer
+        configured are dropped.
+
+        Args:
+            config (dict): The new configuration.
+        """
+        self.plex_api_list = self.__get_api_list(
+            config, "plex", self.__get_plex_api_class, utils.get_formatted_plex(), self.plex_api_list
+        )
+        self.emby_api_list = self.__get_api_list(
+            config, "emby", self.__get_emby_api_class, utils.get_formatted_emby(), self.emby_api_list
+        )
+        self.jellyfin_api_list = self.__get_api_list(
+            config, "jellyfin", self.__get_jellyfin_api_class, utils.get_formatted_jellyfin(), self.jellyfin_api_list
+        )
+
+    def record_notify(
+        self,
+        server_type: str,
+        server_name: str,
+        outcome: str,
+        seconds: float
+    ):
+        """
+        Records the outcome and duration of a library scan notify.
+
+        Args:
+            server_type (str): The media server type plex, emby or jellyfin.
+            server_name (str): The configured name of the server.
+            outcome (str): The notify outcome.
+            seconds (float): How long the notify requests took.
+        """
+        outcome_key = (server_type, server_name, outcome)
+        self.notify_outcome_counts[outcome_key] = self.notify_outcome_counts.get(
+            outcome_key, 0) + 1
+
+        histogram_key = (server_type, server_name)
+        histogram = self.notify_request_histograms.get(histogram_key)
+        if histogram is None:
+            histogram = Histogram()
+            self.notify_request_histograms[histogram_key] = histogram
+        histogram.observe(seconds)
+
+    def collect_metrics(self) -> list[MetricFamily]:
+        """
+        Returns the notify metrics for every media server.
+
+        Returns:
+            list[MetricFamily]: The media server metrics.
+        """
+        outcomes = MetricFamily(
+            "remotescan_notify_total",
+            "counter",
+            "Library scan notifies by media server and outcome"
+        )
+        for (server_type, server_name, outcome), count in list(self.notify_outcome_counts.items()):
+            outcomes.add_sample(
+                {"server_type": server_type, "server": server_name, "outcome": outcome},
+                count
+            )
+
+        request_seconds = MetricFamily(
+            "remotescan_notify_request_seconds",
+            "histogram",
+            "Duration of the media server requests for a library scan notify"
+        )
+        for (server_type, server_name), histogram in list(self.notify_request_histograms.items()):
+            request_seconds.add_histogram(
+                {"server_type": server_type, "server": server_name},
+                histogram
+            )
+        return [outcomes, request_seconds]
 
-    def get_plex_api(self, name: str) -> PlexAPI:
+    def get_plex_api(self, name: str) -> "PlexAPI":
         """
-        Returns the PlexAPI instance with the given name.
+        Returns the Plex API instance with the given name.
 
         Returns:
-            PlexAPI: The PlexAPI instance, or None if not configured.
+            PlexAPI: The PlexAPI or PlexDirectAPI instance, or None if not configured.
         """
         for plex_api in self.plex_api_list:
             if plex_api.get_server_name() == name:
                 return plex_api
         return None
 
-    def get_emby_api(self, name: str) -> EmbyAPI:
+    def get_emby_api(self, name: str) -> "EmbyAPI":
         """
         Returns the EmbyAPI instance with the given name.
 
@@ -133,7 +239,7 @@ class ApiManager:
                 return emby_api
         return None
 
-    def get_jellyfin_api(self, name: str) -> JellyfinAPI:
+    def get_jellyfin_api(self, name: str) -> "JellyfinAPI":
         """
         Returns the JellyfinAPI instance with the given name.
         Returns:
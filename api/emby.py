@@ -3,7 +3,8 @@
 import requests
 from requests.exceptions import RequestException
 
-from api.api_base import ApiBase
+from api.api_base import ApiBase, SCAN_SUCCESS, get_request_scan_result
+from api.emby_common import get_library_refresh_in_progress
 from common import utils
 from common.log_manager import LogManager
 
@@ -107,12 +108,15 @@ class EmbyAPI(ApiBase):
             )
         return self.get_invalid_type()
 
-    def set_library_scan(self, library_id: str):
+    def set_library_scan(self, library_id: str) -> str:
         """
         Triggers a scan of the specified library on the Emby server.
 
         Args:
             library_id (str): The ID of the library to scan.
+
+        Returns:
+            str: SCAN_SUCCESS if the server accepted the scan, SCAN_REJECTED if the library is missing or the API key was refused, SCAN_FAILED otherwise.
         """
         try:
             headers = {"accept": "application/json"}
@@ -126,11 +130,37 @@ class EmbyAPI(ApiBase):
             payload["ReplaceAllMetadata"] = "false"
 
             emby_url = f"{self.__get_api_url()}/Items/{library_id}/Refresh"
-            requests.post(emby_url, headers=headers, params=payload, timeout=5)
+            response = requests.post(emby_url, headers=headers, params=payload, timeout=5)
+            response.raise_for_status()
+            return SCAN_SUCCESS
         except RequestException as e:
             self.log_manager.log_error(
                 f"{self.log_header} set_library_scan {utils.get_tag("error", e)}"
             )
+            return get_request_scan_result(e)
+
+    def get_library_scan_in_progress(self, library_name: str) -> bool:
+        """
+        Checks if the Emby server is currently refreshing the library.
+
+        Args:
+            library_name (str): The name of the library to check.
+
+        Returns:
+            bool: True if a scan of the library is running, False otherwise.
+        """
+        try:
+            return get_library_refresh_in_progress(
+                self.__get_api_url(),
+                self.__get_default_payload(),
+                library_name
+            )
+        except RequestException as e:
+            self.log_manager.log_error(
+                f"{self.log_header} get_library_scan_in_progress {utils.get_tag("error", e)}"
+            )
+
+        return False
 
     def get_library_id(self, name: str) -> str:
         """
@@ -141,6 +171,9 @@ class EmbyAPI(ApiBase):
 
         Returns:
             str: The ID of the library if found, otherwise the invalid item ID.
+
+        Raises:
+            RequestException: If the libraries could not be requested so a missing library is never assumed.
         """
         try:
             r = requests.get(
@@ -158,5 +191,6 @@ class EmbyAPI(ApiBase):
             self.log_manager.log_error(
                 f"{self.log_header} get_library_id {utils.get_tag("error", e)}"
             )
+            raise
 
         return self.get_invalid_type()
@@ -0,0 +1,46 @@
+""" Emby and Jellyfin Common API Module """
+
+import requests
+
+
+def get_library_refresh_in_progress(api_url: str, payload: dict, library_name: str) -> bool:
+    """
+    Checks if an Emby or Jellyfin server is currently refreshing a library.
+
+    Jellyfin answers the same requests as Emby. The refresh status of the
+    library folder is checked first and then the scheduled library scan task
+    which covers every library.
+
+    Args:
+        api_url (str): The base API URL of the server.
+        payload (dict): The default payload containing the API key.
+        library_name (str): The name of the library to check.
+
+    Returns:
+        bool: True if a scan of the library is running, False otherwise.
+
+    Raises:
+        RequestException: If the server could not be requested.
+    """
+    r = requests.get(f"{api_url}/Library/VirtualFolders", params=payload, timeout=5)
+    response = r.json()
+
+    # An unexpected answer is treated as no scan running so the notify is not held back
+    if isinstance(response, list):
+        for library in response:
+            if (
+                isinstance(library, dict)
+                and library.get("Name") == library_name
+                and library.get("RefreshStatus", "Idle") != "Idle"
+            ):
+                return True
+
+    r = requests.get(f"{api_url}/ScheduledTasks", params=payload, timeout=5)
+    response = r.json()
+
+    if isinstance(response, list):
+        for task in response:
+            if isinstance(task, dict) and task.get("Key") == "RefreshLibrary" and task.get("State") == "Running":
+                return True
+
+    return False
@@ -1,12 +1,29 @@
 """ Plex API Module """
 
-from plexapi.server import PlexServer
-from plexapi.exceptions import BadRequest, NotFound, Unauthorized
+import threading
+import time
+from typing import TYPE_CHECKING
 
-from api.api_base import ApiBase
+from requests.exceptions import RequestException
+
+from api.api_base import ApiBase, SCAN_FAILED, SCAN_REJECTED, SCAN_SUCCESS
 from common import utils
 from common.log_manager import LogManager
 
+if TYPE_CHECKING:
+    from plexapi.server import PlexServer
+
+# Seconds to wait before retrying a failed connection doubling up to the maximum
+CONNECT_RETRY_MIN_SECONDS: float = 5.0
+CONNECT_RETRY_MAX_SECONDS: float = 300.0
+
+
+def _get_plex_errors() -> tuple[type[Exception], ...]:
+    """ Get the errors raised by plexapi. plexapi is only imported once a server is connected """
+    from plexapi.exceptions import BadRequest, NotFound, Unauthorized  # pylint: disable=import-outside-toplevel
+    return (BadRequest, NotFound, Unauthorized, RequestException)
+
+
 class PlexAPI(ApiBase):
     """
     Provides an interface for interacting with the Plex Media Server API.
@@ -39,7 +56,38 @@ class PlexAPI(ApiBase):
             self.__module__,
             log_manager
         )
-        self.plex_server = PlexServer(url.rstrip("/"), api_key)
+        # The server is connected on first use so an unavailable server does not block startup
+        self.plex_server: "PlexServer" = None
+        self.connect_lock = threading.Lock()
+        self.connect_retry_seconds: float = CONNECT_RETRY_MIN_SECONDS
+        self.next_connect_time: float = 0.0
+
+    def __get_plex_server(self) -> "PlexServer":
+        """
+        Returns the Plex server connecting to it if required.
+
+        A failed connection is retried on a later call once the retry time has
+        passed.
+
+        Returns:
+            PlexServer: The connected Plex server, or None if not connected.
+        """
+        with self.connect_lock:
+            if self.plex_server is None and time.monotonic() >= self.next_connect_time:
+                from plexapi.server import PlexServer  # pylint: disable=import-outside-toplevel
+                try:
+                    self.plex_server = PlexServer(self.url, self.api_key)
+                    self.connect_retry_seconds = CONNECT_RETRY_MIN_SECONDS
+                except _get_plex_errors() as e:
+                    self.next_connect_time = time.monotonic() + self.connect_retry_seconds
+                    self.log_manager.log_warning(
+                        f"{self.log_header} connect failed {utils.get_tag("server", self.server_name)} {utils.get_tag("retry_seconds", self.connect_retry_seconds)} {utils.get_tag("error", e)}"
+                    )
+                    self.connect_retry_seconds = min(
+                        self.connect_retry_seconds * 2,
+                        CONNECT_RETRY_MAX_SECONDS
+                    )
+            return self.plex_server
 
     def get_valid(self) -> bool:
         """
@@ -48,10 +96,13 @@ class PlexAPI(ApiBase):
         Returns:
             bool: True if the connection is valid, False otherwise.
         """
+        plex_server = self.__get_plex_server()
+        if plex_server is None:
+            return False
         try:
-            self.plex_server.library.sections()
+            plex_server.library.sections()
             return True
-        except (BadRequest, NotFound, Unauthorized):
+        except _get_plex_errors():
             pass
         return False
 
@@ -62,10 +113,13 @@ class PlexAPI(ApiBase):
         Returns:
             str: The friendly name of the Plex server.
         """
+        plex_server = self.__get_plex_server()
+        if plex_server is None:
+            return "Unknown Plex Server"
         try:
-            return_name = self.plex_server.friendlyName
+            return_name = plex_server.friendlyName
             return return_name
-        except (BadRequest, NotFound, Unauthorized):
+        except _get_plex_errors():
             pass
         return "Unknown Plex Server"
 
@@ -79,26 +133,83 @@ class PlexAPI(ApiBase):
         Returns:
             bool: True if the library exists, False otherwise.
         """
+        plex_server = self.__get_plex_server()
+        if plex_server is None:
+            return False
         try:
-            self.plex_server.library.section(library_name)
+            plex_server.library.section(library_name)
             return True
-        except (BadRequest, NotFound, Unauthorized):
+        except _get_plex_errors():
             pass
         return False
 
-    def set_library_scan(self, library_name: str):
+    def get_library_scan_in_progress(self, library_name: str) -> bool:
+        """
+        Checks if the Plex server is currently refreshing the library.
+
+        The section refreshing state is checked first and then any running
+        library activities for the section.
+
+        Args:
+            library_name (str): The name of the library to check.
+
+        Returns:
+            bool: True if a scan of the library is running, False otherwise.
+        """
+        plex_server = self.__get_plex_server()
+        if plex_server is None:
+            return False
+        try:
+            section_key: str = None
+            for directory in plex_server.query("/library/sections"):
+                if directory.attrib.get("title") == library_name:
+                    if directory.attrib.get("refreshing") == "1":
+                        return True
+                    section_key = directory.attrib.get("key")
+                    break
+
+            if section_key is not None:
+                for activity in plex_server.query("/activities"):
+                    if activity.attrib.get("type", "").startswith("library."):
+                        context = activity.find("Context")
+                        if (
+                            context is not None
+                            and context.attrib.get("librarySectionID") == section_key
+                        ):
+                            return True
+        except _get_plex_errors() as e:
+            tag_library = utils.get_tag("library", library_name)
+            tag_error = utils.get_tag("error", e)
+            self.log_manager.log_error(
+                f"{self.log_header} get_library_scan_in_progress {tag_library} {tag_error}"
+            )
+        return False
+
+    def set_library_scan(self, library_name: str, path: str = None) -> str:
         """
         Triggers a scan of the specified library on the Plex server.
 
         Args:
             library_name (str): The name of the library to scan.
+            path (str): Only scan this folder of the library. The whole library is scanned if None.
+
+        Returns:
+            str: SCAN_SUCCESS if the server accepted the scan, SCAN_REJECTED if the library is missing or the token was refused, SCAN_FAILED otherwise.
         """
+        plex_server = self.__get_plex_server()
+        if plex_server is None:
+            return SCAN_FAILED
+        from plexapi.exceptions import NotFound, Unauthorized  # pylint: disable=import-outside-toplevel
         try:
-            library = self.plex_server.library.section(library_name)
-            library.update()
-        except (BadRequest, NotFound, Unauthorized) as e:
+            library = plex_server.library.section(library_name)
+            library.update(path=path)
+            return SCAN_SUCCESS
+        except _get_plex_errors() as e:
             tag_library = utils.get_tag("library", library_name)
             tag_error = utils.get_tag("error", e)
             self.log_manager.log_error(
                 f"{self.log_header} set_library_scan {tag_library} {tag_error}"
             )
+            if isinstance(e, (NotFound, Unauthorized)):
+                return SCAN_REJECTED
+        return SCAN_FAILED
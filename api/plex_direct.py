@@ -0,0 +1,226 @@
+""" Direct Plex API Module """
+
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+
+import requests
+from requests.exceptions import RequestException
+
+from api.api_base import ApiBase, SCAN_FAILED, SCAN_REJECTED, SCAN_SUCCESS, get_request_scan_result
+from common import utils
+from common.log_manager import LogManager
+
+# Seconds the library section keys are used before they are requested again
+SECTION_CACHE_SECONDS: float = 300.0
+
+
+class PlexDirectAPI(ApiBase):
+    """
+    Provides a lightweight interface to the Plex Media Server API.
+
+    Requests are sent directly over a pooled session instead of through
+    plexapi so nothing heavy is imported. The section key of every library
+    is cached so a library scan is a single request.
+    """
+
+    def __init__(
+        self,
+        server_name: str,
+        url: str,
+        api_key: str,
+        log_manager: LogManager
+    ):
+        """
+        Initializes the PlexDirectAPI with the server URL, API key, and log_manager.
+
+        Args:
+            server_name (str): The name of this plex server
+            url (str): The base URL of the Plex Media Server.
+            api_key (str): The API key for authenticating with the Plex server.
+            log_manager (LogManager): The log manager instance for logging messages.
+        """
+        super().__init__(
+            server_name,
+            url,
+            api_key,
+            utils.get_plex_ansi_code(),
+            self.__module__,
+            log_manager
+        )
+        self.session = requests.Session()
+        self.session.headers.update({"X-Plex-Token": api_key, "Accept": "application/xml"})
+        self.section_keys: dict[str, str] = {}
+        self.section_keys_time: float = None
+        self.section_lock = threading.Lock()
+
+    def __get(self, path: str, params: dict = None) -> ElementTree.Element:
+        """
+        Sends a request to the Plex server.
+
+        Args:
+            path (str): The endpoint path.
+            params (dict): The query parameters.
+
+        Returns:
+            ElementTree.Element: The parsed MediaContainer of the response.
+
+        Raises:
+            RequestException: If the request failed or the server returned an error status.
+        """
+        response = self.session.get(f"{self.url}{path}", params=params, timeout=5)
+        response.raise_for_status()
+        if len(response.content) == 0:
+            return ElementTree.Element("MediaContainer")
+        try:
+            return ElementTree.fromstring(response.content)
+        except ElementTree.ParseError as e:
+            raise RequestException(f"Invalid response from {path}") from e
+
+    def __get_sections(self) -> ElementTree.Element:
+        """ Get the library sections and cache their keys """
+        sections = self.__get("/library/sections")
+        with self.section_lock:
+            self.section_keys = {
+                directory.attrib.get("title"): directory.attrib.get("key")
+                for directory in sections.iter("Directory")
+            }
+            self.section_keys_time = time.monotonic()
+        return sections
+
+    def __get_section_key(self, library_name: str) -> str:
+        """ Get the section key of a library requesting the sections if the cache is old or missing it """
+        with self.section_lock:
+            cache_valid = (
+                self.section_keys_time is not None
+                and time.monotonic() - self.section_keys_time < SECTION_CACHE_SECONDS
+            )
+            if cache_valid and library_name in self.section_keys:
+                return self.section_keys[library_name]
+
+        self.__get_sections()
+        return self.section_keys.get(library_name)
+
+    def __invalidate_section_keys(self):
+        """ Request the section keys again on next use """
+        with self.section_lock:
+            self.section_keys_time = None
+
+    def get_valid(self) -> bool:
+        """
+        Checks if the connection to the Plex Media Server is valid.
+
+        Returns:
+            bool: True if the connection is valid, False otherwise.
+        """
+        try:
+            self.__get_sections()
+            return True
+        except RequestException:
+            pass
+        return False
+
+    def get_server_reported_name(self) -> str:
+        """
+        Retrieves the friendly name of the Plex Media Server.
+
+        Returns:
+            str: The friendly name of the Plex server.
+        """
+        try:
+            return self.__get("/").attrib.get("friendlyName", "Unknown Plex Server")
+        except RequestException:
+            pass
+        return "Unknown Plex Server"
+
+    def get_library_exists(self, library_name: str) -> bool:
+        """
+        Checks if a library with the given name exists on the Plex server.
+
+        Args:
+            library_name (str): The name of the library to check.
+
+        Returns:
+            bool: True if the library exists, False otherwise.
+        """
+        try:
+            return self.__get_section_key(library_name) is not None
+        except RequestException:
+            pass
+        return False
+
+    def get_library_scan_in_progress(self, library_name: str) -> bool:
+        """
+        Checks if the Plex server is currently refreshing the library.
+
+        The section refreshing state is checked first and then any running
+        library activities for the section.
+
+        Args:
+            library_name (str): The name of the library to check.
+
+        Returns:
+            bool: True if a scan of the library is running, False otherwise.
+        """
+        try:
+            section_key: str = None
+            for directory in self.__get_sections().iter("Directory"):
+                if directory.attrib.get("title") == library_name:
+                    if directory.attrib.get("refreshing") == "1":
+                        return True
+                    section_key = directory.attrib.get("key")
+                    break
+
+            if section_key is not None:
+                for activity in self.__get("/activities").iter("Activity"):
+                    if activity.attrib.get("type", "").startswith("library."):
+                        context = activity.find("Context")
+                        if (
+                            context is not None
+                            and context.attrib.get("librarySectionID") == section_key
+                        ):
+                            return True
+        except RequestException as e:
+            tag_library = utils.get_tag("library", library_name)
+            tag_error = utils.get_tag("error", e)
+            self.log_manager.log_error(
+                f"{self.log_header} get_library_scan_in_progress {tag_library} {tag_error}"
+            )
+        return False
+
+    def set_library_scan(self, library_name: str, path: str = None) -> str:
+        """
+        Triggers a scan of the specified library on the Plex server.
+
+        Args:
+            library_name (str): The name of the library to scan.
+            path (str): Only scan this folder of the library. The whole library is scanned if None.
+
+        Returns:
+            str: SCAN_SUCCESS if the server accepted the scan, SCAN_REJECTED if the library is missing or the token was refused, SCAN_FAILED otherwise.
+        """
+        params = {"path": path} if path is not None else None
+        try:
+            for attempt in range(2):
+                section_key = self.__get_section_key(library_name)
+                if section_key is None:
+                    self.log_manager.log_error(
+                        f"{self.log_header} set_library_scan {utils.get_tag("library", library_name)} {utils.get_tag("error", "library not found")}"
+                    )
+                    return SCAN_REJECTED
+                try:
+                    self.__get(f"/library/sections/{section_key}/refresh", params)
+                    return SCAN_SUCCESS
+                except requests.HTTPError as e:
+                    # The library was recreated with a new key so request the keys again once
+                    if e.response is None or e.response.status_code != 404 or attempt > 0:
+                        raise
+                    self.__invalidate_section_keys()
+        except RequestException as e:
+            tag_library = utils.get_tag("library", library_name)
+            tag_error = utils.get_tag("error", e)
+            self.log_manager.log_error(
+                f"{self.log_header} set_library_scan {tag_library} {tag_error}"
+            )
+            return get_request_scan_result(e)
+        return SCAN_FAILED
@@ -7,8 +7,8 @@ and triggers library scans on media servers like Plex, Emby, and Jellyfin.
 Key Components:
     - ApiManager: Handles communication with media server APIs.
     - Remotescan Service: Monitors file system changes and triggers server scans.
-    - BlockingScheduler: Manages scheduled tasks.
     - LogManager: Handles logging to files and console.
+    - MetricsServer: Optionally serves Prometheus metrics over HTTP.
 
 Configuration:
     Remotescan is configured via a JSON file specified by the CONFIG_PATH
@@ -20,28 +20,39 @@ Usage:
     2. Run the app.py script.
 """
 
-from sys import platform
 import time
+
+# Taken before the other imports so the reported startup time includes loading the modules
+start_time: float = time.perf_counter()
+
+# pylint: disable=wrong-import-position
+from sys import platform
 import signal
 import json
 import os
-import sys
-
-from apscheduler.schedulers.blocking import BlockingScheduler
+import threading
 
 from api.api_manager import ApiManager
 from common import utils
 from common.log_manager import LogManager
+from common.metrics import MetricsRegistry, MetricsServer
 from service.service_base import ServiceBase
 if platform == "linux":
     from service.remote_scan import Remotescan
+# pylint: enable=wrong-import-position
 
 REMOTE_SCAN_VERSION: str = "v3.1.3"
 
+# Seconds from the process start to the services watching before the startup is logged as slow
+STARTUP_TARGET_SECONDS: float = 2.0
+
 # Global Variables
 api_manager: ApiManager = None
 log_manager = LogManager(__name__)
-scheduler = BlockingScheduler()
+shutdown_event = threading.Event()
+metrics_server: MetricsServer = None
+conf_loc_path_file: str = ""
+reload_lock = threading.Lock()
 
 # Available Services
 services: list[ServiceBase] = []
@@ -51,10 +62,53 @@ services: list[ServiceBase] = []
 def handle_sigterm(_sig, _frame):
     """Handles the SIGTERM signal for graceful shutdown."""
     log_manager.log_info("SIGTERM received, shutting down ...")
+    # The main thread wakes from its wait and shuts the services down
+    shutdown_event.set()
+
+
+def _shutdown():
+    """Shuts down the services and the metrics server."""
     for service_base in services:
         service_base.shutdown()
-    scheduler.shutdown(wait=True)
-    sys.exit(0)
+    if metrics_server is not None:
+        metrics_server.shutdown()
+
+
+def handle_sighup(_sig, _frame):
+    """Handles the SIGHUP signal by reloading the configuration."""
+    log_manager.log_info("SIGHUP received, reloading configuration ...")
+    # Reload off the signal handler since connecting servers and walking trees can take a while
+    threading.Thread(target=_reload_config, daemon=True).start()
+
+
+def _reload_config():
+    """Reloads the configuration file and applies only the changes to the services."""
+    with reload_lock:
+        try:
+            with open(conf_loc_path_file, "r", encoding="utf-8") as config_file:
+                config: dict = json.load(config_file)
+
+            log_manager.configure_file_logging(config)
+            api_manager.reload(config)
+            for service_base in services:
+                service_base.reload(config)
+        except FileNotFoundError as e:
+            log_manager.log_error(
+                f"Config file not found: {utils.get_tag('error', e)}"
+            )
+        except json.JSONDecodeError as e:
+            log_manager.log_error(
+                f"Error decoding JSON in config file: {utils.get_tag('error', e)}",
+            )
+        except KeyError as e:
+            log_manager.log_error(
+                f"Missing key in config file: {utils.get_tag('error', e)}"
+            )
+        except Exception as e:
+            # A setting with the wrong type must not stop later reloads
+            log_manager.log_error(
+                f"Error reloading config file: {utils.get_tag('error', e)}"
+            )
 
 
 def _create_services(config: dict):
@@ -65,8 +119,7 @@ def _create_services(config: dict):
                 Remotescan(
                     api_manager,
                     config["remote_scan"],
-                    log_manager,
-                    scheduler
+                    log_manager
                 )
             )
         else:
@@ -75,73 +128,115 @@ def _create_services(config: dict):
             )
 
 
-def _do_nothing() -> None:
-    """A dummy function to keep the scheduler alive."""
-    time.sleep(1)
+def _configure_metrics(config: dict) -> MetricsServer:
+    """Creates and starts the metrics server if enabled in the configuration."""
+    if (
+        "metrics" in config
+        and "enabled" in config["metrics"]
+        and config["metrics"]["enabled"] == "True"
+    ):
+        registry = MetricsRegistry()
+        registry.register(log_manager.collect_metrics)
+        registry.register(api_manager.collect_metrics)
+        for service_base in services:
+            registry.register(service_base.collect_metrics)
+
+        server = MetricsServer(registry, config["metrics"])
+        try:
+            server.start()
+            log_manager.log_info(
+                f"Serving metrics {utils.get_tag('address', server.address)} {utils.get_tag('port', server.port)}"
+            )
+            return server
+        except OSError as e:
+            log_manager.log_error(
+                f"Unable to start metrics server {utils.get_tag('error', e)}"
+            )
+    return None
+
+
+def _log_startup_time():
+    """Logs the seconds from the process start until the services started."""
+    startup_seconds = time.perf_counter() - start_time
+    message = (
+        f"Startup complete {utils.get_tag('seconds', f'{startup_seconds:.3f}')} "
+        f"{utils.get_tag('target_seconds', STARTUP_TARGET_SECONDS)}"
+    )
+    if startup_seconds > STARTUP_TARGET_SECONDS:
+        log_manager.log_warning(message)
+    else:
+        log_manager.log_info(message)
 
 
-conf_loc_path_file: str = ""
-config_path_valid: bool = "CONFIG_PATH" in os.environ
-if config_path_valid:
-    conf_loc_path_file = os.environ["CONFIG_PATH"].rstrip("/")
-    if os.path.exists(conf_loc_path_file):
-        try:
-            # Load the configuration file
-            with open(conf_loc_path_file, "r", encoding="utf-8") as f:
-                data: dict = json.load(f)
+# Shard workers are spawned and import this module so only run the service as the main script
+if __name__ == "__main__":
+    config_path_valid: bool = "CONFIG_PATH" in os.environ
+    if config_path_valid:
+        conf_loc_path_file = os.environ["CONFIG_PATH"].rstrip("/")
+        if os.path.exists(conf_loc_path_file):
+            try:
+                # Load the configuration file
+                with open(conf_loc_path_file, "r", encoding="utf-8") as f:
+                    data: dict = json.load(f)
 
-            # Set up signal termination handle
-            signal.signal(signal.SIGTERM, handle_sigterm)
+                # Set up signal termination handle
+                signal.signal(signal.SIGTERM, handle_sigterm)
 
-            # Configure the gotify logging
-            log_manager.configure_gotify(data)
+                # A reload requested while starting is ignored until the services exist
+                signal.signal(signal.SIGHUP, signal.SIG_IGN)
 
-            log_manager.log_info(
-                f"Starting Remotescan {REMOTE_SCAN_VERSION}"
-            )
+                # Configure the gotify logging and the log file rotation
+                log_manager.configure_gotify(data)
+                log_manager.configure_file_logging(data)
 
-            # Create the API Manager
-            api_manager = ApiManager(data, log_manager)
+                log_manager.log_info(
+                    f"Starting Remotescan {REMOTE_SCAN_VERSION}"
+                )
 
-            # Create the services
-            _create_services(data)
+                # Create the API Manager
+                api_manager = ApiManager(data, log_manager)
 
-            # Init the services
-            for service in services:
-                service.init_scheduler_jobs()
+                # Create the services
+                _create_services(data)
 
-            if len(services) > 0:
-                # Add a job to do nothing to keep the script alive
-                scheduler.add_job(
-                    _do_nothing,
-                    trigger="interval",
-                    hours=24
-                )
+                # Init the services
+                for service in services:
+                    service.init_scheduler_jobs()
 
-                # Start the scheduler for all jobs
-                scheduler.start()
+                # Serve the metrics if enabled
+                metrics_server = _configure_metrics(data)
 
-        except FileNotFoundError as e:
-            log_manager.log_error(
-                f"Config file not found: {utils.get_tag('error', e)}"
-            )
-        except json.JSONDecodeError as e:
-            log_manager.log_error(
-                f"Error decoding JSON in config file: {utils.get_tag('error', e)}",
-            )
-        except KeyError as e:
-            log_manager.log_error(
-                f"Missing key in config file: {utils.get_tag('error', e)}"
-            )
-        except Exception as e:
+                # Set up signal configuration reload handle
+                signal.signal(signal.SIGHUP, handle_sighup)
+
+                _log_startup_time()
+
+                if len(services) > 0:
+                    # The services run on their own threads so only wait for SIGTERM
+                    shutdown_event.wait()
+                    _shutdown()
+
+            except FileNotFoundError as e:
+                log_manager.log_error(
+                    f"Config file not found: {utils.get_tag('error', e)}"
+                )
+            except json.JSONDecodeError as e:
+                log_manager.log_error(
+                    f"Error decoding JSON in config file: {utils.get_tag('error', e)}",
+                )
+            except KeyError as e:
+                log_manager.log_error(
+                    f"Missing key in config file: {utils.get_tag('error', e)}"
+                )
+            except Exception as e:
+                log_manager.log_error(
+                    f"An unexpected error occurred: {utils.get_tag('error', e)}"
+                )
+        else:
             log_manager.log_error(
-                f"An unexpected error occurred: {utils.get_tag('error', e)}"
+                f"Error finding config file {conf_loc_path_file}"
             )
     else:
-        log_manager.log_error(
-            f"Error finding config file {conf_loc_path_file}"
-        )
-else:
-    log_manager.log_error("Environment variable CONFIG_PATH not found")
+        log_manager.log_error("Environment variable CONFIG_PATH not found")
 
 # END Main script run
@@ -0,0 +1,391 @@
+"""
+Remotescan benchmark suite.
+
+Builds synthetic media libraries in a tmpfs folder, drives event storms
+through the inotify adapter and through the full Remotescan service notifying
+local stub Plex, Emby and Jellyfin servers, and writes the results as JSON so
+runs can be compared across versions.
+
+Usage:
+    python -m benchmarks.bench_remotescan --output results.json
+    python -m benchmarks.bench_remotescan --compare results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from threading import Thread
+
+from api.api_manager import ApiManager
+from benchmarks import media_tree
+from benchmarks.media_tree import MediaTree, MediaTreeConfig
+from benchmarks.stub_servers import StubMediaServer
+from common.log_manager import LogManager
+import external.PyInotify.inotify.adapters
+import external.PyInotify.inotify.constants
+from service.remote_scan import Remotescan
+
+SCANNER_MASK = (
+    external.PyInotify.inotify.constants.IN_MODIFY | external.PyInotify.inotify.constants.IN_MOVED_FROM
+    | external.PyInotify.inotify.constants.IN_MOVED_TO | external.PyInotify.inotify.constants.IN_CREATE
+    | external.PyInotify.inotify.constants.IN_DELETE
+)
+SERVER_TYPES: tuple[str, ...] = ("plex", "emby", "jellyfin")
+
+
+class TimedLock:
+    """
+    Lock wrapper recording how long each acquire waited.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquire_count: int = 0
+        self.contended_count: int = 0
+        self.total_wait: float = 0.0
+        self.max_wait: float = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        """ Acquire the lock recording the wait time """
+        if self.lock.acquire(False):
+            self.acquire_count += 1
+            return True
+        if not blocking:
+            return False
+
+        start_time = time.perf_counter()
+        acquired = self.lock.acquire(True, timeout)
+        if acquired:
+            wait = time.perf_counter() - start_time
+            self.acquire_count += 1
+            self.contended_count += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return acquired
+
+    def release(self):
+        """ Release the lock """
+        self.lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    def get_results(self) -> dict:
+        """ Get the contention results """
+        return {
+            "acquires": self.acquire_count,
+            "contended": self.contended_count,
+            "total_wait_s": self.total_wait,
+            "max_wait_s": self.max_wait
+        }
+
+
+def _get_storms(args) -> dict[str, tuple[Callable[[MediaTree], int], str]]:
+    """ Get the storm functions and the library each storm changes """
+    return {
+        "bulk_copy": (
+            lambda tree: media_tree.storm_bulk_copy(tree, args.storm_size, args.file_size),
+            "Movies"
+        ),
+        "season_import": (
+            lambda tree: media_tree.storm_season_import(tree, args.storm_size, args.file_size),
+            "TV"
+        ),
+        "mass_delete": (
+            lambda tree: media_tree.storm_mass_delete(tree, args.storm_size),
+            "Movies"
+        ),
+        "rename": (
+            media_tree.storm_rename,
+            "TV"
+        )
+    }
+
+
+def _build_tree(root: str, tree_config: MediaTreeConfig) -> MediaTree:
+    """ Build a fresh synthetic media tree """
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root)
+    return media_tree.build_media_tree(root, tree_config)
+
+
+def _run_walk(tree: MediaTree, logger: logging.Logger) -> dict:
+    """ Measure the startup walk time and memory per watch """
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    inotify_trees = external.PyInotify.inotify.adapters.InotifyTrees(
+        logger=logger,
+        paths=[tree.movies_path, tree.tv_path],
+        mask=SCANNER_MASK
+    )
+    walk_time = time.perf_counter() - start_time
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    watch_count = inotify_trees.inotify.watch_count
+    del inotify_trees
+    return {
+        "walk_s": walk_time,
+        "watches": watch_count,
+        "watches_per_s": watch_count / walk_time if walk_time > 0 else 0.0,
+        "python_bytes_per_watch": memory / watch_count if watch_count > 0 else 0.0
+    }
+
+
+def _run_adapter_storm(
+    tree: MediaTree,
+    storm: Callable[[MediaTree], int],
+    logger: logging.Logger,
+    idle_seconds: float,
+    batched: bool = False
+) -> dict:
+    """ Measure the events per second the adapter delivers during a storm one at a time or in batches """
+    inotify_trees = external.PyInotify.inotify.adapters.InotifyTrees(
+        logger=logger,
+        paths=[tree.movies_path, tree.tv_path],
+        mask=SCANNER_MASK
+    )
+    times: list[float] = []
+
+    def consume():
+        if batched:
+            for batch in inotify_trees.event_batch_gen(timeout_s=idle_seconds):
+                times.extend([time.perf_counter()] * len(batch))
+        else:
+            for _event in inotify_trees.event_gen(timeout_s=idle_seconds, yield_nones=False):
+                times.append(time.perf_counter())
+
+    consumer = Thread(target=consume)
+    consumer.start()
+
+    start_time = time.perf_counter()
+    changes = storm(tree)
+    storm_time = time.perf_counter() - start_time
+    consumer.join()
+
+    duration = (times[-1] - start_time) if times else 0.0
+    return {
+        "changes": changes,
+        "storm_s": storm_time,
+        "events": len(times),
+        "raw_events": inotify_trees.inotify.event_count,
+        "events_per_s": len(times) / duration if duration > 0 else 0.0,
+        "watches_after": inotify_trees.inotify.watch_count
+    }
+
+
+def _run_end_to_end(
+    tree: MediaTree,
+    storm: Callable[[MediaTree], int],
+    library: str,
+    args,
+    log_manager: LogManager
+) -> dict:
+    """ Measure the event to notify latency through the full service """
+    stubs = {
+        server_type: StubMediaServer(server_type, ["Movies", "TV"])
+        for server_type in SERVER_TYPES
+    }
+    for stub in stubs.values():
+        stub.start()
+
+    config: dict = {}
+    for server_type, stub in stubs.items():
+        config[server_type] = [
+            {"server_name": "Bench", "url": stub.get_url(), "api_key": "bench"}
+        ]
+    config["remote_scan"] = {
+        "scans": [
+            {
+                "name": name,
+                **{
+                    server_type: [{"server_name": "Bench", "library": name}]
+                    for server_type in SERVER_TYPES
+                },
+                "paths": [{"container_path": path}]
+            }
+            for name, path in (("Movies", tree.movies_path), ("TV", tree.tv_path))
+        ],
+        "ignore_folders": [],
+        "valid_file_extensions": args.extensions
+    }
+
+    api_manager = ApiManager(config, log_manager)
+    remotescan = Remotescan(api_manager, config["remote_scan"], log_manager)
+    remotescan.seconds_before_notify = args.debounce
+    remotescan.seconds_between_notifies = 0
+    timed_lock = TimedLock()
+    remotescan.monitor_lock = timed_lock
+    remotescan.init_scheduler_jobs()
+
+    # Wait for the watches of every scan to be registered
+    while len(remotescan.inotify_trees) < 2:
+        time.sleep(0.05)
+
+    start_time = time.time()
+    changes = storm(tree)
+    storm_end_time = time.time()
+
+    deadline = storm_end_time + args.debounce + args.notify_timeout
+    while time.time() < deadline:
+        if all(len(stub.scan_requests) > 0 for stub in stubs.values()):
+            break
+        time.sleep(0.05)
+
+    remotescan.shutdown()
+    for stub in stubs.values():
+        stub.shutdown()
+
+    servers: dict = {}
+    for server_type, stub in stubs.items():
+        requests = [request for request in stub.scan_requests if request[1] == library]
+        servers[server_type] = {
+            "scans": len(stub.scan_requests),
+            "requests": stub.request_count,
+            "event_to_notify_s": (requests[0][0] - start_time) if requests else None,
+            "storm_end_to_notify_s": (requests[0][0] - storm_end_time) if requests else None
+        }
+
+    return {
+        "changes": changes,
+        "debounce_s": args.debounce,
+        "servers": servers,
+        "lock": timed_lock.get_results()
+    }
+
+
+def run(args) -> dict:
+    """ Run every benchmark and return the results """
+    logger = logging.getLogger("benchmark")
+    logger.setLevel(logging.WARNING)
+
+    base_root = args.root
+    if base_root is None:
+        base_root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    work_root = tempfile.mkdtemp(prefix="remotescan-bench-", dir=base_root)
+    tree_root = os.path.join(work_root, "media")
+
+    log_manager = LogManager("benchmark", os.path.join(work_root, "remotescan.log"))
+    log_manager.console_info_handler.setLevel(logging.WARNING)
+
+    tree_config = MediaTreeConfig(
+        args.movies,
+        args.shows,
+        args.seasons,
+        args.episodes,
+        args.file_size
+    )
+    results: dict = {
+        "label": args.label,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "root": base_root,
+        "tree": {},
+        "storms": {}
+    }
+
+    try:
+        tree = _build_tree(tree_root, tree_config)
+        results["tree"] = {
+            "directories": tree.directory_count,
+            "files": tree.file_count
+        }
+        results["walk"] = _run_walk(tree, logger)
+
+        for name, (storm, library) in _get_storms(args).items():
+            if args.storms and name not in args.storms:
+                continue
+
+            storm_results: dict = {}
+            tree = _build_tree(tree_root, tree_config)
+            storm_results["adapter"] = _run_adapter_storm(tree, storm, logger, args.idle)
+            tree = _build_tree(tree_root, tree_config)
+            storm_results["adapter_batch"] = _run_adapter_storm(tree, storm, logger, args.idle, batched=True)
+
+            if not args.skip_end_to_end:
+                tree = _build_tree(tree_root, tree_config)
+                storm_results["end_to_end"] = _run_end_to_end(
+                    tree, storm, library, args, log_manager
+                )
+            results["storms"][name] = storm_results
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    return results
+
+
+def _flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    """ Flatten the numeric results into dotted names """
+    values: dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(previous: dict, current: dict) -> str:
+    """ Get a report of the differences between two result sets """
+    previous_values = _flatten(previous)
+    current_values = _flatten(current)
+    lines = [f"{'metric':<60} {'previous':>14} {'current':>14} {'ratio':>8}"]
+    for name, value in current_values.items():
+        if name in previous_values:
+            old_value = previous_values[name]
+            ratio = f"{value / old_value:.2f}" if old_value else "-"
+            lines.append(f"{name:<60} {old_value:>14.4f} {value:>14.4f} {ratio:>8}")
+    return "\n".join(lines)
+
+
+def main():
+    """ Parse the arguments and run the benchmarks """
+    parser = argparse.ArgumentParser(description="Remotescan benchmark suite")
+    parser.add_argument("--root", help="Folder to build the libraries in. Default: /dev/shm")
+    parser.add_argument("--label", default="", help="Label stored with the results such as the version")
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--shows", type=int, default=50)
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--file-size", type=int, default=0, help="Bytes written to each media file")
+    parser.add_argument("--storm-size", type=int, default=100, help="Folders or files changed by a storm")
+    parser.add_argument("--storms", nargs="*", help="Storms to run. Default: all")
+    parser.add_argument("--extensions", default="mkv", help="valid_file_extensions for the service")
+    parser.add_argument("--debounce", type=float, default=1.0, help="seconds_before_notify for the service")
+    parser.add_argument("--idle", type=float, default=1.0, help="Seconds without events that end a storm")
+    parser.add_argument("--notify-timeout", type=float, default=10.0)
+    parser.add_argument("--skip-end-to-end", action="store_true")
+    parser.add_argument("--output", help="File to write the JSON results to")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    results = run(args)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            print(compare(json.load(file), results), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
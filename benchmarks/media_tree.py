@@ -0,0 +1,116 @@
+""" Synthetic media library trees and event storms for the benchmarks """
+
+import os
+import shutil
+from dataclasses import dataclass
+
+
+@dataclass
+class MediaTreeConfig:
+    """Structure for holding the size of a synthetic media library. """
+    movies: int = 200
+    shows: int = 50
+    seasons: int = 5
+    episodes: int = 10
+    file_size: int = 0
+
+
+@dataclass
+class MediaTree:
+    """Structure for holding the paths of a synthetic media library. """
+    root: str
+    movies_path: str
+    tv_path: str
+    directory_count: int = 0
+    file_count: int = 0
+
+
+def _write_file(path: str, size: int):
+    """ Create a file of the requested size """
+    with open(path, "wb") as file:
+        if size > 0:
+            file.truncate(size)
+
+
+def _write_movie(movies_path: str, index: int, size: int) -> int:
+    """ Create a movie folder with the media file and sidecar files """
+    name = f"Movie {index:05d} (2000)"
+    folder = os.path.join(movies_path, name)
+    os.makedirs(folder, exist_ok=True)
+    _write_file(os.path.join(folder, f"{name}.mkv"), size)
+    _write_file(os.path.join(folder, f"{name}.nfo"), 0)
+    _write_file(os.path.join(folder, f"{name}.srt"), 0)
+    return 3
+
+
+def _write_season(show_path: str, season: int, episodes: int, size: int) -> int:
+    """ Create a season folder with the episode files """
+    folder = os.path.join(show_path, f"Season {season:02d}")
+    os.makedirs(folder, exist_ok=True)
+    for episode in range(1, episodes + 1):
+        _write_file(os.path.join(folder, f"S{season:02d}E{episode:02d}.mkv"), size)
+    return episodes
+
+
+def build_media_tree(root: str, config: MediaTreeConfig) -> MediaTree:
+    """
+    Builds a movies and a tv library below the root folder.
+
+    Args:
+        root (str): The folder to build the libraries in.
+        config (MediaTreeConfig): The size of the libraries.
+
+    Returns:
+        MediaTree: The paths and sizes of the created libraries.
+    """
+    tree = MediaTree(root, os.path.join(root, "Movies"), os.path.join(root, "TV"))
+    os.makedirs(tree.movies_path, exist_ok=True)
+    os.makedirs(tree.tv_path, exist_ok=True)
+    tree.directory_count = 2
+
+    for movie in range(config.movies):
+        tree.file_count += _write_movie(tree.movies_path, movie, config.file_size)
+        tree.directory_count += 1
+
+    for show in range(config.shows):
+        show_path = os.path.join(tree.tv_path, f"Show {show:04d}")
+        os.makedirs(show_path, exist_ok=True)
+        tree.directory_count += 1
+        for season in range(1, config.seasons + 1):
+            tree.file_count += _write_season(show_path, season, config.episodes, config.file_size)
+            tree.directory_count += 1
+
+    return tree
+
+
+def storm_bulk_copy(tree: MediaTree, count: int, size: int) -> int:
+    """ Copy a batch of new movie folders into the movies library """
+    files = 0
+    for index in range(count):
+        files += _write_movie(tree.movies_path, 900000 + index, size)
+    return files
+
+
+def storm_season_import(tree: MediaTree, episodes: int, size: int) -> int:
+    """ Import a new season into the first show of the tv library """
+    show_path = os.path.join(tree.tv_path, sorted(os.listdir(tree.tv_path))[0])
+    return _write_season(show_path, 99, episodes, size)
+
+
+def storm_mass_delete(tree: MediaTree, count: int) -> int:
+    """ Delete movie folders from the movies library """
+    deleted = 0
+    for name in sorted(os.listdir(tree.movies_path))[:count]:
+        shutil.rmtree(os.path.join(tree.movies_path, name))
+        deleted += 1
+    return deleted
+
+
+def storm_rename(tree: MediaTree) -> int:
+    """ Rename the first show folder of the tv library """
+    name = sorted(os.listdir(tree.tv_path))[0]
+    os.rename(
+        os.path.join(tree.tv_path, name),
+        os.path.join(tree.tv_path, f"{name} Renamed")
+    )
+    return 1
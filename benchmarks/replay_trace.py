@@ -0,0 +1,266 @@
+"""
+Replays a recorded event trace through the Remotescan monitor logic.
+
+The trace is fed to the service on a virtual clock so hours of events replay
+in seconds. Media servers are replaced by stub APIs that record every scan
+request, and the report shows how many scans would be sent, to which targets,
+and the latency from each event until its libraries were notified. Several
+settings can be replayed against the same trace to compare them.
+
+Usage:
+    python -m benchmarks.replay_trace --config config.conf --trace remotescan.trace.gz \\
+        --settings '{"seconds_before_notify": 60}' '{"seconds_before_notify": 120}'
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import tempfile
+
+from api.api_base import SCAN_SUCCESS
+from common.log_manager import LogManager
+from service.event_trace import TraceEvent, read_trace
+from service.remote_scan import Remotescan, ScanConfigInfo
+
+
+class ReplayClock:
+    """
+    Virtual clock advanced by the replay.
+    """
+
+    def __init__(self):
+        self.now: float = 0.0
+
+    def get_time(self) -> float:
+        """ Get the current virtual time """
+        return self.now
+
+
+class ReplayApi:
+    """
+    Stub media server API recording library scan requests on the virtual clock.
+    """
+
+    def __init__(self, server_type: str, server_name: str, clock: ReplayClock):
+        self.server_type = server_type
+        self.server_name = server_name
+        self.clock = clock
+        self.scan_requests: list[tuple[float, str]] = []
+
+    def get_valid(self) -> bool:
+        """ The stub server is always available """
+        return True
+
+    def get_server_name(self) -> str:
+        """ Get the configured server name """
+        return self.server_name
+
+    def get_invalid_type(self):
+        """ Get the invalid library id """
+        return None
+
+    def get_library_id(self, name: str) -> str:
+        """ The library name is used as the library id """
+        return name
+
+    def get_library_scan_in_progress(self, _library_name: str) -> bool:
+        """ The stub server is never scanning """
+        return False
+
+    def set_library_scan(self, library: str, *_args) -> str:
+        """ Record a library scan request """
+        self.scan_requests.append((self.clock.get_time(), library))
+        return SCAN_SUCCESS
+
+
+class ReplayApiManager:
+    """
+    Stub ApiManager handing out a ReplayApi for every configured server.
+    """
+
+    def __init__(self, clock: ReplayClock):
+        self.clock = clock
+        self.apis: dict[tuple[str, str], ReplayApi] = {}
+
+    def __get_api(self, server_type: str, server_name: str) -> ReplayApi:
+        """ Get the stub API creating it on first use """
+        key = (server_type, server_name)
+        if key not in self.apis:
+            self.apis[key] = ReplayApi(server_type, server_name, self.clock)
+        return self.apis[key]
+
+    def get_plex_api(self, name: str) -> ReplayApi:
+        """ Get the stub Plex API """
+        return self.__get_api("plex", name)
+
+    def get_emby_api(self, name: str) -> ReplayApi:
+        """ Get the stub Emby API """
+        return self.__get_api("emby", name)
+
+    def get_jellyfin_api(self, name: str) -> ReplayApi:
+        """ Get the stub Jellyfin API """
+        return self.__get_api("jellyfin", name)
+
+    def record_notify(self, *_args):
+        """ Notify statistics are not needed for a replay """
+
+
+def _get_scan_targets(scan_config: ScanConfigInfo) -> list[tuple[str, str, str]]:
+    """ Get every media server library a scan notifies """
+    targets: list[tuple[str, str, str]] = []
+    for server_type, library_list in (
+        ("plex", scan_config.plex_library_list),
+        ("emby", scan_config.emby_library_list),
+        ("jellyfin", scan_config.jellyfin_library_list)
+    ):
+        for library_config in library_list:
+            targets.append((server_type, library_config.server_name, library_config.library))
+    return targets
+
+
+def _get_percentile(values: list[float], percentile: float) -> float:
+    """ Get a percentile of a sorted list of values """
+    if not values:
+        return None
+    index = min(int(round(percentile * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def replay(
+    config: dict,
+    events: list[TraceEvent],
+    settings: dict,
+    log_manager: LogManager,
+    drain_seconds: float
+) -> dict:
+    """
+    Replays the events through the monitor logic with the settings applied.
+
+    Args:
+        config (dict): The Remotescan configuration.
+        events (list[TraceEvent]): The recorded events.
+        settings (dict): The remote_scan settings to override.
+        log_manager (LogManager): The log manager for the service.
+        drain_seconds (float): Virtual seconds allowed after the last event for monitors to finish.
+
+    Returns:
+        dict: The scans sent and the event latency.
+    """
+    remote_scan_config = {**config["remote_scan"], **settings}
+    remote_scan_config.pop("trace_path", None)
+    remote_scan_config.pop("journal_path", None)
+
+    clock = ReplayClock()
+    api_manager = ReplayApiManager(clock)
+    remotescan = Remotescan(api_manager, remote_scan_config, log_manager)
+    remotescan.clock = clock.get_time
+    scans = {scan_config.name: scan_config for scan_config in remotescan.scan_configs}
+    step = remotescan.seconds_monitor_rate
+
+    accepted_events: list[TraceEvent] = []
+    next_step: float = None
+    for event in events:
+        if next_step is None:
+            next_step = event.time
+        while next_step <= event.time:
+            clock.now = next_step
+            remotescan.process_monitors()
+            next_step += step
+
+        clock.now = event.time
+        scan_config = scans.get(event.scan_name)
+        if scan_config is not None and remotescan.process_event(scan_config, event.path, event.filename):
+            accepted_events.append(event)
+
+    # Let the remaining monitors and ready targets finish
+    end_time = clock.now + drain_seconds
+    while (len(remotescan.monitors) > 0 or len(remotescan.ready_targets) > 0) and clock.now < end_time:
+        clock.now = next_step if next_step is not None else clock.now + step
+        remotescan.process_monitors()
+        next_step = clock.now + step
+
+    scan_requests: dict[tuple[str, str, str], list[float]] = {}
+    for (server_type, server_name), api in api_manager.apis.items():
+        for request_time, library in api.scan_requests:
+            scan_requests.setdefault((server_type, server_name, library), []).append(request_time)
+
+    latencies: list[float] = []
+    missed_events = 0
+    for event in accepted_events:
+        event_latency = 0.0
+        for target in _get_scan_targets(scans[event.scan_name]):
+            request_times = [
+                request_time for request_time in scan_requests.get(target, [])
+                if request_time >= event.time
+            ]
+            if not request_times:
+                event_latency = None
+                break
+            event_latency = max(event_latency, request_times[0] - event.time)
+        if event_latency is None:
+            missed_events += 1
+        else:
+            latencies.append(event_latency)
+    latencies.sort()
+
+    return {
+        "settings": settings,
+        "events": len(events),
+        "accepted_events": len(accepted_events),
+        "scans_sent": sum(len(request_times) for request_times in scan_requests.values()),
+        "targets": {
+            "/".join(target): len(request_times)
+            for target, request_times in sorted(scan_requests.items())
+        },
+        "latency_s": {
+            "mean": statistics.fmean(latencies) if latencies else None,
+            "p50": _get_percentile(latencies, 0.5),
+            "p95": _get_percentile(latencies, 0.95),
+            "max": latencies[-1] if latencies else None
+        },
+        "events_not_notified": missed_events
+    }
+
+
+def main():
+    """ Parse the arguments and replay the trace """
+    parser = argparse.ArgumentParser(description="Replay a Remotescan event trace")
+    parser.add_argument("--config", required=True, help="Remotescan configuration file")
+    parser.add_argument("--trace", required=True, help="Trace file recorded with trace_path")
+    parser.add_argument(
+        "--settings",
+        nargs="*",
+        default=["{}"],
+        help="JSON objects of remote_scan settings to replay. One replay is run for each"
+    )
+    parser.add_argument("--drain", type=float, default=3600.0, help="Virtual seconds allowed after the last event")
+    parser.add_argument("--output", help="File to write the JSON results to")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as file:
+        config = json.load(file)
+    events = list(read_trace(args.trace))
+
+    log_manager = LogManager(
+        "replay",
+        os.path.join(tempfile.gettempdir(), "remotescan-replay.log")
+    )
+    log_manager.console_info_handler.setLevel(logging.WARNING)
+
+    results = [
+        replay(config, events, json.loads(settings), log_manager, args.drain)
+        for settings in args.settings
+    ]
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+""" Local stub Plex, Emby and Jellyfin servers for the benchmarks """
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import urlparse
+
+
+class StubMediaServer:
+    """
+    Minimal media server answering the requests made by the Remotescan APIs.
+
+    Every library scan request is recorded with the time it was received.
+    """
+
+    def __init__(self, server_type: str, libraries: list[str]):
+        """
+        Initializes the stub server.
+
+        Args:
+            server_type (str): The media server type plex, emby or jellyfin.
+            libraries (list[str]): The library names the server reports.
+        """
+        self.server_type = server_type
+        self.libraries = libraries
+        self.scan_requests: list[tuple[float, str]] = []
+        self.request_count: int = 0
+        self.lock = threading.Lock()
+        self.http_server: ThreadingHTTPServer = None
+        self.thread: Thread = None
+
+    def get_url(self) -> str:
+        """ Get the url the server is listening on """
+        host, port = self.http_server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get_library_name(self, library_id: str) -> str:
+        """ Get the library name for the library id used in the requests """
+        return self.libraries[int(library_id) - 1]
+
+    def record_scan(self, library: str):
+        """ Record a library scan request """
+        with self.lock:
+            self.scan_requests.append((time.time(), library))
+
+    def __get_plex_response(self, path: str) -> tuple[str, str]:
+        """ Get the Plex XML response for a path """
+        if path == "/":
+            return "application/xml", '<MediaContainer friendlyName="Stub Plex" machineIdentifier="stub" version="1.0"/>'
+        if path == "/library":
+            return "application/xml", '<MediaContainer title1="Plex Library"/>'
+        if path in ("/library/sections", "/library/sections/all"):
+            directories = "".join(
+                f'<Directory key="{index + 1}" title="{library}" type="movie" refreshing="0" uuid="{index + 1}"/>'
+                for index, library in enumerate(self.libraries)
+            )
+            return "application/xml", f"<MediaContainer>{directories}</MediaContainer>"
+        if path.startswith("/library/sections/") and path.endswith("/refresh"):
+            self.record_scan(self.get_library_name(path.split("/")[3]))
+            return "application/xml", "<MediaContainer/>"
+        if path == "/activities":
+            return "application/xml", "<MediaContainer/>"
+        return None, ""
+
+    def __get_json_response(self, method: str, path: str) -> object:
+        """ Get the Emby or Jellyfin JSON response for a path """
+        if self.server_type == "emby":
+            path = path.removeprefix("/emby")
+
+        folders = [
+            {"Name": library, "Id": str(index + 1), "ItemId": str(index + 1), "RefreshStatus": "Idle"}
+            for index, library in enumerate(self.libraries)
+        ]
+        if path in ("/System/Info", "/System/Configuration"):
+            return {"ServerName": f"Stub {self.server_type}"}
+        if path == "/Library/SelectableMediaFolders":
+            return folders
+        if path == "/Library/MediaFolders":
+            return {"Items": folders}
+        if path == "/Library/VirtualFolders":
+            return folders
+        if path == "/ScheduledTasks":
+            return []
+        if method == "POST" and path.startswith("/Items/") and path.endswith("/Refresh"):
+            self.record_scan(self.get_library_name(path.split("/")[2]))
+            return {}
+        return None
+
+    def handle_request(self, handler: BaseHTTPRequestHandler, method: str):
+        """ Answer a request for the stub server """
+        with self.lock:
+            self.request_count += 1
+        url = urlparse(handler.path)
+        if self.server_type == "plex":
+            content_type, body = self.__get_plex_response(url.path)
+        else:
+            response = self.__get_json_response(method, url.path)
+            content_type = "application/json" if response is not None else None
+            body = json.dumps(response)
+
+        if content_type is None:
+            handler.send_error(404)
+            return
+        data = body.encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def start(self):
+        """ Start the stub server on a free local port """
+        stub = self
+
+        class StubRequestHandler(BaseHTTPRequestHandler):
+            """ Request handler for the stub server """
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """ Handle a GET request """
+                stub.handle_request(self, "GET")
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """ Handle a POST request """
+                stub.handle_request(self, "POST")
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                """ Requests are not logged """
+
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", 0), StubRequestHandler)
+        self.http_server.daemon_threads = True
+        self.thread = Thread(target=self.http_server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        """ Stop the stub server """
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
@@ -0,0 +1,157 @@
+""" Buffered Rotating File Logging Module """
+
+import gzip
+import logging
+import os
+import shutil
+from logging.handlers import QueueListener, RotatingFileHandler
+from threading import Thread
+
+# Size of the file write buffer so a burst of records is written in few system calls
+WRITE_BUFFER_SIZE: int = 65536
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotating file handler that buffers its writes.
+
+    Records below WARNING are only written to the file buffer. The buffer is
+    flushed when it fills, when a warning or error is logged, and by the
+    QueueListener whenever it has no more records waiting. Rotated segments
+    can be compressed with gzip on a worker thread so a rotation only renames
+    files.
+    """
+
+    def __init__(self, log_path: str, max_bytes: int, backup_count: int, compress: bool = False):
+        """
+        Initializes the BufferedRotatingFileHandler.
+
+        Args:
+            log_path (str): The file to write the log to.
+            max_bytes (int): The log file size that starts a rotation.
+            backup_count (int): The number of rotated segments kept.
+            compress (bool): Compress the rotated segments with gzip.
+        """
+        # Bytes written to the current file. Tracked here since asking the stream would flush it
+        self.stream_size: int = 0
+        # Names that are not valid UTF-8 are logged escaped instead of failing the record
+        super().__init__(
+            log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", errors="backslashreplace"
+        )
+        self.compress_thread: Thread = None
+        self.set_compress(compress)
+
+    def set_compress(self, compress: bool):
+        """ Set if the rotated segments are compressed """
+        self.namer = (lambda name: f"{name}.gz") if compress else None
+        self.rotator = self.__rotate_compressed if compress else None
+
+    def _open(self):
+        """ Open the log file with a larger write buffer """
+        stream = open(
+            self.baseFilename, self.mode, buffering=WRITE_BUFFER_SIZE, encoding=self.encoding, errors=self.errors
+        )
+        self.stream_size = stream.tell()
+        return stream
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """
+        Checks if writing a record would grow the log file past max_bytes.
+
+        Args:
+            record (logging.LogRecord): The log record to write.
+
+        Returns:
+            bool: True if the log should be rotated first, False otherwise.
+        """
+        return self.__get_rollover_due(len(self.format(record)) + len(self.terminator))
+
+    def __get_rollover_due(self, message_size: int) -> bool:
+        """ Get if a message of this size would grow the log file past max_bytes """
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes <= 0 or self.stream_size == 0:
+            return False
+        # Never rotate anything other than a regular file
+        return self.stream_size + message_size >= self.maxBytes and os.path.isfile(self.baseFilename)
+
+    def emit(self, record: logging.LogRecord):
+        """
+        Writes a log record to the file buffer.
+
+        Args:
+            record (logging.LogRecord): The log record to emit.
+        """
+        try:
+            message = f"{self.format(record)}{self.terminator}"
+            if self.__get_rollover_due(len(message)):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(message)
+            self.stream_size += len(message)
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handleError(record)
+
+    def doRollover(self):
+        """ Rotate the log once the previous segment has been compressed """
+        self.__wait_for_compress()
+        super().doRollover()
+
+    def __rotate_compressed(self, source: str, dest: str):
+        """ Rename the log file and compress it on a worker thread """
+        uncompressed_path = dest.removesuffix(".gz")
+        if os.path.exists(source):
+            os.replace(source, uncompressed_path)
+            self.compress_thread = Thread(
+                target=self.__compress,
+                args=(uncompressed_path, dest),
+                daemon=True
+            )
+            self.compress_thread.start()
+
+    def __compress(self, source: str, dest: str):
+        """ Compress a rotated segment and remove the uncompressed copy """
+        try:
+            with open(source, "rb") as source_file, gzip.open(dest, "wb") as dest_file:
+                shutil.copyfileobj(source_file, dest_file)
+            os.remove(source)
+        except OSError:
+            pass
+
+    def __wait_for_compress(self):
+        """ Wait for the previous segment to be compressed """
+        if self.compress_thread is not None:
+            self.compress_thread.join()
+            self.compress_thread = None
+
+    def close(self):
+        """ Flush and close the log file once the last segment is compressed """
+        self.__wait_for_compress()
+        super().close()
+
+
+class FlushingQueueListener(QueueListener):
+    """
+    QueueListener that flushes its handlers whenever the queue is empty.
+
+    Records logged in a burst are written together and reach the file as
+    soon as the burst ends.
+    """
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        """
+        Returns the next record flushing the handlers before waiting for one.
+
+        Args:
+            block (bool): Wait for a record if the queue is empty.
+
+        Returns:
+            logging.LogRecord: The next queued record.
+        """
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
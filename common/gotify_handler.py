@@ -1,14 +1,23 @@
 """ Gotify Logging Module """
 
 import logging
+import time
+from queue import Queue, Full
+from threading import Thread
+
 import requests
 from requests.exceptions import RequestException
 
+# Seconds close waits for the queued messages to be sent
+CLOSE_TIMEOUT_SECONDS: float = 5.0
+
 class GotifyHandler(logging.Handler):
     """ 
     Gotify logging handler for Python.
 
-    This handler sends log messages to a Gotify server.
+    This handler sends log messages to a Gotify server. Messages are queued
+    and sent from a worker thread so logging never waits on the Gotify server.
+    When the queue is full new messages are dropped and counted as overflow.
     """
 
     def __init__(
@@ -16,7 +25,8 @@ class GotifyHandler(logging.Handler):
         url: str,
         app_token: str,
         title: str,
-        priority: int
+        priority: int,
+        queue_size: int = 100
     ):
         """
         Initializes the GotifyHandler with the Gotify server details.
@@ -26,30 +36,73 @@ class GotifyHandler(logging.Handler):
             app_token (str): The application token for authenticating with Gotify.
             title (str): The base title for Gotify messages.
             priority (int): The priority level for Gotify messages.
+            queue_size (int): The maximum number of messages waiting to be sent.
         """
         self.url = url.rstrip("/")
         self.app_token = app_token
         self.title = title
         self.priority = priority
+        self.queue: Queue = Queue(maxsize=max(queue_size, 1))
+        self.overflow_count: int = 0
         logging.Handler.__init__(self=self)
 
+        self.worker_thread = Thread(target=self.__send_messages, daemon=True)
+        self.worker_thread.start()
+
+    def get_queue_depth(self) -> int:
+        """
+        Returns the number of messages waiting to be sent.
+
+        Returns:
+            int: The number of queued messages.
+        """
+        return self.queue.qsize()
+
     def emit(self, record: logging.LogRecord):
         """
-        Emits a log record to the Gotify server.
+        Queues a log record to be sent to the Gotify server.
 
         Args:
             record (logging.LogRecord): The log record to emit.
         """
         try:
-            formatted_message = self.formatter.format(record)
-            requests.post(
-                f"{self.url}/message?token={self.app_token}",
-                json={
-                    "message": formatted_message,
-                    "priority": self.priority,
-                    "title": f"{self.title} - {record.levelname}"
-                },
-                timeout=5,
-            )
-        except RequestException:
-            self.handleError(record)
+            self.queue.put_nowait((self.formatter.format(record), record))
+        except Full:
+            self.overflow_count += 1
+
+    def __send_messages(self):
+        """ Worker thread sending the queued messages to the Gotify server """
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+
+            formatted_message, record = message
+            try:
+                requests.post(
+                    f"{self.url}/message?token={self.app_token}",
+                    json={
+                        "message": formatted_message,
+                        "priority": self.priority,
+                        "title": f"{self.title} - {record.levelname}"
+                    },
+                    timeout=5,
+                )
+            except RequestException:
+                self.handleError(record)
+
+    def close(self):
+        """
+        Sends the queued messages and stops the worker thread.
+
+        Waits at most CLOSE_TIMEOUT_SECONDS so an unavailable Gotify server
+        never holds up the shutdown.
+        """
+        if self.worker_thread.is_alive():
+            deadline = time.monotonic() + CLOSE_TIMEOUT_SECONDS
+            try:
+                self.queue.put(None, timeout=CLOSE_TIMEOUT_SECONDS)
+            except Full:
+                pass
+            self.worker_thread.join(max(deadline - time.monotonic(), 0.0))
+        logging.Handler.close(self)
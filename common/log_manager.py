@@ -1,31 +1,47 @@
 """ Log Management Module """
 
+import atexit
 import logging
 from logging import Logger
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler
+from queue import Queue
+from typing import TYPE_CHECKING
 
 import colorlog
 
-from common.gotify_handler import GotifyHandler
+from common.buffered_file_handler import BufferedRotatingFileHandler, FlushingQueueListener
 from common.gotify_plain_text_formatter import GotifyPlainTextFormatter
+from common.metrics import MetricFamily
 from common.plain_text_formatter import PlainTextFormatter
 
+if TYPE_CHECKING:
+    from common.gotify_handler import GotifyHandler
+
+# Default log file size that starts a rotation and the number of rotated segments kept
+LOG_MAX_BYTES: int = 10485760
+LOG_BACKUP_COUNT: int = 5
+
 
 class LogManager:
     """
     Manages logging for the application, including file and console output,
     and optional Gotify notifications.
+
+    File records are queued and written by a listener thread so rotating
+    and writing the log never blocks the thread that logged.
     """
 
     def __init__(
         self,
         log_name: str,
+        log_path: str = "/logs/remotescan.log"
     ):
         """
         Initializes the LogManager with the specified log name.
 
         Args:
             log_name (str): The name of the logger.
+            log_path (str): The file to write the log to.
         """
         self.logger = logging.getLogger(log_name)
         self.handler_list: list[logging.Handler] = []
@@ -43,12 +59,21 @@ class LogManager:
         self.logger.setLevel(logging.INFO)
         file_formatter = PlainTextFormatter()
 
-        # Create a file handler to write logs to a file
-        self.file_rotating_handler = RotatingFileHandler(
-            "/logs/remotescan.log", maxBytes=100000, backupCount=5
+        # Create a file handler to write logs to a file from the listener thread
+        self.file_rotating_handler = BufferedRotatingFileHandler(
+            log_path, LOG_MAX_BYTES, LOG_BACKUP_COUNT
         )
         self.file_rotating_handler.setLevel(logging.INFO)
         self.file_rotating_handler.setFormatter(file_formatter)
+        self.file_queue: Queue = Queue()
+        self.file_queue_handler = QueueHandler(self.file_queue)
+        self.file_queue_handler.setLevel(logging.INFO)
+        self.file_listener = FlushingQueueListener(
+            self.file_queue, self.file_rotating_handler, respect_handler_level=True
+        )
+        self.file_listener.start()
+        self.file_listener_running: bool = True
+        atexit.register(self.shutdown)
 
         # Create a stream handler to print logs to the console
         self.console_info_handler = colorlog.StreamHandler()
@@ -62,14 +87,24 @@ class LogManager:
         )
 
         # Configure Gotify logging if enabled in the configuration
-        self.gotify_handler: GotifyHandler = None
+        self.gotify_handler: "GotifyHandler" = None
 
-        self.logger.addHandler(self.file_rotating_handler)
+        self.logger.addHandler(self.file_queue_handler)
         self.logger.addHandler(self.console_info_handler)
-        
-        self.handler_list.append(self.file_rotating_handler)
+
         self.handler_list.append(self.console_info_handler)
 
+    def configure_file_logging(self, config: dict) -> None:
+        """Configures the log file rotation if defined in the configuration."""
+        if "file_logging" in config:
+            file_config = config["file_logging"]
+            if "max_bytes" in file_config:
+                self.file_rotating_handler.maxBytes = max(int(file_config["max_bytes"]), 0)
+            if "backup_count" in file_config:
+                self.file_rotating_handler.backupCount = max(int(file_config["backup_count"]), 0)
+            if "compress" in file_config:
+                self.file_rotating_handler.set_compress(file_config["compress"] == "True")
+
     def configure_gotify(self, config: dict) -> None:
         """Configures Gotify logging if enabled in the configuration."""
         # Create a Gotify log handler if set to log warnings
@@ -85,6 +120,9 @@ class LogManager:
                 and "message_title" in config["gotify_logging"]
                 and "priority" in config["gotify_logging"]
             ):
+                # Imported here so requests is only loaded when Gotify is enabled
+                from common.gotify_handler import GotifyHandler  # pylint: disable=import-outside-toplevel
+
                 gotify_formatter = GotifyPlainTextFormatter()
                 self.gotify_handler = GotifyHandler(
                     config["gotify_logging"]["url"],
@@ -103,6 +141,36 @@ class LogManager:
                     "Configuration gotify_logging enabled is True but missing an attribute url, app_token, message_title or priority"
                 )
 
+    def collect_metrics(self) -> list[MetricFamily]:
+        """
+        Returns the log file queue metrics and the Gotify queue metrics when Gotify logging is configured.
+
+        Returns:
+            list[MetricFamily]: The logging metrics.
+        """
+        file_queue_depth = MetricFamily(
+            "remotescan_log_queue_depth",
+            "gauge",
+            "Log records waiting to be written to the log file"
+        )
+        file_queue_depth.add_sample({}, self.file_queue.qsize())
+        if self.gotify_handler is None:
+            return [file_queue_depth]
+
+        queue_depth = MetricFamily(
+            "remotescan_gotify_queue_depth",
+            "gauge",
+            "Gotify messages waiting to be sent"
+        )
+        queue_depth.add_sample({}, self.gotify_handler.get_queue_depth())
+        overflow = MetricFamily(
+            "remotescan_gotify_overflow_total",
+            "counter",
+            "Gotify messages dropped because the queue was full"
+        )
+        overflow.add_sample({}, self.gotify_handler.overflow_count)
+        return [file_queue_depth, queue_depth, overflow]
+
     def get_logger(self) -> Logger:
         """
         Returns the logger instance.
@@ -129,3 +197,15 @@ class LogManager:
         self.logger.error(message)
         for handler in self.handler_list:
             handler.flush()
+
+    def shutdown(self):
+        """ Write the queued records and close the log file. """
+        if self.file_listener_running:
+            self.file_listener_running = False
+            self.file_listener.stop()
+            self.file_rotating_handler.close()
+
+        # Send the queued Gotify messages before the process exits
+        if self.gotify_handler is not None:
+            self.logger.removeHandler(self.gotify_handler)
+            self.gotify_handler.close()
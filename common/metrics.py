@@ -0,0 +1,216 @@
+""" Metrics Module """
+
+import threading
+from bisect import bisect_left
+from collections.abc import Callable
+from threading import Thread
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+DEFAULT_LATENCY_BUCKETS: tuple[float, ...] = (
+    0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0
+)
+
+
+def _escape_label(value: str) -> str:
+    """ Escape a label value for the Prometheus text format """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values using fixed bucket upper bounds.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        """
+        Initializes the Histogram with the bucket upper bounds.
+
+        Args:
+            buckets (tuple[float, ...]): The upper bound of each bucket.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts: list[int] = [0] * (len(self.buckets) + 1)
+        self.total: float = 0.0
+        self.count: int = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        """
+        Records a value in the histogram.
+
+        Args:
+            value (float): The value to record.
+        """
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.bucket_counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def get_snapshot(self) -> tuple[list[int], float, int]:
+        """
+        Returns a consistent copy of the histogram state.
+
+        Returns:
+            tuple[list[int], float, int]: The per bucket counts, sum and count.
+        """
+        with self.lock:
+            return list(self.bucket_counts), self.total, self.count
+
+
+class MetricFamily:
+    """
+    A named metric and its samples in the Prometheus text format.
+    """
+
+    def __init__(self, name: str, metric_type: str, description: str):
+        """
+        Initializes the MetricFamily.
+
+        Args:
+            name (str): The metric name.
+            metric_type (str): The Prometheus type counter, gauge or histogram.
+            description (str): The help text for the metric.
+        """
+        self.name = name
+        self.metric_type = metric_type
+        self.description = description
+        self.samples: list[tuple[str, dict, float]] = []
+
+    def add_sample(self, labels: dict, value: float):
+        """ Add a counter or gauge sample """
+        self.samples.append((self.name, labels, value))
+
+    def add_histogram(self, labels: dict, histogram: Histogram):
+        """ Add the bucket, sum and count samples of a histogram """
+        bucket_counts, total, count = histogram.get_snapshot()
+        cumulative = 0
+        for upper_bound, bucket_count in zip(histogram.buckets, bucket_counts):
+            cumulative += bucket_count
+            self.samples.append(
+                (f"{self.name}_bucket", {**labels, "le": repr(float(upper_bound))}, cumulative)
+            )
+        self.samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+        self.samples.append((f"{self.name}_sum", labels, total))
+        self.samples.append((f"{self.name}_count", labels, count))
+
+    def get_text(self) -> str:
+        """ Get the metric in the Prometheus text exposition format """
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.metric_type}"
+        ]
+        for sample_name, labels, value in self.samples:
+            if labels:
+                label_text = ",".join(
+                    f'{key}="{_escape_label(str(label))}"' for key, label in labels.items()
+                )
+                lines.append(f"{sample_name}{{{label_text}}} {value}")
+            else:
+                lines.append(f"{sample_name} {value}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """
+    Collects metrics from registered collectors when the metrics are scraped.
+
+    Collectors read the plain counters kept by each component so nothing is
+    computed unless the endpoint is scraped.
+    """
+
+    def __init__(self):
+        """ Initializes the MetricsRegistry with no collectors. """
+        self.collectors: list[Callable[[], list[MetricFamily]]] = []
+
+    def register(self, collector: Callable[[], list[MetricFamily]]):
+        """
+        Registers a collector called on each scrape.
+
+        Args:
+            collector (Callable[[], list[MetricFamily]]): Returns the current metrics.
+        """
+        self.collectors.append(collector)
+
+    def get_text(self) -> str:
+        """ Get all the collected metrics in the Prometheus text exposition format """
+        families: list[str] = []
+        for collector in self.collectors:
+            for family in collector():
+                families.append(family.get_text())
+        return "\n".join(families) + "\n"
+
+
+class MetricsServer:
+    """
+    Serves the metrics registry over HTTP in the Prometheus text format.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        config: dict
+    ):
+        """
+        Initializes the MetricsServer from the metrics configuration.
+
+        Args:
+            registry (MetricsRegistry): The registry to serve.
+            config (dict): The metrics configuration.
+        """
+        self.registry = registry
+        self.address: str = "127.0.0.1"
+        self.port: int = 9877
+        self.http_server: "ThreadingHTTPServer" = None
+        self.thread: Thread = None
+
+        if "address" in config:
+            self.address = config["address"]
+        if "port" in config:
+            self.port = config["port"]
+
+    def start(self):
+        """
+        Start serving the metrics on a background thread.
+
+        Raises:
+            OSError: If the address and port can not be bound.
+        """
+        # Imported here so the HTTP server is only loaded when the metrics are enabled
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # pylint: disable=import-outside-toplevel
+
+        registry = self.registry
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            """ Request handler for the metrics endpoint """
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """ Handle a scrape of the metrics """
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                # Folder labels that are not valid UTF-8 are sent escaped
+                body = registry.get_text().encode("utf-8", "backslashreplace")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                """ Scrapes are not logged """
+
+        self.http_server = ThreadingHTTPServer((self.address, self.port), MetricsRequestHandler)
+        self.http_server.daemon_threads = True
+        self.thread = Thread(target=self.http_server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        """ Stop serving the metrics """
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
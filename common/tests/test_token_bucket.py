@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from common.token_bucket import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test__starts_full(self):
+        bucket = TokenBucket(10.0, 2)
+
+        self.assertTrue(bucket.consume(100.0))
+        self.assertTrue(bucket.consume(100.0))
+        self.assertFalse(bucket.consume(100.0))
+
+    def test__gains_a_token_every_period(self):
+        bucket = TokenBucket(10.0)
+        self.assertTrue(bucket.consume(100.0))
+
+        self.assertFalse(bucket.get_available(109.0))
+        self.assertTrue(bucket.get_available(110.0))
+        self.assertTrue(bucket.consume(110.0))
+        self.assertFalse(bucket.consume(115.0))
+
+    def test__never_holds_more_than_capacity(self):
+        bucket = TokenBucket(1.0, 3)
+        bucket.consume(0.0)
+
+        self.assertTrue(bucket.get_available(1000.0))
+        for _ in range(3):
+            self.assertTrue(bucket.consume(1000.0))
+        self.assertFalse(bucket.consume(1000.0))
+
+    def test__time_going_backwards_adds_no_tokens(self):
+        bucket = TokenBucket(10.0)
+        bucket.consume(100.0)
+
+        self.assertFalse(bucket.consume(50.0))
+        self.assertFalse(bucket.consume(59.0))
+
+    def test__zero_period_is_never_limited(self):
+        bucket = TokenBucket(-5.0, 0)
+
+        self.assertEqual((bucket.seconds_per_token, bucket.capacity), (0.0, 1))
+        for _ in range(5):
+            self.assertTrue(bucket.consume(100.0))
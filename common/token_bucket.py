@@ -0,0 +1,68 @@
+""" Token Bucket Module """
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    The bucket holds up to capacity tokens and gains one token every
+    seconds_per_token seconds. Each permitted action consumes one token.
+    """
+
+    def __init__(
+        self,
+        seconds_per_token: float,
+        capacity: int = 1
+    ):
+        """
+        Initializes the TokenBucket full so the first action is not delayed.
+
+        Args:
+            seconds_per_token (float): Seconds required to gain one token.
+            capacity (int): The maximum number of tokens that can be stored.
+        """
+        self.seconds_per_token = max(seconds_per_token, 0.0)
+        self.capacity = max(capacity, 1)
+        self.tokens: float = float(self.capacity)
+        self.last_refill_time: float = None
+
+    def __refill(self, current_time: float):
+        """ Add the tokens gained since the last refill """
+        if self.last_refill_time is not None:
+            elapsed = max(current_time - self.last_refill_time, 0.0)
+            if self.seconds_per_token > 0.0:
+                self.tokens = min(
+                    self.tokens + (elapsed / self.seconds_per_token),
+                    float(self.capacity)
+                )
+            else:
+                self.tokens = float(self.capacity)
+        self.last_refill_time = current_time
+
+    def get_available(self, current_time: float) -> bool:
+        """
+        Checks if a token is available without consuming it.
+
+        Args:
+            current_time (float): The current time in seconds.
+
+        Returns:
+            bool: True if a token is available, False otherwise.
+        """
+        self.__refill(current_time)
+        return self.tokens >= 1.0
+
+    def consume(self, current_time: float) -> bool:
+        """
+        Consumes a token if one is available.
+
+        Args:
+            current_time (float): The current time in seconds.
+
+        Returns:
+            bool: True if a token was consumed, False otherwise.
+        """
+        if self.get_available(current_time):
+            self.tokens -= 1.0
+            return True
+        return False
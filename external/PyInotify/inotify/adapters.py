@@ -2,6 +2,7 @@ import logging
 import select
 import os
 import struct
+import sys
 import collections
 import time
 
@@ -33,6 +34,16 @@ _INOTIFY_EVENT = collections.namedtuple(
                     ])
 
 _STRUCT_HEADER_LENGTH = struct.calcsize(_HEADER_STRUCT_FORMAT)
+_HEADER_STRUCT = struct.Struct(_HEADER_STRUCT_FORMAT)
+
+# Large enough for a full queue of events to be decoded from one read.
+_READ_SIZE = 65536
+
+# Events kept by the event filter whatever their filename since the trees and
+# the terminal event handling depend on them.
+_FILTER_KEEP_MASK = external.PyInotify.inotify.constants.IN_ISDIR | \
+                    external.PyInotify.inotify.constants.IN_UNMOUNT | \
+                    external.PyInotify.inotify.constants.IN_Q_OVERFLOW
 _IS_DEBUG = bool(int(os.environ.get('DEBUG', '0')))
 
 
@@ -46,6 +57,79 @@ class TerminalEventException(Exception):
         self.event = event
 
 
+class EventBatch(object):
+    """Every event decoded from one read, stored as parallel lists (a struct
+    of arrays) so consumers can filter a whole read at once. `renames` holds
+    the old and new path of each directory renamed inside a watched tree.
+    """
+
+    __slots__ = ('wd', 'mask', 'cookie', 'length', 'path', 'name', 'renames')
+
+    def __init__(self):
+        self.wd = []
+        self.mask = []
+        self.cookie = []
+        self.length = []
+        self.path = []
+        self.name = []
+        self.renames = []
+
+    def __len__(self):
+        return len(self.wd)
+
+    def get_event(self, index):
+        """Get an event in the same form that event_gen yields."""
+
+        header = _INOTIFY_EVENT(
+                    self.wd[index],
+                    self.mask[index],
+                    self.cookie[index],
+                    self.length[index])
+        return (header, _get_event_names(header.mask), self.path[index], self.name[index])
+
+    def get_events(self):
+        """Get every event in the same form that event_gen yields."""
+
+        return [self.get_event(index) for index in range(len(self.wd))]
+
+    def head(self, count):
+        """Get a batch of the first `count` events."""
+
+        batch = EventBatch()
+        batch.wd = self.wd[:count]
+        batch.mask = self.mask[:count]
+        batch.cookie = self.cookie[:count]
+        batch.length = self.length[:count]
+        batch.path = self.path[:count]
+        batch.name = self.name[:count]
+        return batch
+
+
+def _get_event_names(event_type):
+    names = []
+    for bit, name in external.PyInotify.inotify.constants.MASK_LOOKUP.items():
+        if event_type & bit:
+            names.append(name)
+            event_type -= bit
+
+            if event_type == 0:
+                break
+
+    assert event_type == 0, \
+           "We could not resolve all event-types: (%d)" % (event_type,)
+
+    return names
+
+
+def _get_event_mask(type_names):
+    mask = 0
+    for bit, name in external.PyInotify.inotify.constants.MASK_LOOKUP.items():
+        if name in type_names:
+            mask |= bit
+
+    return mask
+
+
 class Inotify(object):
     def __init__(self, logger, paths=[], block_duration_s=_DEFAULT_EPOLL_BLOCK_DURATION_S):
         self.__block_duration = block_duration_s
@@ -60,8 +144,32 @@ class Inotify(object):
         self.__epoll = select.epoll()
         self.__epoll.register(self.__inotify_fd, select.POLLIN)
 
+        # Wakeup descriptor so a blocked event_gen can be stopped without
+        # generating file system events. An eventfd is used where available
+        # and a self-pipe otherwise.
+        if hasattr(os, 'eventfd'):
+            self.__wake_read_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+            self.__wake_write_fd = self.__wake_read_fd
+        else:
+            self.__wake_read_fd, self.__wake_write_fd = os.pipe()
+            os.set_blocking(self.__wake_read_fd, False)
+            os.set_blocking(self.__wake_write_fd, False)
+        self.__epoll.register(self.__wake_read_fd, select.POLLIN)
+
+        # Set by interrupt so a wakeup can be told apart from a stop.
+        self.__interrupt_requested = False
+
+        # The filename suffixes and ignored path parts set by
+        # set_event_filter, replaced as one tuple so a reader never sees half
+        # of a change.
+        self.__event_filter = None
+
         self.__last_success_return = None
 
+        # Plain counters read on demand so they cost nothing when unused.
+        self.__event_count = 0
+        self.__epoll_wakeup_count = 0
+
         for path in paths:
             self.add_watch(path)
 
@@ -77,6 +185,46 @@ class Inotify(object):
     def __del__(self):
         self.__logger.debug("Cleaning-up external.PyInotify.inotify.")
         os.close(self.__inotify_fd)
+        os.close(self.__wake_read_fd)
+        if self.__wake_write_fd != self.__wake_read_fd:
+            os.close(self.__wake_write_fd)
+
+    def interrupt(self):
+        """Wake the event generator and make it return. Safe to call from
+        any thread, and before the generator is started.
+        """
+
+        self.__interrupt_requested = True
+        self.__signal_wakeup()
+
+    def wakeup(self):
+        """Wake the event generator without stopping it, so the caller gets
+        control back between events. event_batch_gen yields an empty batch
+        and event_gen yields None when `yield_nones` is set. Safe to call
+        from any thread.
+        """
+
+        self.__signal_wakeup()
+
+    def __signal_wakeup(self):
+        try:
+            os.write(self.__wake_write_fd, (1).to_bytes(8, sys.byteorder))
+        except BlockingIOError:
+            # Already signaled.
+            pass
+
+    def __drain_wakeup(self):
+        """Consume the wakeup and return True if it asked to stop."""
+
+        try:
+            while os.read(self.__wake_read_fd, 8):
+                pass
+        except BlockingIOError:
+            pass
+
+        interrupt_requested = self.__interrupt_requested
+        self.__interrupt_requested = False
+        return interrupt_requested
 
     def _get_watches(self):
         return self.__watches
@@ -95,7 +243,9 @@ class Inotify(object):
         if path_unicode in self.__watches:
             return
 
-        path_bytes = path_unicode.encode('utf8')
+        # Names that are not valid UTF-8 were decoded with surrogateescape
+        # and are encoded back to the original bytes.
+        path_bytes = os.fsencode(path_unicode)
 
         wd = external.PyInotify.inotify.calls.inotify_add_watch(self.__inotify_fd, path_bytes, mask)
         self.__logger.debug("Added watch (%d): [%s]", wd, path_unicode)
@@ -133,30 +283,125 @@ class Inotify(object):
 
             external.PyInotify.inotify.calls.inotify_rm_watch(self.__inotify_fd, wd)
 
-    def remove_watch_and_sub_watches(self, path):
-        watch_found = True
-        while watch_found == True:
-            watch_found = False
-            for watch_path in self.__watches:
-                if watch_path.startswith(path) == True:
-                    self.remove_watch(watch_path, True)
-                    watch_found = True
-                    break
+    def __get_sub_watch_paths(self, path):
+        """Get the watched paths equal to or below `path`. A sibling that
+        only shares the prefix, such as "Show 2" for "Show", is not below it.
+        """
+
+        prefix = path + '/'
+        return [watch_path for watch_path in self.__watches
+                if watch_path == path or watch_path.startswith(prefix)]
+
+    def remove_watch_and_sub_watches(self, path, superficial=True):
+        """Remove our tracking of a path and of every path below it. Set
+        `superficial` to False when the directories still exist, such as
+        after a move out of the tree, so the kernel watches are removed too.
+        """
+
+        for watch_path in self.__get_sub_watch_paths(path):
+            try:
+                self.remove_watch(watch_path, superficial)
+            except external.PyInotify.inotify.calls.InotifyError as e:
+                self.__logger.debug("Watch already removed by the kernel: "
+                                    "[%s] %s", watch_path, e)
+
+    def move_watches(self, old_path, new_path):
+        """Rewrite the tracked paths of a renamed directory and of every path
+        below it. The kernel watches follow the inodes across a rename so no
+        calls are needed. Returns the number of watches moved.
+        """
+
+        moved = [(watch_path, self.__watches.pop(watch_path))
+                 for watch_path in self.__get_sub_watch_paths(old_path)]
+
+        for watch_path, wd in moved:
+            renamed_path = new_path + watch_path[len(old_path):]
+            self.__watches[renamed_path] = wd
+            self.__watches_r[wd] = renamed_path
+
+        self.__logger.debug("Moved (%d) watches: [%s] -> [%s]",
+                            len(moved), old_path, new_path)
+
+        return len(moved)
     
     def _get_event_names(self, event_type):
-        names = []
-        for bit, name in external.PyInotify.inotify.constants.MASK_LOOKUP.items():
-            if event_type & bit:
-                names.append(name)
-                event_type -= bit
+        return _get_event_names(event_type)
+
+    def set_event_filter(self, name_suffixes=(), ignored_path_parts=()):
+        """Drop the events a consumer would ignore before their filename is
+        decoded. Directory and terminal events are always kept. Any other
+        event is kept when it has a filename ending with one of the
+        `name_suffixes` bytes (any filename if empty) and the path of its
+        watch contains none of the `ignored_path_parts`. Applies to
+        event_batch_gen.
+        """
 
-                if event_type == 0:
-                    break
+        self.__event_filter = (tuple(name_suffixes), tuple(ignored_path_parts))
 
-        assert event_type == 0, \
-               "We could not resolve all event-types: (%d)" % (event_type,)
+    def _read_event_batch(self, fd):
+        """Read from the inotify descriptor and decode every complete event
+        in one pass over the buffer. Events rejected by the event filter are
+        dropped on the raw bytes, and the filenames kept are decoded with
+        surrogateescape so a name that is not valid UTF-8 never raises.
+        """
+
+        b = os.read(fd, _READ_SIZE)
+        batch = EventBatch()
+        if not b:
+            return batch
 
-        return names
+        if self.__buffer:
+            buffer = self.__buffer + b
+        else:
+            buffer = b
+
+        unpack_from = _HEADER_STRUCT.unpack_from
+        watches_r = self.__watches_r
+        event_filter = self.__event_filter
+        if event_filter is not None:
+            name_suffixes, ignored_path_parts = event_filter
+
+            # The ignored path parts are checked once per watch in each read.
+            path_valid = {}
+        offset = 0
+        end = len(buffer)
+        count = 0
+        while end - offset >= _STRUCT_HEADER_LENGTH:
+            (wd, mask, cookie, name_length) = unpack_from(buffer, offset)
+            event_end = offset + _STRUCT_HEADER_LENGTH + name_length
+            if event_end > end:
+                break
+
+            # Our filename is 16-byte aligned and right-padded with NULs.
+            filename_bytes = buffer[offset + _STRUCT_HEADER_LENGTH:event_end].rstrip(b'\0')
+            offset = event_end
+            count += 1
+
+            path = watches_r.get(wd)
+            if path is None:
+                continue
+
+            if event_filter is not None and not mask & _FILTER_KEEP_MASK:
+                if not filename_bytes or (name_suffixes and not filename_bytes.endswith(name_suffixes)):
+                    continue
+
+                valid = path_valid.get(wd)
+                if valid is None:
+                    valid = not any(part in path for part in ignored_path_parts)
+                    path_valid[wd] = valid
+                if valid is False:
+                    continue
+
+            batch.wd.append(wd)
+            batch.mask.append(mask)
+            batch.cookie.append(cookie)
+            batch.length.append(name_length)
+            batch.path.append(path)
+            batch.name.append(filename_bytes.decode('utf8', 'surrogateescape'))
+
+        self.__buffer = buffer[offset:]
+        self.__event_count += count
+        return batch
 
     def _handle_inotify_event(self, wd):
         """Handle a series of events coming-in from external.PyInotify.inotify."""
@@ -196,10 +441,11 @@ class Inotify(object):
             filename_bytes = filename.rstrip(b'\0')
 
             self.__buffer = self.__buffer[event_length:]
+            self.__event_count += 1
 
             path = self.__watches_r.get(header.wd)
             if path is not None:
-                filename_unicode = filename_bytes.decode('utf8')
+                filename_unicode = filename_bytes.decode('utf8', 'surrogateescape')
                 yield (header, type_names, path, filename_unicode)
 
             buffer_length = len(self.__buffer)
@@ -237,10 +483,15 @@ class Inotify(object):
 
                 continue
 
+            self.__epoll_wakeup_count += 1
+
             # Process events.
 
+            interrupted = False
             for fd, event_type in events:
-                # (fd) looks to always match the inotify FD.
+                if fd == self.__wake_read_fd:
+                    interrupted = self.__drain_wakeup()
+                    continue
 
                 names = self._get_event_names(event_type)
                 self.__logger.debug("Events received from epoll: {}".format(names))
@@ -260,6 +511,9 @@ class Inotify(object):
 
                     yield e
 
+            if interrupted is True:
+                return
+
             if timeout_s is not None:
                 time_since_event_s = time.time() - last_hit_s
                 if time_since_event_s > timeout_s:
@@ -268,10 +522,89 @@ class Inotify(object):
             if yield_nones is True:
                 yield None
 
+    def event_batch_gen(
+            self, timeout_s=None, yield_empty=False,
+            terminal_events=_DEFAULT_TERMINAL_EVENTS):
+        """Yield an EventBatch of every event decoded from each read, so the
+        per-event overhead of the generators is paid once per read. If
+        `yield_empty` is True an empty batch is yielded when the poll returns
+        without events. If `timeout_s` is provided, we'll break when no event
+        is received for that many seconds.
+        """
+
+        terminal_mask = _get_event_mask(terminal_events)
+
+        last_hit_s = time.time()
+        while True:
+            block_duration_s = self.__get_block_duration()
+
+            try:
+                events = self.__epoll.poll(block_duration_s)
+            except IOError as e:
+                if e.errno != EINTR:
+                    raise
+
+                if timeout_s is not None:
+                    time_since_event_s = time.time() - last_hit_s
+                    if time_since_event_s > timeout_s:
+                        break
+
+                continue
+
+            self.__epoll_wakeup_count += 1
+
+            interrupted = False
+            woken = False
+            batch = None
+            for fd, _event_type in events:
+                if fd == self.__wake_read_fd:
+                    interrupted = self.__drain_wakeup()
+                    woken = True
+                    continue
+
+                batch = self._read_event_batch(fd)
+
+            if batch is not None and len(batch) > 0:
+                last_hit_s = time.time()
+
+                if terminal_mask:
+                    for index, mask in enumerate(batch.mask):
+                        if mask & terminal_mask:
+                            if index > 0:
+                                yield batch.head(index)
+
+                            event = batch.get_event(index)
+                            type_name = _get_event_names(mask & terminal_mask)[0]
+                            raise TerminalEventException(type_name, event)
+
+                yield batch
+            elif yield_empty is True or (woken is True and interrupted is False):
+                yield EventBatch()
+
+            if interrupted is True:
+                return
+
+            if timeout_s is not None:
+                time_since_event_s = time.time() - last_hit_s
+                if time_since_event_s > timeout_s:
+                    break
+
     @property
     def last_success_return(self):
         return self.__last_success_return
 
+    @property
+    def event_count(self):
+        return self.__event_count
+
+    @property
+    def epoll_wakeup_count(self):
+        return self.__epoll_wakeup_count
+
+    @property
+    def watch_count(self):
+        return len(self.__watches)
+
 
 class _BaseTree(object):
     def __init__(self, logger, mask=external.PyInotify.inotify.constants.IN_ALL_EVENTS,
@@ -287,15 +620,95 @@ class _BaseTree(object):
 
         self._i = Inotify(logger, block_duration_s=block_duration_s)
 
-    def _add_watch_and_sub_watches(self, path: str):
-        self._i.add_watch(path, self._mask)
-        for filename in os.listdir(path):
-            entry_filepath = os.path.join(path, filename)
-            if os.path.isdir(entry_filepath) == False:
+        # The cookie and full path of a directory moved from a watched folder
+        # waiting for the IN_MOVED_TO of the same rename.
+        self._moved_from = None
+
+        # Events for the entries found in new directories and not yet yielded.
+        self._synthetic_events = []
+        self._synthetic_event_count = 0
+
+    def _add_watch_and_sub_watches(self, path: str, synthesize_entries=True):
+        """Watch a new directory and every directory below it.
+
+        Each directory is listed only after its watch is active, so anything
+        created in between is either listed or reported by the kernel. An
+        IN_CREATE event is synthesized for every entry listed since it may
+        have appeared before the watch existed, unless synthesize_entries is
+        False. Returns the directories now watched.
+        """
+
+        watched = []
+
+        q = [path]
+        while q:
+            current_path = q.pop()
+
+            try:
+                self._i.add_watch(current_path, self._mask)
+                wd = self._i.get_watch_id(current_path)
+                entries = list(os.scandir(current_path))
+            except (OSError, external.PyInotify.inotify.calls.InotifyError) as e:
+                self.logger.debug("A new directory was removed before it "
+                                  "could be watched: [%s] %s", current_path, e)
                 continue
-            
-            self._i.add_watch(entry_filepath, self._mask)
-        
+
+            if wd is None:
+                continue
+
+            watched.append(current_path)
+
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+
+                if is_dir is True:
+                    q.append(entry.path)
+                    mask = external.PyInotify.inotify.constants.IN_CREATE | \
+                           external.PyInotify.inotify.constants.IN_ISDIR
+                else:
+                    mask = external.PyInotify.inotify.constants.IN_CREATE
+
+                if synthesize_entries is True:
+                    self._synthetic_events.append((wd, mask, current_path, entry.name))
+                    self._synthetic_event_count += 1
+
+        return watched
+
+    def remove_watch_tree(self, path):
+        """Stop watching a directory and every directory below it while
+        they still exist, such as to quiet a directory with too many events.
+        """
+
+        self._i.remove_watch_and_sub_watches(path, superficial=False)
+
+    def add_watch_tree(self, path, synthesize_entries=True):
+        """Watch a directory and every directory below it again. Its entries
+        are reported as synthesized IN_CREATE events with the next batch
+        since they may have changed while it was not watched, unless
+        synthesize_entries is False. Returns the directories now watched.
+
+        Trees on different devices may be added from separate threads
+        before the events are read.
+        """
+
+        return self._add_watch_and_sub_watches(path, synthesize_entries)
+
+    def _pop_synthetic_events(self):
+        """Get the events synthesized for new directories in the form that
+        event_gen yields.
+        """
+
+        events = []
+        for wd, mask, path, filename in self._synthetic_events:
+            header = _INOTIFY_EVENT(wd, mask, 0, 0)
+            events.append((header, _get_event_names(mask), path, filename))
+
+        self._synthetic_events = []
+        return events
+
     def event_gen(self, ignore_missing_new_folders=False, **kwargs):
         """This is a secondary generator that wraps the principal one, and
         adds/removes watches as directories are added/removed.
@@ -308,52 +721,145 @@ class _BaseTree(object):
         for event in self._i.event_gen(**kwargs):
             if event is not None:
                 (header, type_names, path, filename) = event
-
-                if header.mask & external.PyInotify.inotify.constants.IN_ISDIR:
-                    full_path = os.path.join(path, filename)
-
-                    if (
-                        (header.mask & external.PyInotify.inotify.constants.IN_MOVED_TO) or
-                        (header.mask & external.PyInotify.inotify.constants.IN_CREATE)
-                       ) and \
-                       (
-                        os.path.exists(full_path) is True or
-                        ignore_missing_new_folders is False
-                       ):
-                        self.logger.debug("A directory has been created. We're "
-                                      "adding a watch on it (because we're "
-                                      "being recursive): [%s]", full_path)
-
-                        self._add_watch_and_sub_watches(full_path)
-
-                    if header.mask & external.PyInotify.inotify.constants.IN_DELETE:
-                        self.logger.debug("A directory has been removed. We're "
-                                      "being recursive, but it would have "
-                                      "automatically been deregistered: [%s]",
-                                      full_path)
-
-                        # The watch would've already been cleaned-up internally.
-                        self._i.remove_watch_and_sub_watches(full_path)
-                    elif header.mask & external.PyInotify.inotify.constants.IN_MOVED_FROM:
-                        self.logger.debug("A directory has been renamed. We're "
-                                      "being recursive, but it would have "
-                                      "automatically been deregistered: [%s]",
-                                      full_path)
-
-                        self._i.remove_watch_and_sub_watches(full_path)
-                    elif header.mask & external.PyInotify.inotify.constants.IN_MOVED_TO:
-                        self.logger.debug("A directory has been renamed. We're "
-                                      "adding a watch on it (because we're "
-                                      "being recursive): [%s]", full_path)
-
-                        self._add_watch_and_sub_watches(full_path)
+                self._handle_directory_event(
+                    header.mask, header.cookie, path, filename,
+                    ignore_missing_new_folders)
+            elif self._moved_from is not None:
+                self._finish_moved_from()
 
             yield event
 
+            if self._synthetic_events:
+                for synthetic_event in self._pop_synthetic_events():
+                    yield synthetic_event
+
+    def event_batch_gen(self, ignore_missing_new_folders=False, **kwargs):
+        """Like `event_gen` but yields an EventBatch for each read, adding and
+        removing watches for the directory events in the batch before it is
+        yielded. The paths of events later in a batch than a directory
+        rename are rewritten to the new path.
+        """
+
+        is_dir = external.PyInotify.inotify.constants.IN_ISDIR
+        for batch in self._i.event_batch_gen(**kwargs):
+            if len(batch) == 0 and self._moved_from is not None:
+                self._finish_moved_from()
+
+            for index, mask in enumerate(batch.mask):
+                if mask & is_dir or self._moved_from is not None:
+                    renamed = self._handle_directory_event(
+                        mask, batch.cookie[index], batch.path[index],
+                        batch.name[index], ignore_missing_new_folders)
+
+                    if renamed is not None:
+                        self._rename_batch_paths(batch, index + 1, *renamed)
+                        batch.renames.append(renamed)
+
+            # Entries of new directories follow the events of the read.
+            for wd, mask, path, filename in self._synthetic_events:
+                batch.wd.append(wd)
+                batch.mask.append(mask)
+                batch.cookie.append(0)
+                batch.length.append(0)
+                batch.path.append(path)
+                batch.name.append(filename)
+            self._synthetic_events = []
+
+            yield batch
+
+    def _rename_batch_paths(self, batch, start, old_path, new_path):
+        """Rewrite the paths read before a directory rename was handled."""
+
+        prefix = old_path + '/'
+        for index in range(start, len(batch)):
+            path = batch.path[index]
+            if path == old_path or path.startswith(prefix):
+                batch.path[index] = new_path + path[len(old_path):]
+
+    def _finish_moved_from(self):
+        """The directory was moved out of the tree so stop watching it."""
+
+        full_path = self._moved_from[1]
+        self._moved_from = None
+
+        self.logger.debug("A directory has been moved out of the tree. "
+                          "Removing its watches: [%s]", full_path)
+
+        self._i.remove_watch_and_sub_watches(full_path, superficial=False)
+
+    def _handle_directory_event(self, mask, cookie, path, filename, ignore_missing_new_folders):
+        """Add, move or remove the watches for a directory event. Returns the
+        old and new path of a directory renamed inside the tree.
+        """
+
+        # Anything other than the other half of the rename means the
+        # directory left the tree.
+        if self._moved_from is not None and not (
+                mask & external.PyInotify.inotify.constants.IN_MOVED_TO and
+                cookie == self._moved_from[0]):
+            self._finish_moved_from()
+
+        if not mask & external.PyInotify.inotify.constants.IN_ISDIR:
+            return None
+
+        full_path = os.path.join(path, filename)
+
+        if mask & external.PyInotify.inotify.constants.IN_MOVED_FROM:
+            self.logger.debug("A directory has been renamed. Waiting for "
+                          "the other half of the rename: [%s]", full_path)
+
+            self._moved_from = (cookie, full_path)
+            return None
+
+        if mask & external.PyInotify.inotify.constants.IN_MOVED_TO and \
+           self._moved_from is not None:
+            old_path = self._moved_from[1]
+            self._moved_from = None
+
+            self.logger.debug("A directory has been renamed inside the "
+                          "tree. Moving its watches: [%s] -> [%s]",
+                          old_path, full_path)
+
+            # A directory that was not watched, such as one whose watches
+            # were removed on purpose, is watched at its new path.
+            if self._i.move_watches(old_path, full_path) == 0:
+                self._add_watch_and_sub_watches(full_path)
+
+            return (old_path, full_path)
+
+        if (
+            (mask & external.PyInotify.inotify.constants.IN_MOVED_TO) or
+            (mask & external.PyInotify.inotify.constants.IN_CREATE)
+           ) and \
+           (
+            os.path.exists(full_path) is True or
+            ignore_missing_new_folders is False
+           ):
+            self.logger.debug("A directory has been created or moved into "
+                          "the tree. We're adding a watch on it (because "
+                          "we're being recursive): [%s]", full_path)
+
+            self._add_watch_and_sub_watches(full_path)
+
+        if mask & external.PyInotify.inotify.constants.IN_DELETE:
+            self.logger.debug("A directory has been removed. We're "
+                          "being recursive, but it would have "
+                          "automatically been deregistered: [%s]",
+                          full_path)
+
+            # The watch would've already been cleaned-up internally.
+            self._i.remove_watch_and_sub_watches(full_path)
+
+        return None
+
     @property
     def inotify(self):
         return self._i
 
+    @property
+    def synthetic_event_count(self):
+        return self._synthetic_event_count
+
 
 class InotifyTree(_BaseTree):
     """Recursively watch a path."""
@@ -403,19 +909,23 @@ class InotifyTrees(_BaseTree):
 
         found = []
 
-        q = paths
+        # The caller's list is left intact and the entry types come from the
+        # directory listing so only symlinks cost an extra stat.
+        q = collections.deque(paths)
         while q:
-            current_path = q[0]
-            del q[0]
+            current_path = q.popleft()
 
             found.append(current_path)
 
-            for filename in os.listdir(current_path):
-                entry_filepath = os.path.join(current_path, filename)
-                if os.path.isdir(entry_filepath) is False:
-                    continue
+            with os.scandir(current_path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
 
-                q.append(entry_filepath)
+                    if is_dir is True:
+                        q.append(entry.path)
 
 
         for path in found:
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
+import logging
 import os
+import threading
+import time
 import unittest
 
 import external.PyInotify.inotify.constants
@@ -15,6 +18,21 @@ except NameError:
 else:
     _HAS_PYTHON2_UNICODE_SUPPORT = True
 
+_LOGGER = logging.getLogger(__name__)
+
+# The tree adapters list new directories to watch their children, which
+# produces directory read events that are not part of what is being tested.
+_DIRECTORY_READ_MASK = \
+    external.PyInotify.inotify.constants.IN_ACCESS | \
+    external.PyInotify.inotify.constants.IN_OPEN | \
+    external.PyInotify.inotify.constants.IN_CLOSE_NOWRITE
+
+
+def _is_directory_read(event):
+    header = event[0]
+    return (header.mask & external.PyInotify.inotify.constants.IN_ISDIR) != 0 and \
+        (header.mask & _DIRECTORY_READ_MASK) != 0
+
 
 class TestInotify(unittest.TestCase):
     def __init__(self, *args, **kwargs):
@@ -32,7 +50,7 @@ class TestInotify(unittest.TestCase):
             inner_path = os.path.join(path, '新增資料夾')
             os.mkdir(inner_path)
 
-            i = external.PyInotify.inotify.adapters.Inotify()
+            i = external.PyInotify.inotify.adapters.Inotify(_LOGGER)
             i.add_watch(inner_path)
 
             with open(os.path.join(inner_path, 'filename'), 'w'):
@@ -46,7 +64,7 @@ class TestInotify(unittest.TestCase):
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], inner_path, 'filename'),
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
 
     @unittest.skipIf(_HAS_PYTHON2_UNICODE_SUPPORT is False, "Not in Python 2")
     def test__international_naming_python2(self):
@@ -54,7 +72,7 @@ class TestInotify(unittest.TestCase):
             inner_path = os.path.join(unicode(path), u'新增資料夾')
             os.mkdir(inner_path)
 
-            i = external.PyInotify.inotify.adapters.Inotify()
+            i = external.PyInotify.inotify.adapters.Inotify(_LOGGER)
             i.add_watch(inner_path)
 
             with open(os.path.join(inner_path, u'filename料夾'), 'w'):
@@ -68,7 +86,7 @@ class TestInotify(unittest.TestCase):
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], inner_path, u'filename料夾'),
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
 
     def test__cycle(self):
         with external.PyInotify.inotify.test_support.temp_path() as path:
@@ -78,7 +96,7 @@ class TestInotify(unittest.TestCase):
             path2 = os.path.join(path, 'bb')
             os.mkdir(path2)
 
-            i = external.PyInotify.inotify.adapters.Inotify()
+            i = external.PyInotify.inotify.adapters.Inotify(_LOGGER)
             i.add_watch(path1)
 
             with open('ignored_new_file', 'w'):
@@ -121,7 +139,7 @@ class TestInotify(unittest.TestCase):
                 )
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
 
             # This can't be removed until *after* we've read the events because
             # they'll be flushed the moment we remove the watch.
@@ -131,7 +149,7 @@ class TestInotify(unittest.TestCase):
                 pass
 
             events = self.__read_all_events(i)
-            self.assertEquals(events, [])
+            self.assertEqual(events, [])
 
     @staticmethod
     def _open_write_close(*args):
@@ -153,40 +171,40 @@ class TestInotify(unittest.TestCase):
 
     @staticmethod
     def _event_create(wd, path, filename):
-        return Testexternal.PyInotify.inotify._event_general(wd, 256, 'IN_CREATE', path, filename)
+        return TestInotify._event_general(wd, 256, 'IN_CREATE', path, filename)
 
     @staticmethod
     def _event_open(wd, path, filename):
-        return Testexternal.PyInotify.inotify._event_general(wd, 32, 'IN_OPEN', path, filename)
+        return TestInotify._event_general(wd, 32, 'IN_OPEN', path, filename)
 
     @staticmethod
     def _event_close_write(wd, path, filename):
-        return Testexternal.PyInotify.inotify._event_general(wd, 8, 'IN_CLOSE_WRITE', path, filename)
+        return TestInotify._event_general(wd, 8, 'IN_CLOSE_WRITE', path, filename)
 
     def test__watch_list_of_paths(self):
         with external.PyInotify.inotify.test_support.temp_path() as path:
-            path1 = Testexternal.PyInotify.inotify._make_temp_path(path, 'aa')
-            path2 = Testexternal.PyInotify.inotify._make_temp_path(path, 'bb')
-            i = external.PyInotify.inotify.adapters.Inotify([path1, path2])
-            Testexternal.PyInotify.inotify._open_write_close('ignored_new_file')
-            Testexternal.PyInotify.inotify._open_write_close(path1, 'seen_new_file')
-            Testexternal.PyInotify.inotify._open_write_close(path2, 'seen_new_file2')
+            path1 = TestInotify._make_temp_path(path, 'aa')
+            path2 = TestInotify._make_temp_path(path, 'bb')
+            i = external.PyInotify.inotify.adapters.Inotify(_LOGGER, [path1, path2])
+            TestInotify._open_write_close('ignored_new_file')
+            TestInotify._open_write_close(path1, 'seen_new_file')
+            TestInotify._open_write_close(path2, 'seen_new_file2')
             os.remove(os.path.join(path1, 'seen_new_file'))
             events = self.__read_all_events(i)
             expected = [
-                Testexternal.PyInotify.inotify._event_create(wd=1, path=path1, filename='seen_new_file'),
-                Testexternal.PyInotify.inotify._event_open(wd=1, path=path1, filename='seen_new_file'),
-                Testexternal.PyInotify.inotify._event_close_write(wd=1, path=path1, filename='seen_new_file'),
-                Testexternal.PyInotify.inotify._event_create(wd=2, path=path2, filename='seen_new_file2'),
-                Testexternal.PyInotify.inotify._event_open(wd=2, path=path2, filename='seen_new_file2'),
-                Testexternal.PyInotify.inotify._event_close_write(wd=2, path=path2, filename='seen_new_file2'),
-                Testexternal.PyInotify.inotify._event_general(wd=1, mask=512, type_name='IN_DELETE',
+                TestInotify._event_create(wd=1, path=path1, filename='seen_new_file'),
+                TestInotify._event_open(wd=1, path=path1, filename='seen_new_file'),
+                TestInotify._event_close_write(wd=1, path=path1, filename='seen_new_file'),
+                TestInotify._event_create(wd=2, path=path2, filename='seen_new_file2'),
+                TestInotify._event_open(wd=2, path=path2, filename='seen_new_file2'),
+                TestInotify._event_close_write(wd=2, path=path2, filename='seen_new_file2'),
+                TestInotify._event_general(wd=1, mask=512, type_name='IN_DELETE',
                                            path=path1, filename='seen_new_file')
             ]
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
 
     def test__error_on_watch_nonexistent_folder(self):
-        i = external.PyInotify.inotify.adapters.Inotify()
+        i = external.PyInotify.inotify.adapters.Inotify(_LOGGER)
         with self.assertRaises(external.PyInotify.inotify.calls.InotifyError):
             i.add_watch('/dev/null/foo')
 
@@ -198,10 +216,90 @@ class TestInotify(unittest.TestCase):
         all_names = external.PyInotify.inotify.constants.MASK_LOOKUP.values()
         all_names = list(all_names)
 
-        i = external.PyInotify.inotify.adapters.Inotify()
+        i = external.PyInotify.inotify.adapters.Inotify(_LOGGER)
         names = i._get_event_names(all_mask)
 
-        self.assertEquals(names, all_names)
+        self.assertEqual(names, all_names)
+
+    def test__interrupt_unblocks_event_gen(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            i = external.PyInotify.inotify.adapters.Inotify(_LOGGER, block_duration_s=None)
+            i.add_watch(path)
+
+            timer = threading.Timer(0.1, i.interrupt)
+            timer.start()
+
+            start_time = time.time()
+            events = list(i.event_gen(yield_nones=False))
+            timer.join()
+
+            self.assertEqual(events, [])
+            self.assertLess(time.time() - start_time, 5)
+            self.assertEqual(i.epoll_wakeup_count, 1)
+
+    def test__interrupt_before_event_gen(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            i = external.PyInotify.inotify.adapters.Inotify(_LOGGER, block_duration_s=None)
+            i.add_watch(path)
+            i.interrupt()
+
+            with open(os.path.join(path, 'seen_new_file'), 'w'):
+                pass
+
+            events = list(i.event_gen(yield_nones=False))
+            names = [type_names for (_, type_names, _, _) in events]
+
+            self.assertEqual(names, [['IN_CREATE'], ['IN_OPEN'], ['IN_CLOSE_WRITE']])
+
+    def test__event_batch_gen(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            i = external.PyInotify.inotify.adapters.Inotify(_LOGGER)
+            i.add_watch(path)
+
+            with open(os.path.join(path, 'seen_new_file'), 'w'):
+                pass
+
+            batches = list(i.event_batch_gen(timeout_s=1))
+            events = [event for batch in batches for event in batch.get_events()]
+
+            expected = [
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=256, cookie=0, len=16), ['IN_CREATE'], path, 'seen_new_file'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=32, cookie=0, len=16), ['IN_OPEN'], path, 'seen_new_file'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path, 'seen_new_file'),
+            ]
+
+            self.assertEqual(events, expected)
+            self.assertEqual(len(batches), 1)
+            self.assertEqual(batches[0].name, ['seen_new_file'] * 3)
+
+    def test__event_filter_drops_events_before_decoding(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            ignored_path = os.path.join(path, 'incomplete')
+            os.mkdir(ignored_path)
+
+            i = external.PyInotify.inotify.adapters.Inotify(_LOGGER)
+            i.add_watch(path, external.PyInotify.inotify.constants.IN_CREATE)
+            i.add_watch(ignored_path, external.PyInotify.inotify.constants.IN_CREATE)
+            i.set_event_filter((b'.mkv',), ('incomplete',))
+
+            # A name that is not valid UTF-8 is kept and decoded with surrogateescape
+            path_bytes = os.fsencode(path)
+            with open(path_bytes + b'/caf\xe9.mkv', 'w'):
+                pass
+            with open(os.path.join(path, 'movie.nfo'), 'w'):
+                pass
+            with open(os.path.join(ignored_path, 'part.mkv'), 'w'):
+                pass
+            os.mkdir(os.path.join(path, 'folder'))
+
+            events = [event for batch in i.event_batch_gen(timeout_s=1) for event in batch.get_events()]
+            self.assertEqual(
+                [(event[1], event[2], event[3]) for event in events],
+                [
+                    (['IN_CREATE'], path, 'caf\udce9.mkv'),
+                    (['IN_CREATE', 'IN_ISDIR'], path, 'folder'),
+                ])
+            self.assertEqual(i.event_count, 4)
 
 
 class TestInotifyTree(unittest.TestCase):
@@ -212,7 +310,7 @@ class TestInotifyTree(unittest.TestCase):
 
     def __read_all_events(self, i):
         events = list(i.event_gen(timeout_s=1, yield_nones=False))
-        return events
+        return [event for event in events if _is_directory_read(event) is False]
 
     def test__cycle(self):
         with external.PyInotify.inotify.test_support.temp_path() as path:
@@ -222,7 +320,9 @@ class TestInotifyTree(unittest.TestCase):
             path2 = os.path.join(path, 'bb')
             os.mkdir(path2)
 
-            i = external.PyInotify.inotify.adapters.InotifyTree(path)
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, path)
+            wd1 = i.inotify.get_watch_id(path1)
+            wd2 = i.inotify.get_watch_id(path2)
 
             with open('seen_new_file1', 'w'):
                 pass
@@ -247,28 +347,28 @@ class TestInotifyTree(unittest.TestCase):
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=32, cookie=0, len=16), ['IN_OPEN'], path, 'seen_new_file1'),
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path, 'seen_new_file1'),
 
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=256, cookie=0, len=16), ['IN_CREATE'], path1, 'seen_new_file2'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=32, cookie=0, len=16), ['IN_OPEN'], path1, 'seen_new_file2'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path1, 'seen_new_file2'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd1, mask=256, cookie=0, len=16), ['IN_CREATE'], path1, 'seen_new_file2'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd1, mask=32, cookie=0, len=16), ['IN_OPEN'], path1, 'seen_new_file2'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd1, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path1, 'seen_new_file2'),
 
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=256, cookie=0, len=16), ['IN_CREATE'], path2, 'seen_new_file3'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=32, cookie=0, len=16), ['IN_OPEN'], path2, 'seen_new_file3'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path2, 'seen_new_file3'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd2, mask=256, cookie=0, len=16), ['IN_CREATE'], path2, 'seen_new_file3'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd2, mask=32, cookie=0, len=16), ['IN_OPEN'], path2, 'seen_new_file3'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd2, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path2, 'seen_new_file3'),
 
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=512, cookie=0, len=16), ['IN_DELETE'], path, 'seen_new_file1'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=512, cookie=0, len=16), ['IN_DELETE'], path1, 'seen_new_file2'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=512, cookie=0, len=16), ['IN_DELETE'], path2, 'seen_new_file3'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd1, mask=512, cookie=0, len=16), ['IN_DELETE'], path1, 'seen_new_file2'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd2, mask=512, cookie=0, len=16), ['IN_DELETE'], path2, 'seen_new_file3'),
 
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=1024, cookie=0, len=0), ['IN_DELETE_SELF'], path1, ''),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=32768, cookie=0, len=0), ['IN_IGNORED'], path1, ''),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742336, cookie=0, len=16), ['IN_ISDIR', 'IN_DELETE'], path, 'aa'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd1, mask=1024, cookie=0, len=0), ['IN_DELETE_SELF'], path1, ''),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd1, mask=32768, cookie=0, len=0), ['IN_IGNORED'], path1, ''),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742336, cookie=0, len=16), ['IN_DELETE', 'IN_ISDIR'], path, 'aa'),
 
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=1024, cookie=0, len=0), ['IN_DELETE_SELF'], path2, ''),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=32768, cookie=0, len=0), ['IN_IGNORED'], path2, ''),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742336, cookie=0, len=16), ['IN_ISDIR', 'IN_DELETE'], path, 'bb'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd2, mask=1024, cookie=0, len=0), ['IN_DELETE_SELF'], path2, ''),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=wd2, mask=32768, cookie=0, len=0), ['IN_IGNORED'], path2, ''),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742336, cookie=0, len=16), ['IN_DELETE', 'IN_ISDIR'], path, 'bb'),
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
 
     def test__renames(self):
 
@@ -277,7 +377,7 @@ class TestInotifyTree(unittest.TestCase):
         # group things in order to check things first before such operations.
 
         with external.PyInotify.inotify.test_support.temp_path() as path:
-            i = external.PyInotify.inotify.adapters.InotifyTree(path)
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, path)
 
             old_path = os.path.join(path, 'old_folder')
             new_path = os.path.join(path, 'new_folder')
@@ -287,10 +387,10 @@ class TestInotifyTree(unittest.TestCase):
             events1 = self.__read_all_events(i)
 
             expected = [
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742080, cookie=events1[0][0].cookie, len=16), ['IN_ISDIR', 'IN_CREATE'], path, 'old_folder'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742080, cookie=events1[0][0].cookie, len=16), ['IN_CREATE', 'IN_ISDIR'], path, 'old_folder'),
             ]
 
-            self.assertEquals(events1, expected)
+            self.assertEqual(events1, expected)
 
 
             os.rename(old_path, new_path)
@@ -300,9 +400,10 @@ class TestInotifyTree(unittest.TestCase):
             expected = [
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073741888, cookie=events2[0][0].cookie, len=16), ['IN_MOVED_FROM', 'IN_ISDIR'], path, 'old_folder'),
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073741952, cookie=events2[1][0].cookie, len=16), ['IN_MOVED_TO', 'IN_ISDIR'], path, 'new_folder'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=2048, cookie=0, len=0), ['IN_MOVE_SELF'], new_path, ''),
             ]
 
-            self.assertEquals(events2, expected)
+            self.assertEqual(events2, expected)
 
 
             with open(os.path.join(new_path, 'old_filename'), 'w'):
@@ -318,21 +419,21 @@ class TestInotifyTree(unittest.TestCase):
             events3 = self.__read_all_events(i)
 
             expected = [
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=256, cookie=0, len=16), ['IN_CREATE'], new_path, 'old_filename'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=32, cookie=0, len=16), ['IN_OPEN'], new_path, 'old_filename'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], new_path, 'old_filename'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=256, cookie=0, len=16), ['IN_CREATE'], new_path, 'old_filename'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=32, cookie=0, len=16), ['IN_OPEN'], new_path, 'old_filename'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], new_path, 'old_filename'),
 
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=64, cookie=events3[3][0].cookie, len=16), ['IN_MOVED_FROM'], new_path, 'old_filename'),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=128, cookie=events3[4][0].cookie, len=16), ['IN_MOVED_TO'], new_path, 'new_filename'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=64, cookie=events3[3][0].cookie, len=16), ['IN_MOVED_FROM'], new_path, 'old_filename'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=128, cookie=events3[4][0].cookie, len=16), ['IN_MOVED_TO'], new_path, 'new_filename'),
 
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=512, cookie=0, len=16), ['IN_DELETE'], new_path, 'new_filename'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=512, cookie=0, len=16), ['IN_DELETE'], new_path, 'new_filename'),
 
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=1024, cookie=0, len=0), ['IN_DELETE_SELF'], new_path, ''),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=32768, cookie=0, len=0), ['IN_IGNORED'], new_path, ''),
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742336, cookie=0, len=16), ['IN_ISDIR', 'IN_DELETE'], path, 'new_folder'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=1024, cookie=0, len=0), ['IN_DELETE_SELF'], new_path, ''),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=32768, cookie=0, len=0), ['IN_IGNORED'], new_path, ''),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742336, cookie=0, len=16), ['IN_DELETE', 'IN_ISDIR'], path, 'new_folder'),
             ]
 
-            self.assertEquals(events3, expected)
+            self.assertEqual(events3, expected)
 
     def test__automatic_new_watches_on_new_paths(self):
 
@@ -340,7 +441,7 @@ class TestInotifyTree(unittest.TestCase):
         # created.
 
         with external.PyInotify.inotify.test_support.temp_path() as path:
-            i = external.PyInotify.inotify.adapters.InotifyTree(path)
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, path)
 
             path1 = os.path.join(path, 'folder1')
             path2 = os.path.join(path1, 'folder2')
@@ -350,10 +451,10 @@ class TestInotifyTree(unittest.TestCase):
             events = self.__read_all_events(i)
 
             expected = [
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742080, cookie=0, len=16), ['IN_ISDIR', 'IN_CREATE'], path, 'folder1'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=1, mask=1073742080, cookie=0, len=16), ['IN_CREATE', 'IN_ISDIR'], path, 'folder1'),
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
 
 
             os.mkdir(path2)
@@ -361,10 +462,10 @@ class TestInotifyTree(unittest.TestCase):
             events = self.__read_all_events(i)
 
             expected = [
-                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=1073742080, cookie=0, len=16), ['IN_ISDIR', 'IN_CREATE'], path1, 'folder2'),
+                (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=1073742080, cookie=0, len=16), ['IN_CREATE', 'IN_ISDIR'], path1, 'folder2'),
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
 
 
             with open(os.path.join(path2,'filename'), 'w'):
@@ -378,7 +479,205 @@ class TestInotifyTree(unittest.TestCase):
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path2, 'filename'),
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
+
+    def test__rename_moves_watches_in_place(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            show_path = os.path.join(path, 'Show')
+            season_path = os.path.join(show_path, 'Season 01')
+            sibling_path = os.path.join(path, 'Show 2')
+            os.makedirs(season_path)
+            os.mkdir(sibling_path)
+
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, path)
+            show_wd = i.inotify.get_watch_id(show_path)
+            season_wd = i.inotify.get_watch_id(season_path)
+            sibling_wd = i.inotify.get_watch_id(sibling_path)
+
+            renamed_path = os.path.join(path, 'Renamed')
+            os.rename(show_path, renamed_path)
+            self.__read_all_events(i)
+
+            watches = i.inotify._get_watches()
+            self.assertEqual(watches.get(renamed_path), show_wd)
+            self.assertEqual(watches.get(os.path.join(renamed_path, 'Season 01')), season_wd)
+            self.assertEqual(watches.get(sibling_path), sibling_wd)
+            self.assertNotIn(show_path, watches)
+            self.assertNotIn(season_path, watches)
+
+            with open(os.path.join(renamed_path, 'Season 01', 'seen_new_file'), 'w'):
+                pass
+
+            events = self.__read_all_events(i)
+            self.assertEqual(
+                [(event[2], event[3]) for event in events if 'IN_CREATE' in event[1]],
+                [(os.path.join(renamed_path, 'Season 01'), 'seen_new_file')])
+
+    def test__move_out_of_tree_removes_watches(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            tree_path = os.path.join(path, 'tree')
+            show_path = os.path.join(tree_path, 'Show')
+            sibling_path = os.path.join(tree_path, 'Show 2')
+            os.makedirs(os.path.join(show_path, 'Season 01'))
+            os.mkdir(sibling_path)
+
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, tree_path)
+
+            os.rename(show_path, os.path.join(path, 'Show'))
+            with open(os.path.join(sibling_path, 'seen_new_file'), 'w'):
+                pass
+            self.__read_all_events(i)
+
+            watches = i.inotify._get_watches()
+            self.assertNotIn(show_path, watches)
+            self.assertNotIn(os.path.join(show_path, 'Season 01'), watches)
+            self.assertIn(sibling_path, watches)
+
+    def test__event_batch_gen_rewrites_renamed_paths(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            old_path = os.path.join(path, 'old_folder')
+            new_path = os.path.join(path, 'new_folder')
+            os.mkdir(old_path)
+
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, path)
+
+            os.rename(old_path, new_path)
+
+            events = [event for batch in i.event_batch_gen(timeout_s=1) for event in batch.get_events()]
+            self.assertEqual(
+                [(event[1], event[2], event[3]) for event in events],
+                [
+                    (['IN_MOVED_FROM', 'IN_ISDIR'], path, 'old_folder'),
+                    (['IN_MOVED_TO', 'IN_ISDIR'], path, 'new_folder'),
+                    (['IN_MOVE_SELF'], new_path, ''),
+                ])
+
+    def test__moved_in_tree_is_watched_recursively(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            tree_path = os.path.join(path, 'tree')
+            os.mkdir(tree_path)
+
+            outside_path = os.path.join(path, 'Show')
+            season_path = os.path.join(outside_path, 'Season 01')
+            os.makedirs(season_path)
+            with open(os.path.join(season_path, 'episode.mkv'), 'w'):
+                pass
+
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, tree_path)
+
+            show_path = os.path.join(tree_path, 'Show')
+            os.rename(outside_path, show_path)
+
+            events = self.__read_all_events(i)
+            new_season_path = os.path.join(show_path, 'Season 01')
+
+            self.assertIsNotNone(i.inotify.get_watch_id(new_season_path))
+            self.assertEqual(
+                [(event[1], event[2], event[3]) for event in events],
+                [
+                    (['IN_MOVED_TO', 'IN_ISDIR'], tree_path, 'Show'),
+                    (['IN_CREATE', 'IN_ISDIR'], show_path, 'Season 01'),
+                    (['IN_CREATE'], new_season_path, 'episode.mkv'),
+                ])
+            self.assertEqual(i.synthetic_event_count, 2)
+
+    def test__removed_watch_tree_is_restored_with_its_entries(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            hot_path = os.path.join(path, 'incomplete')
+            sub_path = os.path.join(hot_path, 'download')
+            os.makedirs(sub_path)
+
+            i = external.PyInotify.inotify.adapters.InotifyTree(
+                _LOGGER, path, mask=external.PyInotify.inotify.constants.IN_CREATE, block_duration_s=None)
+            i.remove_watch_tree(hot_path)
+            self.assertIsNone(i.inotify.get_watch_id(sub_path))
+
+            with open(os.path.join(sub_path, 'part.mkv'), 'w'):
+                pass
+
+            i.add_watch_tree(hot_path)
+            self.assertIsNotNone(i.inotify.get_watch_id(sub_path))
+
+            # A wakeup yields the synthesized entries without stopping the generator
+            i.inotify.wakeup()
+            batch = next(i.event_batch_gen())
+            self.assertEqual(
+                [(event[1], event[2], event[3]) for event in batch.get_events()],
+                [
+                    (['IN_CREATE', 'IN_ISDIR'], hot_path, 'download'),
+                    (['IN_CREATE'], sub_path, 'part.mkv'),
+                ])
+
+    def test__renamed_unwatched_tree_is_watched_at_its_new_path(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            hot_path = os.path.join(path, 'incomplete')
+            os.makedirs(os.path.join(hot_path, 'download'))
+
+            i = external.PyInotify.inotify.adapters.InotifyTree(
+                _LOGGER, path, block_duration_s=None)
+            i.remove_watch_tree(hot_path)
+
+            renamed_path = os.path.join(path, 'complete')
+            os.rename(hot_path, renamed_path)
+            i.inotify.wakeup()
+            batch = next(i.event_batch_gen())
+
+            self.assertEqual(batch.renames, [(hot_path, renamed_path)])
+            self.assertIsNotNone(i.inotify.get_watch_id(renamed_path))
+            self.assertIsNotNone(i.inotify.get_watch_id(os.path.join(renamed_path, 'download')))
+            self.assertIsNone(i.inotify.get_watch_id(hot_path))
+            self.assertIn(
+                (['IN_CREATE', 'IN_ISDIR'], renamed_path, 'download'),
+                [(event[1], event[2], event[3]) for event in batch.get_events()])
+
+    def test__watch_tree_added_later_without_synthesized_entries(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            movies_path = os.path.join(path, 'Movies')
+            sub_path = os.path.join(movies_path, 'Film (2020)')
+            os.makedirs(sub_path)
+            with open(os.path.join(sub_path, 'film.mkv'), 'w'):
+                pass
+
+            i = external.PyInotify.inotify.adapters.InotifyTrees(
+                _LOGGER, [], mask=external.PyInotify.inotify.constants.IN_CREATE, block_duration_s=None)
+
+            watched = i.add_watch_tree(movies_path, synthesize_entries=False)
+            self.assertEqual(sorted(watched), [movies_path, sub_path])
+            self.assertIsNotNone(i.inotify.get_watch_id(sub_path))
+
+            # Only the changes made after the watch was added are reported
+            with open(os.path.join(sub_path, 'new.mkv'), 'w'):
+                pass
+
+            batch = next(i.event_batch_gen())
+            self.assertEqual(
+                [(event[1], event[2], event[3]) for event in batch.get_events()],
+                [
+                    (['IN_CREATE'], sub_path, 'new.mkv'),
+                ])
+
+    def test__event_batch_gen_adds_new_watches(self):
+        with external.PyInotify.inotify.test_support.temp_path() as path:
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, path)
+
+            path1 = os.path.join(path, 'folder1')
+            os.mkdir(path1)
+
+            events = [event for batch in i.event_batch_gen(timeout_s=1) for event in batch.get_events()]
+            self.assertIn((path, 'folder1'), [(event[2], event[3]) for event in events])
+            self.assertIsNotNone(i.inotify.get_watch_id(path1))
+
+            with open(os.path.join(path1, 'seen_new_file'), 'w'):
+                pass
+
+            events = [event for batch in i.event_batch_gen(timeout_s=1) for event in batch.get_events()]
+            self.assertEqual(
+                [(event[1], event[2], event[3]) for event in events],
+                [
+                    (['IN_CREATE'], path1, 'seen_new_file'),
+                    (['IN_OPEN'], path1, 'seen_new_file'),
+                    (['IN_CLOSE_WRITE'], path1, 'seen_new_file'),
+                ])
 
     def test__automatic_new_watches_on_existing_paths(self):
 
@@ -392,7 +691,7 @@ class TestInotifyTree(unittest.TestCase):
             os.mkdir(path1)
             os.mkdir(path2)
 
-            i = external.PyInotify.inotify.adapters.InotifyTree(path)
+            i = external.PyInotify.inotify.adapters.InotifyTree(_LOGGER, path)
 
             with open(os.path.join(path2,'filename'), 'w'):
                 pass
@@ -405,7 +704,7 @@ class TestInotifyTree(unittest.TestCase):
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=3, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path2, 'filename'),
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
 
 
 class TestInotifyTrees(unittest.TestCase):
@@ -416,7 +715,7 @@ class TestInotifyTrees(unittest.TestCase):
 
     def __read_all_events(self, i):
         events = list(i.event_gen(timeout_s=1, yield_nones=False))
-        return events
+        return [event for event in events if _is_directory_read(event) is False]
 
     def test__cycle(self):
         with external.PyInotify.inotify.test_support.temp_path() as path:
@@ -426,7 +725,7 @@ class TestInotifyTrees(unittest.TestCase):
             path2 = os.path.join(path, 'bb')
             os.mkdir(path2)
 
-            i = external.PyInotify.inotify.adapters.InotifyTrees([path1, path2])
+            i = external.PyInotify.inotify.adapters.InotifyTrees(_LOGGER, [path1, path2])
 
             with open(os.path.join(path1, 'seen_new_file1'), 'w'):
                 pass
@@ -446,4 +745,4 @@ class TestInotifyTrees(unittest.TestCase):
                 (external.PyInotify.inotify.adapters._INOTIFY_EVENT(wd=2, mask=8, cookie=0, len=16), ['IN_CLOSE_WRITE'], path2, 'seen_new_file2'),
             ]
 
-            self.assertEquals(events, expected)
+            self.assertEqual(events, expected)
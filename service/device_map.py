@@ -0,0 +1,149 @@
+""" Backing devices of the watched folders read without touching the disks """
+
+import os
+import re
+from dataclasses import dataclass, field
+
+# Mount table of the process and the sysfs folders describing the block devices
+MOUNTINFO_PATH: str = "/proc/self/mountinfo"
+SYS_DEV_BLOCK_PATH: str = "/sys/dev/block"
+SYS_BLOCK_PATH: str = "/sys/block"
+
+
+@dataclass
+class MountDevice:
+    """Structure for holding the device of a mount point. """
+    mount_point: str
+    device: int
+
+
+@dataclass
+class DeferredDevice:
+    """Structure for holding a sleeping disk whose folders are walked once it wakes. """
+    disk: str
+    io_count: int
+    defer_time: float
+    roots: list[tuple[str, str]] = field(default_factory=list)
+
+
+def read_mounts(mountinfo_path: str = MOUNTINFO_PATH) -> list[MountDevice]:
+    """
+    Reads the mount points and their devices from a mountinfo file.
+
+    Args:
+        mountinfo_path (str): The mountinfo file to read.
+
+    Returns:
+        list[MountDevice]: The mount points ordered from the longest so the first match of a folder is its mount.
+    """
+    mounts: list[MountDevice] = []
+    with open(mountinfo_path, "r", encoding="utf-8") as mountinfo_file:
+        for line in mountinfo_file:
+            fields = line.split()
+            if len(fields) < 5 or ":" not in fields[2]:
+                continue
+            major, minor = fields[2].split(":", 1)
+            # Spaces and other separators in the mount point are octal escaped
+            mount_point = re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), fields[4])
+            mounts.append(MountDevice(mount_point.rstrip("/") or "/", os.makedev(int(major), int(minor))))
+    # A later mount on the same mount point hides the earlier one
+    mounts.reverse()
+    mounts.sort(key=lambda mount: len(mount.mount_point), reverse=True)
+    return mounts
+
+
+class DeviceMap:
+    """
+    Maps folders to the devices backing them.
+
+    The device of a folder is found from the longest mount point containing
+    it in the mount table, so grouping the scan paths never reads a sleeping
+    disk. A folder outside every mount falls back to the st_dev of a stat.
+    The disk of a device and its I/O counters are read from sysfs, which is
+    also answered without waking the disk.
+    """
+
+    def __init__(self, mountinfo_path: str = MOUNTINFO_PATH):
+        """
+        Initializes the DeviceMap.
+
+        Args:
+            mountinfo_path (str): The mountinfo file to read the mount points from.
+        """
+        self.mounts: list[MountDevice] = []
+        try:
+            self.mounts = read_mounts(mountinfo_path)
+        except (OSError, ValueError):
+            pass
+
+    def get_device(self, path: str) -> int:
+        """
+        Returns the device backing a folder.
+
+        Args:
+            path (str): The folder.
+
+        Returns:
+            int: The device in the st_dev format, 0 if it is unknown.
+        """
+        for mount in self.mounts:
+            if (
+                mount.mount_point == "/"
+                or path == mount.mount_point
+                or path.startswith(f"{mount.mount_point}/")
+            ):
+                return mount.device
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            return 0
+
+    def group_paths(self, paths: list[str]) -> dict[int, list[str]]:
+        """
+        Groups folders by the device backing them.
+
+        Args:
+            paths (list[str]): The folders.
+
+        Returns:
+            dict[int, list[str]]: The folders of each device in the order given.
+        """
+        groups: dict[int, list[str]] = {}
+        for path in paths:
+            groups.setdefault(self.get_device(path), []).append(path)
+        return groups
+
+    def get_disk(self, device: int) -> str:
+        """
+        Returns the disk of a device, the disk holding it for a partition.
+
+        Args:
+            device (int): The device in the st_dev format.
+
+        Returns:
+            str: The disk name such as sdb, None if the device is not a block device.
+        """
+        sys_path = os.path.join(SYS_DEV_BLOCK_PATH, f"{os.major(device)}:{os.minor(device)}")
+        if not os.path.exists(sys_path):
+            return None
+        real_path = os.path.realpath(sys_path)
+        if os.path.exists(os.path.join(real_path, "partition")):
+            return os.path.basename(os.path.dirname(real_path))
+        return os.path.basename(real_path)
+
+    def get_rotational(self, disk: str) -> bool:
+        """ Get if a disk spins and so can be spun down """
+        try:
+            with open(os.path.join(SYS_BLOCK_PATH, disk, "queue", "rotational"), "r", encoding="utf-8") as rotational_file:
+                return rotational_file.read().strip() == "1"
+        except OSError:
+            return False
+
+    def get_io_count(self, disk: str) -> int:
+        """ Get the reads and writes completed by a disk or -1 if they can not be read """
+        try:
+            with open(os.path.join(SYS_BLOCK_PATH, disk, "stat"), "r", encoding="utf-8") as stat_file:
+                fields = stat_file.read().split()
+            return int(fields[0]) + int(fields[4])
+        except (OSError, IndexError, ValueError):
+            return -1
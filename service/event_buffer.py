@@ -0,0 +1,93 @@
+""" Bounded buffer between the inotify readers and the event processing """
+
+import threading
+from collections import deque
+
+from service.scan_filter import ScanFilter
+
+
+class EventBuffer:
+    """
+    Bounded buffer of event batches read from inotify.
+
+    Readers only drain the inotify descriptor into the buffer so a slow
+    processing stage never leaves the kernel queue to overflow. The buffer
+    never blocks a reader. Once max_events are buffered further events are
+    filtered and coalesced to one entry per scan and folder, which keeps the
+    memory bounded by the number of changed folders while losing nothing a
+    monitor needs.
+    """
+
+    def __init__(self, max_events: int, scan_filter: ScanFilter):
+        """
+        Initializes the EventBuffer.
+
+        Args:
+            max_events (int): Events buffered before new events are coalesced per folder.
+            scan_filter (ScanFilter): Filter applied to events before they are coalesced.
+        """
+        self.max_events = max_events
+        self.scan_filter = scan_filter
+        self.condition = threading.Condition()
+        self.batches: deque[tuple[str, list[str], list[str]]] = deque()
+        self.overflow_folders: dict[str, dict[str, str]] = {}
+        self.closed: bool = False
+
+        # Statistics read by the metrics
+        self.event_count: int = 0
+        self.high_water_mark: int = 0
+        self.coalesced_count: int = 0
+
+    def put(self, scan_name: str, paths: list[str], filenames: list[str]):
+        """
+        Adds a batch of events read for a scan.
+
+        Args:
+            scan_name (str): The name of the scan the events belong to.
+            paths (list[str]): The folder of each event.
+            filenames (list[str]): The changed file of each event.
+        """
+        if len(paths) == 0:
+            return
+
+        with self.condition:
+            if self.event_count + len(paths) <= self.max_events:
+                self.batches.append((scan_name, paths, filenames))
+                self.event_count += len(paths)
+                self.high_water_mark = max(self.high_water_mark, self.event_count)
+            else:
+                folders = self.overflow_folders.setdefault(scan_name, {})
+                # The first change of each folder is the one kept
+                for path, filename in self.scan_filter.filter_events(paths, filenames):
+                    folders.setdefault(path, filename)
+                self.coalesced_count += len(paths)
+            self.condition.notify()
+
+    def get(self) -> list[tuple[str, list[str], list[str]]]:
+        """
+        Waits for and removes every buffered batch.
+
+        Returns:
+            list[tuple[str, list[str], list[str]]]: The scan name, folders and filenames of each batch. None once the buffer is closed and empty.
+        """
+        with self.condition:
+            while len(self.batches) == 0 and len(self.overflow_folders) == 0 and not self.closed:
+                self.condition.wait()
+
+            batches = list(self.batches)
+            for scan_name, folders in self.overflow_folders.items():
+                batches.append((scan_name, list(folders), list(folders.values())))
+
+            if len(batches) == 0:
+                return None
+
+            self.batches.clear()
+            self.overflow_folders = {}
+            self.event_count = 0
+            return batches
+
+    def close(self):
+        """ Wake the processing stage so it returns once the buffer is empty """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
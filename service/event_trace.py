@@ -0,0 +1,146 @@
+""" Event trace recording and reading for replaying event storms """
+
+import gzip
+import threading
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+TRACE_HEADER: str = "remotescan-trace 1"
+
+
+@dataclass
+class TraceEvent:
+    """Structure for holding a recorded event. """
+    time: float
+    scan_name: str
+    path: str
+    filename: str
+
+
+def _escape(value: str) -> str:
+    """ Escape the separators used in the trace file """
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def _unescape(value: str) -> str:
+    """ Reverse the escaping of a trace file field """
+    result: list[str] = []
+    index = 0
+    while index < len(value):
+        character = value[index]
+        if character == "\\" and index + 1 < len(value):
+            index += 1
+            character = {"t": "\t", "n": "\n"}.get(value[index], value[index])
+        result.append(character)
+        index += 1
+    return "".join(result)
+
+
+class EventTraceRecorder:
+    """
+    Writes the filtered event stream to a gzip compressed trace file.
+
+    Scan names and folders are written once and referenced by id, and event
+    times are stored in milliseconds relative to the previous event, so a
+    storm of events in the same folders costs a few bytes per event.
+    """
+
+    def __init__(self, trace_path: str):
+        """
+        Initializes the EventTraceRecorder and opens the trace file.
+
+        Args:
+            trace_path (str): The file to write the trace to.
+        """
+        self.trace_path = trace_path
+        # Names that are not valid UTF-8 are decoded with surrogateescape and written back as their bytes
+        self.file = gzip.open(trace_path, "wt", encoding="utf-8", errors="surrogateescape", newline="\n")
+        self.file.write(f"{TRACE_HEADER}\n")
+        self.lock = threading.Lock()
+        self.scan_ids: dict[str, int] = {}
+        self.path_ids: dict[str, int] = {}
+        self.start_time: float = None
+        self.last_time_ms: int = 0
+        self.event_count: int = 0
+
+    def __get_id(self, ids: dict[str, int], record_type: str, value: str) -> int:
+        """ Get the id for a value writing its definition the first time """
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = len(ids)
+            ids[value] = value_id
+            self.file.write(f"{record_type}\t{value_id}\t{_escape(value)}\n")
+        return value_id
+
+    def record(self, event_time: float, scan_name: str, path: str, filename: str):
+        """
+        Writes an event to the trace.
+
+        Args:
+            event_time (float): The time the event was received.
+            scan_name (str): The name of the scan the event belongs to.
+            path (str): The folder of the event.
+            filename (str): The name of the changed file.
+        """
+        with self.lock:
+            if self.file is None:
+                return
+            if self.start_time is None:
+                self.start_time = event_time
+                self.file.write(f"T\t{event_time:.3f}\n")
+
+            scan_id = self.__get_id(self.scan_ids, "S", scan_name)
+            path_id = self.__get_id(self.path_ids, "P", path)
+            time_ms = max(int((event_time - self.start_time) * 1000), self.last_time_ms)
+            self.file.write(
+                f"E\t{time_ms - self.last_time_ms}\t{scan_id}\t{path_id}\t{_escape(filename)}\n"
+            )
+            self.last_time_ms = time_ms
+            self.event_count += 1
+
+    def close(self):
+        """ Flush and close the trace file """
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_trace(trace_path: str) -> Iterator[TraceEvent]:
+    """
+    Reads the events of a trace file in the order they were recorded.
+
+    Args:
+        trace_path (str): The trace file to read.
+
+    Returns:
+        Iterator[TraceEvent]: The recorded events.
+
+    Raises:
+        ValueError: If the file is not a Remotescan trace.
+    """
+    scan_names: dict[int, str] = {}
+    paths: dict[int, str] = {}
+    start_time: float = 0.0
+    time_ms: int = 0
+
+    with gzip.open(trace_path, "rt", encoding="utf-8", errors="surrogateescape", newline="\n") as file:
+        if file.readline().rstrip("\n") != TRACE_HEADER:
+            raise ValueError(f"{trace_path} is not a Remotescan trace")
+
+        for line in file:
+            fields = line.rstrip("\n").split("\t")
+            if fields[0] == "E":
+                time_ms += int(fields[1])
+                yield TraceEvent(
+                    start_time + (time_ms / 1000.0),
+                    scan_names[int(fields[2])],
+                    paths[int(fields[3])],
+                    _unescape(fields[4])
+                )
+            elif fields[0] == "S":
+                scan_names[int(fields[1])] = _unescape(fields[2])
+            elif fields[0] == "P":
+                paths[int(fields[1])] = _unescape(fields[2])
+            elif fields[0] == "T":
+                start_time = float(fields[1])
@@ -0,0 +1,95 @@
+""" Space bounded statistics of the folders producing the most events """
+
+import heapq
+import threading
+from dataclasses import dataclass
+
+
+@dataclass
+class HotDirectory:
+    """Structure for holding the event count of a folder. """
+    path: str
+    count: int = 0
+    error: int = 0
+
+
+@dataclass
+class QuarantinedDirectory:
+    """Structure for holding a folder whose watches were removed for too many events. """
+    scan_name: str
+    release_time: float
+    event_count: int = 0
+
+
+class HotDirectoryTracker:
+    """
+    Space-Saving heavy hitters of the folders with the most events.
+
+    Only capacity folders are counted at a time. When every counter is in use
+    a folder not yet counted replaces the folder with the lowest count and
+    inherits that count as its error. Every folder with more than 1/capacity
+    of the events is guaranteed to be counted, and its count overestimates
+    the real count by at most its error, so memory stays bounded however
+    many folders change.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initializes the HotDirectoryTracker.
+
+        Args:
+            capacity (int): The most folders counted at a time.
+        """
+        self.capacity = max(capacity, 1)
+        self.counters: dict[str, HotDirectory] = {}
+        self.total_count: int = 0
+        self.lock = threading.Lock()
+
+    def add(self, path: str, count: int = 1) -> int:
+        """
+        Counts events of a folder.
+
+        Args:
+            path (str): The folder of the events.
+            count (int): The number of events.
+
+        Returns:
+            int: The guaranteed number of events of the folder, its count less its error.
+        """
+        with self.lock:
+            counter = self.counters.get(path)
+            if counter is None:
+                if len(self.counters) < self.capacity:
+                    counter = HotDirectory(path)
+                else:
+                    evicted = min(self.counters.values(), key=lambda hot_directory: hot_directory.count)
+                    del self.counters[evicted.path]
+                    counter = HotDirectory(path, evicted.count, evicted.count)
+                self.counters[path] = counter
+
+            counter.count += count
+            self.total_count += count
+            return counter.count - counter.error
+
+    def get_top(self, count: int) -> list[HotDirectory]:
+        """
+        Returns the folders with the most events.
+
+        Args:
+            count (int): The number of folders to return.
+
+        Returns:
+            list[HotDirectory]: The folders ordered from the most events.
+        """
+        with self.lock:
+            return heapq.nlargest(
+                count,
+                self.counters.values(),
+                key=lambda hot_directory: hot_directory.count
+            )
+
+    def reset(self):
+        """ Start counting a new window """
+        with self.lock:
+            self.counters = {}
+            self.total_count = 0
@@ -0,0 +1,132 @@
+""" Bounded set of the changed folders of a monitor """
+
+from collections.abc import Iterable, Iterator
+
+
+class PathSet:
+    """
+    Ordered set of the changed folders of a monitor or ready target.
+
+    A folder below a folder already in the set is not added again, which
+    costs one lookup per level of the folder. Once more than max_paths
+    folders are held the deepest folders are collapsed to their parents,
+    never above the scan paths, until half the limit is used. When they
+    collapse to the scan paths themselves the set switches to the whole
+    library: it holds just the scan paths and ignores every further folder,
+    so the memory and the notify work stay bounded however many folders
+    change.
+    """
+
+    def __init__(self, max_paths: int = 0, root_paths: list[str] = None, paths: Iterable[str] = ()):
+        """
+        Initializes the PathSet.
+
+        Args:
+            max_paths (int): Most folders held before they are collapsed. 0 never collapses.
+            root_paths (list[str]): The scan paths the folders are collapsed up to.
+            paths (Iterable[str]): The folders to add.
+        """
+        self.max_paths = max_paths
+        self.root_paths: list[str] = list(root_paths) if root_paths is not None else []
+        self.paths: dict[str, None] = {}
+        self.whole_library: bool = False
+        for path in paths:
+            self.add(path)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __contains__(self, path: str) -> bool:
+        return self.__get_covered(path)
+
+    def __get_covered(self, path: str) -> bool:
+        """ Get if the folder or one of its parents is in the set """
+        if self.whole_library or path in self.paths:
+            return True
+        return self.__get_parent_covered(path)
+
+    def __get_parent_covered(self, path: str) -> bool:
+        """ Get if one of the parents of a folder is in the set """
+        index = path.rfind("/")
+        while index > 0:
+            path = path[:index]
+            if path in self.paths:
+                return True
+            index = path.rfind("/")
+        return False
+
+    def add(self, path: str) -> bool:
+        """
+        Adds a changed folder.
+
+        Args:
+            path (str): The changed folder.
+
+        Returns:
+            bool: True if the folder was added, False if the set already covers it.
+        """
+        if self.__get_covered(path):
+            return False
+
+        self.paths[path] = None
+        if 0 < self.max_paths < len(self.paths):
+            self.__collapse()
+        return True
+
+    def update(self, other: "PathSet"):
+        """
+        Adds every folder and scan path of another set.
+
+        Args:
+            other (PathSet): The set to merge into this one.
+        """
+        for root_path in other.root_paths:
+            if root_path not in self.root_paths:
+                self.root_paths.append(root_path)
+
+        if other.whole_library:
+            self.__set_whole_library()
+        else:
+            for path in other:
+                self.add(path)
+
+    def __get_parent(self, path: str) -> str:
+        """ Get the parent of a folder or None if the folder is a scan path or outside them """
+        if path in self.root_paths:
+            return None
+        parent = path[:path.rfind("/")]
+        for root_path in self.root_paths:
+            if parent == root_path or parent.startswith(f"{root_path}/"):
+                return parent
+        return None
+
+    def __collapse(self):
+        """ Replace the deepest folders with their parents until half of max_paths is used """
+        while len(self.paths) > self.max_paths // 2:
+            parents = {path: self.__get_parent(path) for path in self.paths}
+            depths = [path.count("/") for path, parent in parents.items() if parent is not None]
+            if len(depths) == 0:
+                self.__set_whole_library()
+                return
+
+            deepest = max(depths)
+            collapsed: dict[str, None] = {}
+            for path, parent in parents.items():
+                if parent is not None and path.count("/") == deepest:
+                    path = parent
+                collapsed[path] = None
+
+            # Folders added before one of their parents are now covered by it
+            self.paths = collapsed
+            self.paths = {path: None for path in collapsed if not self.__get_parent_covered(path)}
+
+        if all(path in self.root_paths for path in self.paths):
+            self.__set_whole_library()
+
+    def __set_whole_library(self):
+        """ Cover the whole library with the scan paths """
+        self.whole_library = True
+        self.paths = dict.fromkeys(self.root_paths)
@@ -1,22 +1,43 @@
-
 """ Remote Scan service monitors configured folders and notifies media servers."""
 
+import multiprocessing
 import os
+import random
 from sys import platform
 import time
 import threading
+from collections.abc import Callable
+from itertools import islice
 
 from threading import Thread, Condition
 from dataclasses import dataclass, field
-from apscheduler.schedulers.blocking import BlockingScheduler
 
+from api.api_base import SCAN_FAILED, SCAN_REJECTED, SCAN_SUCCESS
 from api.api_manager import ApiManager
 from common import utils
 from common.log_manager import LogManager
+from common.metrics import Histogram, MetricFamily
+from common.token_bucket import TokenBucket
+from service.device_map import DeferredDevice, DeviceMap
+from service.event_buffer import EventBuffer
+from service.event_trace import EventTraceRecorder
+from service.hot_directories import HotDirectoryTracker, QuarantinedDirectory
+from service.path_set import PathSet
+from service.scan_filter import SCANNER_MASK, ScanFilter
+from service.scan_journal import ScanJournal, read_journal
+from service.scan_notifier import ScanNotifier
+from service.scan_suppressor import ScanSuppressor
 from service.service_base import ServiceBase
+from service.tree_snapshot import TreeSnapshot
 if platform == "linux":
     import external.PyInotify.inotify.adapters
-    import external.PyInotify.inotify.constants
+
+# Most changed folders sent to Plex as partial scans before the whole library is scanned instead
+PLEX_PATH_SCAN_LIMIT: int = 5
+
+# Most folders counted by the hot directory statistics and the number logged in each report
+HOT_DIRECTORY_CAPACITY: int = 64
+HOT_DIRECTORY_REPORT_COUNT: int = 5
 
 
 @dataclass
@@ -37,7 +58,40 @@ class ScanConfigInfo:
         default_factory=list)
     jellyfin_library_list: list[ServerLibraryConfigInfo] = field(
         default_factory=list)
-    paths: list[str] = field(default_factory=list)
+    # The scan paths of a scan configuration and the changed folders of a monitor
+    paths: list[str] | PathSet = field(default_factory=list)
+    plex_paths: dict[str, str] = field(default_factory=dict)
+    start_time: float = 0.0
+
+
+@dataclass
+class NotifyTarget:
+    """Structure for holding a media server library ready to be notified. """
+    server_type: str
+    library_config: ServerLibraryConfigInfo
+    scan_name: str
+    paths: PathSet = field(default_factory=PathSet)
+    start_time: float = 0.0
+    scan_in_progress: bool = False
+    next_scan_check_time: float = 0.0
+    retry_count: int = 0
+    ready_time: float = 0.0
+
+
+@dataclass
+class ServerRetryInfo:
+    """Structure for holding the notify backoff of an unavailable media server. """
+    failure_count: int = 0
+    next_retry_time: float = 0.0
+
+
+@dataclass
+class WatchRequest:
+    """Structure for holding a change to the watches applied by the watch thread of a scan. """
+    # add or remove the watches of a quarantined folder, or walk a scan path of a disk that woke up
+    action: str
+    path: str
+    defer_time: float = 0.0
 
 
 class Remotescan(ServiceBase):
@@ -47,10 +101,9 @@ class Remotescan(ServiceBase):
         self,
         api_manager: ApiManager,
         config: dict,
-        log_manager: LogManager,
-        scheduler: BlockingScheduler
+        log_manager: LogManager
     ):
-        super().__init__(log_manager, scheduler)
+        super().__init__(log_manager)
 
         self.api_manager = api_manager
 
@@ -61,7 +114,41 @@ class Remotescan(ServiceBase):
         self.seconds_before_notify: int = 90
         self.seconds_between_notifies: int = 15
         self.seconds_before_inotify_modify: int = 1
-        self.last_notify_time: float = 0.0
+        self.seconds_between_library_notifies: int = 0
+        self.notify_burst: int = 1
+        self.seconds_between_scan_checks: int = 10
+        self.shard_workers: int = 0
+        self.shard_coalesce_seconds: float = 0.5
+        self.seconds_shutdown_drain: int = 0
+        self.event_buffer_size: int = 65536
+        self.seconds_suppress_after_notify: int = 0
+        self.seconds_retry_min: int = 30
+        self.seconds_retry_max: int = 900
+        self.notify_retry_limit: int = 0
+        self.log_folder_limit: int = 0
+        self.monitor_path_limit: int = 1000
+        self.seconds_hot_directory_window: int = 0
+        self.hot_directory_quarantine_events: int = 0
+        self.seconds_hot_directory_quarantine: int = 600
+        self.defer_sleeping_devices: bool = False
+        self.suppress_pattern_list: list[str] = [
+            "*.nfo", "*.jpg", "*.jpeg", "*.png", "*.tbn", "*.bif", "*.srt", "*.ass", "*.ssa", "*.sub", "*.idx"
+        ]
+
+        # Targets whose monitors have finished waiting keyed by server type, server name and library
+        self.ready_targets: dict[tuple[str, str, str], NotifyTarget] = {}
+        self.server_limiters: dict[tuple[str, str], TokenBucket] = {}
+        self.library_limiters: dict[tuple[str, str, str], TokenBucket] = {}
+
+        # Media servers with a target handed to the notifier. One target per server is in flight
+        # at a time so the limiters are up to date when the next target is released
+        self.notifying_servers: set[tuple[str, str]] = set()
+
+        # Each media server has its own notifier worker so a slow server never delays the others
+        self.notifier = ScanNotifier(self.__notify_ready_target)
+
+        # Media servers whose last notify failed wait before any of their targets are retried
+        self.server_retries: dict[tuple[str, str], ServerRetryInfo] = {}
 
         self.scan_configs: list[ScanConfigInfo] = []
 
@@ -71,8 +158,61 @@ class Remotescan(ServiceBase):
 
         self.threads: list[Thread] = []
         self.stop_threads: bool = False
+
+        # Worker processes used when the scans are sharded across processes
+        self.shard_processes: list[multiprocessing.Process] = []
+        self.shard_queue: multiprocessing.Queue = None
+        self.shard_stop_event = None
+        self.shard_stats: dict[int, tuple[int, int, int, int]] = {}
+
+        # Clock used for all monitor timing so monitors can be replayed on a virtual clock
+        self.clock: Callable[[], float] = time.time
+        self.trace_recorder: EventTraceRecorder = None
+        self.journal: ScanJournal = None
+
+        # Metrics are plain counters and histograms only read when the metrics are collected
+        self.inotify_trees: dict[str, external.PyInotify.inotify.adapters.InotifyTrees] = {}
+        self.accepted_event_counts: dict[str, int] = {}
+        self.debounce_wait_histogram = Histogram()
+        self.event_to_notify_histograms: dict[tuple[str, str], Histogram] = {}
         self.monitor_condition = threading.Condition()
 
+        # Folders with the most events in the current window and the folders no longer watched for it
+        self.hot_directories = HotDirectoryTracker(HOT_DIRECTORY_CAPACITY)
+        self.hot_directory_window_end: float = 0.0
+        self.quarantined_directories: dict[str, QuarantinedDirectory] = {}
+        self.watch_requests: dict[str, list[WatchRequest]] = {}
+        self.quarantined_count: int = 0
+
+        # Watch threads of each scan stopped individually when the configuration is reloaded
+        self.watch_stop_events: dict[str, threading.Event] = {}
+        self.watch_lock = threading.Lock()
+        self.shard_receive_thread: Thread = None
+        self.trace_path: str = ""
+
+        # Scan paths on sleeping disks wait for the disk to wake and the walks of one device never overlap
+        self.device_map = DeviceMap()
+        self.deferred_devices: dict[int, DeferredDevice] = {}
+        self.device_walk_locks: dict[int, threading.Lock] = {}
+        self.tree_snapshot: TreeSnapshot = None
+
+        # Watches only read events into the buffer and a separate thread adds them to the monitors
+        self.event_buffer: EventBuffer = None
+        self.event_thread: Thread = None
+        self.scan_suppressor: ScanSuppressor = None
+        self.suppressed_event_counts: dict[str, int] = {}
+
+        self.__load_settings(config)
+        self.scan_configs = self.__get_scan_configs(config)
+        self.__load_trace(config)
+
+        if "journal_path" in config and config["journal_path"]:
+            self.__load_journal(config["journal_path"])
+        if "tree_snapshot_path" in config and config["tree_snapshot_path"]:
+            self.__load_tree_snapshot(config["tree_snapshot_path"])
+
+    def __load_settings(self, config: dict):
+        """ Load the timing, shard and filter settings """
         if "seconds_monitor_rate" in config:
             self.seconds_monitor_rate = max(
                 config["seconds_monitor_rate"], 1
@@ -89,6 +229,113 @@ class Remotescan(ServiceBase):
             self.seconds_before_inotify_modify = max(
                 config["seconds_before_inotify_modify"], 1
             )
+        if "seconds_between_library_notifies" in config:
+            self.seconds_between_library_notifies = max(
+                config["seconds_between_library_notifies"], 0
+            )
+        if "notify_burst" in config:
+            self.notify_burst = max(config["notify_burst"], 1)
+        if "seconds_between_scan_checks" in config:
+            self.seconds_between_scan_checks = max(
+                config["seconds_between_scan_checks"], 1
+            )
+        if "shard_workers" in config:
+            self.shard_workers = max(config["shard_workers"], 0)
+        if "seconds_shutdown_drain" in config:
+            self.seconds_shutdown_drain = max(
+                config["seconds_shutdown_drain"], 0
+            )
+        if "shard_coalesce_seconds" in config:
+            self.shard_coalesce_seconds = max(
+                config["shard_coalesce_seconds"], 0.1
+            )
+        if "event_buffer_size" in config:
+            self.event_buffer_size = max(
+                config["event_buffer_size"], 1024
+            )
+        if "seconds_retry_min" in config:
+            self.seconds_retry_min = max(
+                config["seconds_retry_min"], 1
+            )
+        if "seconds_retry_max" in config:
+            self.seconds_retry_max = max(
+                config["seconds_retry_max"], self.seconds_retry_min
+            )
+        if "notify_retry_limit" in config:
+            self.notify_retry_limit = max(
+                config["notify_retry_limit"], 0
+            )
+        if "seconds_suppress_after_notify" in config:
+            self.seconds_suppress_after_notify = max(
+                config["seconds_suppress_after_notify"], 0
+            )
+        if "seconds_hot_directory_window" in config:
+            self.seconds_hot_directory_window = max(
+                config["seconds_hot_directory_window"], 0
+            )
+        if "hot_directory_quarantine_events" in config:
+            self.hot_directory_quarantine_events = max(
+                config["hot_directory_quarantine_events"], 0
+            )
+        if "seconds_hot_directory_quarantine" in config:
+            self.seconds_hot_directory_quarantine = max(
+                config["seconds_hot_directory_quarantine"], 1
+            )
+        if "monitor_path_limit" in config:
+            self.monitor_path_limit = max(
+                config["monitor_path_limit"], 0
+            )
+        if "defer_sleeping_devices" in config:
+            self.defer_sleeping_devices = config["defer_sleeping_devices"] == "True"
+        if "log_folder_limit" in config:
+            self.log_folder_limit = max(
+                config["log_folder_limit"], 0
+            )
+        if "suppress_patterns" in config:
+            self.suppress_pattern_list = []
+            if config["suppress_patterns"] != "":
+                self.suppress_pattern_list = config["suppress_patterns"].split(",")
+
+        self.ignore_folder_list = []
+        for folder in config["ignore_folders"]:
+            self.ignore_folder_list.append(
+                folder["ignore_folder"]
+            )
+
+        self.valid_file_extension_list = []
+        if config["valid_file_extensions"] != "":
+            self.valid_file_extension_list = config["valid_file_extensions"].split(
+                ",")
+
+        # Watchers read the filter for every event so replacing it applies the new settings immediately
+        self.scan_filter = ScanFilter(
+            self.ignore_folder_list,
+            self.valid_file_extension_list
+        )
+        with self.watch_lock:
+            for inotify_trees in self.inotify_trees.values():
+                self.scan_filter.apply_to_watch(inotify_trees.inotify)
+
+        # Folders notified recently are kept when the suppression settings did not change
+        if (
+            self.scan_suppressor is None
+            or self.scan_suppressor.seconds_suppress != self.seconds_suppress_after_notify
+            or self.scan_suppressor.sidecar_patterns != self.suppress_pattern_list
+        ):
+            self.scan_suppressor = ScanSuppressor(
+                self.seconds_suppress_after_notify,
+                self.suppress_pattern_list
+            )
+
+        if self.event_buffer is None:
+            self.event_buffer = EventBuffer(self.event_buffer_size, self.scan_filter)
+        else:
+            self.event_buffer.max_events = self.event_buffer_size
+            self.event_buffer.scan_filter = self.scan_filter
+
+    def __get_scan_configs(self, config: dict) -> list[ScanConfigInfo]:
+        """ Get the valid scan configurations """
+        scan_configs: list[ScanConfigInfo] = []
         for scan in config["scans"]:
             scan_name = "Not Configured"
             if "name" in scan:
@@ -149,6 +396,8 @@ class Remotescan(ServiceBase):
 
             for path in scan["paths"]:
                 scan_config.paths.append(path["container_path"])
+                if "plex_path" in path and path["plex_path"]:
+                    scan_config.plex_paths[path["container_path"]] = path["plex_path"]
 
             total_libraries = (
                 len(scan_config.plex_library_list)
@@ -159,7 +408,7 @@ class Remotescan(ServiceBase):
                 total_libraries > 0
                 and len(scan_config.paths) > 0
             ):
-                self.scan_configs.append(scan_config)
+                scan_configs.append(scan_config)
             else:
                 if total_libraries == 0:
                     self._log_warning(
@@ -170,104 +419,209 @@ class Remotescan(ServiceBase):
                         f"No paths for scan {utils.get_tag('name', scan_name)} ... Skipping"
                     )
 
-        for folder in config["ignore_folders"]:
-            self.ignore_folder_list.append(
-                folder["ignore_folder"]
+        return scan_configs
+
+    def __load_trace(self, config: dict):
+        """ Start or stop recording the event trace if the trace path changed """
+        trace_path = ""
+        if "trace_path" in config:
+            trace_path = config["trace_path"]
+        if trace_path == self.trace_path:
+            return
+
+        if self.trace_recorder is not None:
+            self.trace_recorder.close()
+            self.trace_recorder = None
+        self.trace_path = trace_path
+        if trace_path:
+            try:
+                self.trace_recorder = EventTraceRecorder(config["trace_path"])
+                self._log_info(
+                    f"Recording event trace {utils.get_tag("path", config["trace_path"])}"
+                )
+            except OSError as e:
+                self._log_warning(
+                    f"Unable to record event trace {utils.get_tag("error", e)}"
+                )
+
+    def __load_journal(self, journal_path: str):
+        """ Restore the pending monitors and ready targets from the journal and keep journaling """
+        try:
+            journal_monitors, journal_targets = read_journal(journal_path)
+            self.journal = ScanJournal(journal_path)
+        except OSError as e:
+            self._log_warning(
+                f"Unable to open scan journal {utils.get_tag("path", journal_path)} {utils.get_tag("error", e)}"
             )
+            return
 
-        if config["valid_file_extensions"] != "":
-            self.valid_file_extension_list = config["valid_file_extensions"].split(
-                ",")
+        scans = {scan_config.name: scan_config for scan_config in self.scan_configs}
+        current_time = self.clock()
+        for journal_monitor in journal_monitors:
+            scan = scans.get(journal_monitor.scan_name)
+            if scan is None:
+                continue
 
-    def __get_scan_path_valid(self, path: str) -> bool:
-        """ Get if the path is valid or should be ignored """
-        for folder_name in self.ignore_folder_list:
-            if folder_name in path:
-                return False
-        return True
-
-    def __get_scan_extension_valid(self, filename: str) -> bool:
-        """ Get if the filename contains a valid extension """
-        if len(self.valid_file_extension_list) > 0:
-            for valid_extension in self.valid_file_extension_list:
-                if filename.endswith(valid_extension):
-                    return True
-        else:
-            # No valid file extensions defined so all extensions are valid
-            return True
-        return False
+            # Restored monitors wait the full seconds_before_notify again
+            monitor_info = ScanConfigInfo(
+                scan.name,
+                current_time
+            )
+            monitor_info.plex_library_list = scan.plex_library_list
+            monitor_info.emby_library_list = scan.emby_library_list
+            monitor_info.jellyfin_library_list = scan.jellyfin_library_list
+            monitor_info.paths = PathSet(self.monitor_path_limit, scan.paths, journal_monitor.paths)
+            monitor_info.start_time = journal_monitor.start_time
+            self.monitors.append(monitor_info)
+
+        for journal_target in journal_targets:
+            key = (journal_target.server_type, journal_target.server_name, journal_target.library)
+            self.ready_targets[key] = NotifyTarget(
+                journal_target.server_type,
+                ServerLibraryConfigInfo(journal_target.server_name, journal_target.library),
+                journal_target.scan_name,
+                PathSet(
+                    self.monitor_path_limit,
+                    self.__get_scan_paths(journal_target.scan_name),
+                    journal_target.paths
+                ),
+                journal_target.start_time
+            )
+
+        self._log_info(
+            f"Scan journal {utils.get_tag("path", journal_path)} restored {utils.get_tag("monitors", len(self.monitors))} {utils.get_tag("targets", len(self.ready_targets))}"
+        )
+
+    def __load_tree_snapshot(self, snapshot_path: str):
+        """ Read the folders of the last walks used for the scan paths of sleeping disks """
+        try:
+            self.tree_snapshot = TreeSnapshot(snapshot_path)
+        except (OSError, ValueError, KeyError) as e:
+            self._log_warning(
+                f"Unable to read tree snapshot {utils.get_tag("path", snapshot_path)} {utils.get_tag("error", e)}"
+            )
+
+    def __get_scan_paths(self, scan_name: str) -> list[str]:
+        """ Get the configured paths of a scan """
+        for scan_config in self.scan_configs:
+            if scan_config.name == scan_name:
+                return scan_config.paths
+        return []
+
+    def __get_plex_scan_paths(self, paths: PathSet) -> list[str]:
+        """ Get the Plex folders to scan for the changed folders or None to scan the whole library """
+        if paths.whole_library or len(paths) == 0 or len(paths) > PLEX_PATH_SCAN_LIMIT:
+            return None
+
+        plex_scan_paths: list[str] = []
+        for path in paths:
+            # A partial scan of a removed folder would not remove its items
+            if not os.path.isdir(path):
+                return None
+            # A folder name that is not valid UTF-8 can not be sent to Plex
+            try:
+                path.encode("utf-8")
+            except UnicodeEncodeError:
+                return None
+
+            plex_scan_path: str = None
+            for scan_config in self.scan_configs:
+                for container_path, plex_path in scan_config.plex_paths.items():
+                    if path == container_path or path.startswith(f"{container_path}/"):
+                        plex_scan_path = f"{plex_path.rstrip("/")}{path[len(container_path):]}"
+                        break
+                if plex_scan_path is not None:
+                    break
+
+            if plex_scan_path is None:
+                return None
+            if plex_scan_path not in plex_scan_paths:
+                plex_scan_paths.append(plex_scan_path)
+        return plex_scan_paths
 
     def __notify_plex(
         self,
-        sever_config_info: ServerLibraryConfigInfo
-    ) -> bool:
-        """ Notify plex to scan the library """
+        sever_config_info: ServerLibraryConfigInfo,
+        paths: PathSet
+    ) -> str:
+        """ Notify plex to scan the changed folders of the library or the whole library """
         plex_api = self.api_manager.get_plex_api(
             sever_config_info.server_name
         )
         if plex_api is not None:
             if plex_api.get_valid():
-                plex_api.set_library_scan(sever_config_info.library)
-                return True
+                plex_scan_paths = self.__get_plex_scan_paths(paths)
+                if plex_scan_paths is None:
+                    return plex_api.set_library_scan(sever_config_info.library)
+
+                results: set[str] = set()
+                for plex_scan_path in plex_scan_paths:
+                    result = plex_api.set_library_scan(sever_config_info.library, plex_scan_path)
+                    if result == SCAN_REJECTED:
+                        return result
+                    results.add(result)
+                return SCAN_FAILED if SCAN_FAILED in results else SCAN_SUCCESS
             else:
                 self._log_warning(
                     f"{utils.get_formatted_plex()}({sever_config_info.server_name}) server not available ... Skipped notify for {utils.get_tag("library", sever_config_info.library)}"
                 )
-        return False
+        return SCAN_FAILED
 
     def __notify_emby(
         self,
         sever_config_info: ServerLibraryConfigInfo
-    ) -> bool:
+    ) -> str:
         """ Notify the emby servers to scan the library """
         emby_api = self.api_manager.get_emby_api(
             sever_config_info.server_name
         )
         if emby_api is not None:
             if emby_api.get_valid():
+                # A failed request raises and is retried by the notifier so only a missing library is rejected
                 library_id = emby_api.get_library_id(
                     sever_config_info.library)
                 if library_id != emby_api.get_invalid_type():
-                    emby_api.set_library_scan(library_id)
-                    return True
+                    return emby_api.set_library_scan(library_id)
                 else:
                     tag_library = utils.get_tag(
                         "library", sever_config_info.library)
                     self._log_warning(
                         f"{utils.get_formatted_emby()} {tag_library} not found on server"
                     )
+                    return SCAN_REJECTED
             else:
                 self._log_warning(
                     f"{utils.get_formatted_emby()}({sever_config_info.server_name}) server not available ... Skipped notify for {utils.get_tag("library", sever_config_info.library)}"
                 )
-        return False
+        return SCAN_FAILED
 
     def __notify_jellyfin(
         self,
         sever_config_info: ServerLibraryConfigInfo
-    ) -> bool:
+    ) -> str:
         """ Notify the jellyfin servers to scan the library """
         jellyfin_api = self.api_manager.get_jellyfin_api(
             sever_config_info.server_name
         )
         if jellyfin_api is not None:
             if jellyfin_api.get_valid():
+                # A failed request raises and is retried by the notifier so only a missing library is rejected
                 library_id = jellyfin_api.get_library_id(
                     sever_config_info.library)
                 if library_id != jellyfin_api.get_invalid_type():
-                    jellyfin_api.set_library_scan(library_id)
-                    return True
+                    return jellyfin_api.set_library_scan(library_id)
                 else:
                     tag_library = utils.get_tag(
                         "library", sever_config_info.library)
                     self._log_warning(
                         f"{utils.get_formatted_jellyfin()} {tag_library} not found on server"
                     )
+                    return SCAN_REJECTED
             else:
                 self._log_warning(
                     f"{utils.get_formatted_jellyfin()}({sever_config_info.server_name}) server not available ... Skipped notify for {utils.get_tag("library", sever_config_info.library)}"
                 )
-        return False
+        return SCAN_FAILED
 
     def __get_folder_name(self, path: str) -> str:
         """ Get the folder name from the path """
@@ -284,82 +638,499 @@ class Remotescan(ServiceBase):
                 return folder_name
         return path
 
-    def __notify_media_servers(self, scan_config: ScanConfigInfo):
-        """ Notify all the configured media servers to scan the library """
-        # all the libraries in this monitor group are identical so only one scan is required
-        target: str = ""
-        for plex_library in scan_config.plex_library_list:
-            if self.__notify_plex(plex_library):
-                target = utils.build_target_string(
-                    target,
-                    utils.get_formatted_plex(),
-                    plex_library.server_name
-                )
+    def __get_target_api(self, server_type: str, server_name: str):
+        """ Get the api for the media server of a target """
+        if server_type == "plex":
+            return self.api_manager.get_plex_api(server_name)
+        if server_type == "emby":
+            return self.api_manager.get_emby_api(server_name)
+        return self.api_manager.get_jellyfin_api(server_name)
+
+    def __get_target_scan_in_progress(self, target: NotifyTarget) -> bool:
+        """ Get if the media server is already scanning the library of a target """
+        api = self.__get_target_api(
+            target.server_type,
+            target.library_config.server_name
+        )
+        if api is not None:
+            return api.get_library_scan_in_progress(target.library_config.library)
+        return False
+
+    def __notify_target(self, target: NotifyTarget) -> str:
+        """ Notify a single media server library to scan and get the scan result """
+        notify_start_time = self.clock()
+        if target.server_type == "plex":
+            result = self.__notify_plex(target.library_config, target.paths)
+            formatted_server = utils.get_formatted_plex()
+        elif target.server_type == "emby":
+            result = self.__notify_emby(target.library_config)
+            formatted_server = utils.get_formatted_emby()
+        else:
+            result = self.__notify_jellyfin(target.library_config)
+            formatted_server = utils.get_formatted_jellyfin()
+
+        notify_end_time = self.clock()
+        server_key = (target.server_type, target.library_config.server_name)
+        self.api_manager.record_notify(
+            target.server_type,
+            target.library_config.server_name,
+            result,
+            notify_end_time - notify_start_time
+        )
+        notified = result == SCAN_SUCCESS
+        if notified:
+            histogram = self.event_to_notify_histograms.get(server_key)
+            if histogram is None:
+                histogram = Histogram()
+                self.event_to_notify_histograms[server_key] = histogram
+            histogram.observe(notify_end_time - target.start_time)
 
-        for emby_library in scan_config.emby_library_list:
-            if self.__notify_emby(emby_library):
-                target = utils.build_target_string(
-                    target,
-                    utils.get_formatted_emby(),
-                    emby_library.server_name
+        # Changes the media server writes back into the notified folders must not start another scan
+        if notified:
+            self.scan_suppressor.record_notify(target.paths, notify_end_time)
+
+        # Loop through all the paths for this target and log that it has been sent to the target
+        if notified:
+            target_string = utils.build_target_string(
+                "",
+                formatted_server,
+                target.library_config.server_name
+            )
+            logged_paths = list(target.paths)
+            if self.log_folder_limit > 0:
+                logged_paths = list(islice(target.paths, self.log_folder_limit))
+            for path in logged_paths:
+                self._log_info(
+                    f"✅ Monitor moved to target {target_string} {utils.get_tag("folder", self.__get_folder_name(path))}"
                 )
+            if len(logged_paths) < len(target.paths):
+                self._log_info(
+                    f"✅ Monitor moved to target {target_string} {utils.get_tag("more_folders", len(target.paths) - len(logged_paths))}"
+                )
+        return result
 
-        for jellyfin_library in scan_config.jellyfin_library_list:
-            if self.__notify_jellyfin(jellyfin_library):
-                target = utils.build_target_string(
-                    target,
-                    utils.get_formatted_jellyfin(),
-                    jellyfin_library.server_name
+    def __add_ready_targets(self, monitor: ScanConfigInfo):
+        """ Add the media server libraries of a finished monitor to the ready queue """
+        if 0 < self.log_folder_limit < len(monitor.paths):
+            self._log_info(
+                f"➡️ Monitor finished {utils.get_tag("name", monitor.name)} {utils.get_tag("folders", len(monitor.paths))} {utils.get_tag("not_logged", len(monitor.paths) - self.log_folder_limit)}"
+            )
+
+        library_lists = (
+            ("plex", monitor.plex_library_list),
+            ("emby", monitor.emby_library_list),
+            ("jellyfin", monitor.jellyfin_library_list)
+        )
+        for server_type, library_list in library_lists:
+            for library_config in library_list:
+                key = (server_type, library_config.server_name, library_config.library)
+                if self.journal is not None:
+                    for path in monitor.paths:
+                        self.journal.record_target(key, monitor.name, path, monitor.start_time)
+
+                if key in self.ready_targets:
+                    # The library is already waiting to be notified so merge the paths
+                    ready_target = self.ready_targets[key]
+                    ready_target.paths.update(monitor.paths)
+                    ready_target.start_time = min(ready_target.start_time, monitor.start_time)
+                else:
+                    target_paths = PathSet(self.monitor_path_limit)
+                    target_paths.update(monitor.paths)
+                    self.ready_targets[key] = NotifyTarget(
+                        server_type,
+                        library_config,
+                        monitor.name,
+                        target_paths,
+                        monitor.start_time,
+                        ready_time=self.clock()
+                    )
+
+    def __get_limiter(
+        self,
+        limiters: dict,
+        key: tuple,
+        seconds_per_token: float
+    ) -> TokenBucket:
+        """ Get the rate limiter for the key creating it if required """
+        limiter = limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucket(seconds_per_token, self.notify_burst)
+            limiters[key] = limiter
+        return limiter
+
+    def __get_target_limiters(self, key: tuple[str, str, str]) -> list[TokenBucket]:
+        """ Get all the rate limiters that apply to a ready target """
+        limiters = [
+            self.__get_limiter(
+                self.server_limiters,
+                key[:2],
+                self.seconds_between_notifies
+            )
+        ]
+        if self.seconds_between_library_notifies > 0:
+            limiters.append(
+                self.__get_limiter(
+                    self.library_limiters,
+                    key,
+                    self.seconds_between_library_notifies
                 )
+            )
+        return limiters
 
-        # Loop through all the paths in this monitor and log that it has been sent to the target
-        if target:
-            for path in scan_config.paths:
-                self._log_info(
-                    f"✅ Monitor moved to target {target} {utils.get_tag("folder", self.__get_folder_name(path))}"
+    def __get_pending_target_keys(self) -> set[tuple[str, str, str]]:
+        """ Get the media server libraries of the monitors still collecting changes """
+        pending_keys: set[tuple[str, str, str]] = set()
+        for monitor in self.monitors:
+            for server_type, library_list in (
+                ("plex", monitor.plex_library_list),
+                ("emby", monitor.emby_library_list),
+                ("jellyfin", monitor.jellyfin_library_list)
+            ):
+                for library_config in library_list:
+                    pending_keys.add((server_type, library_config.server_name, library_config.library))
+        return pending_keys
+
+    def __release_ready_targets(self, current_time: float) -> list[tuple[tuple[str, str, str], NotifyTarget, float]]:
+        """ Take every ready target whose media server and library limiters allow it for the notifier """
+        released: list[tuple[tuple[str, str, str], NotifyTarget, float]] = []
+
+        # A library fed by several scans waits for their other monitors so it is refreshed once.
+        # It waits at most seconds_before_notify so a scan that never settles cannot hold it back
+        pending_keys: set[tuple[str, str, str]] = set()
+        if not self.stop_threads and len(self.monitors) > 0:
+            pending_keys = self.__get_pending_target_keys()
+
+        for key in list(self.ready_targets):
+            target = self.ready_targets[key]
+            if current_time < target.next_scan_check_time or key[:2] in self.notifying_servers:
+                continue
+            if key in pending_keys and current_time - target.ready_time < self.seconds_before_notify:
+                continue
+            server_retry = self.server_retries.get(key[:2])
+            if server_retry is not None and current_time < server_retry.next_retry_time:
+                continue
+
+            limiters = self.__get_target_limiters(key)
+            if all(limiter.get_available(current_time) for limiter in limiters):
+                self.notifying_servers.add(key[:2])
+                released.append((key, self.ready_targets.pop(key), current_time))
+        return released
+
+    def __requeue_ready_target(self, key: tuple[str, str, str], target: NotifyTarget):
+        """ Put a target back in the ready queue merging the monitors that finished while it was away """
+        ready_target = self.ready_targets.get(key)
+        if ready_target is not None:
+            target.paths.update(ready_target.paths)
+            target.start_time = min(target.start_time, ready_target.start_time)
+        self.ready_targets[key] = target
+
+        if self.journal is not None:
+            for path in target.paths:
+                self.journal.record_target(key, target.scan_name, path, target.start_time)
+        with self.monitor_condition:
+            self.monitor_condition.notify()
+
+    def __record_target_done(self, key: tuple[str, str, str]):
+        """ Journal a target as finished keeping the changes of its library that became ready meanwhile """
+        if self.journal is None:
+            return
+        self.journal.record_target_done(key)
+        ready_target = self.ready_targets.get(key)
+        if ready_target is not None:
+            for path in ready_target.paths:
+                self.journal.record_target(key, ready_target.scan_name, path, ready_target.start_time)
+
+    def __return_ready_target(self, key: tuple[str, str, str], target: NotifyTarget, current_time: float):
+        """ Put a target back in the ready queue as the follow-up scan of a running scan """
+        target.next_scan_check_time = current_time + self.seconds_between_scan_checks
+        if not target.scan_in_progress:
+            target.scan_in_progress = True
+            self._log_info(
+                f"Scan already in progress holding follow-up {utils.get_tag("server", target.library_config.server_name)} {utils.get_tag("library", target.library_config.library)}"
+            )
+        self.__requeue_ready_target(key, target)
+
+    def __drop_ready_target(self, key: tuple[str, str, str], target: NotifyTarget, reason: str):
+        """ Drop a target that can never be notified """
+        self.__record_target_done(key)
+        self._log_error(
+            f"Notify failed dropping changes {utils.get_tag("server", target.library_config.server_name)} {utils.get_tag("library", target.library_config.library)} {utils.get_tag("folders", len(target.paths))} {utils.get_tag("reason", reason)}"
+        )
+
+    def __retry_ready_target(self, key: tuple[str, str, str], target: NotifyTarget, current_time: float):
+        """ Put a target that failed to notify back in the ready queue after the media server backoff """
+        if self.__get_target_api(target.server_type, target.library_config.server_name) is None:
+            # The media server is no longer configured so there is nothing to retry
+            self.__record_target_done(key)
+            return
+
+        server_retry = self.server_retries.get(key[:2])
+        if server_retry is None:
+            server_retry = ServerRetryInfo()
+            self.server_retries[key[:2]] = server_retry
+        server_retry.failure_count += 1
+
+        # Exponential backoff with jitter so servers coming back are not hit at the same moment
+        retry_seconds = min(
+            self.seconds_retry_min * (2 ** min(server_retry.failure_count - 1, 16)),
+            self.seconds_retry_max
+        )
+        retry_seconds = random.uniform(retry_seconds / 2, retry_seconds)
+        server_retry.next_retry_time = current_time + retry_seconds
+
+        # Without a limit the target waits for the media server to come back however long it takes
+        target.retry_count += 1
+        if 0 < self.notify_retry_limit < target.retry_count:
+            self.__drop_ready_target(key, target, f"failed {target.retry_count} times")
+            return
+        self._log_warning(
+            f"Notify failed retrying {utils.get_tag("server", target.library_config.server_name)} {utils.get_tag("library", target.library_config.library)} {utils.get_tag("retry", target.retry_count)} {utils.get_tag("retry_seconds", round(retry_seconds, 1))}"
+        )
+        self.__requeue_ready_target(key, target)
+
+    def __notify_ready_target(self, key: tuple[str, str, str], target: NotifyTarget, current_time: float):
+        """ Notifier job checking for a running scan and notifying a ready target """
+        try:
+            # The target stays in the ready queue as the single follow-up scan until the running scan finishes
+            if self.__get_target_scan_in_progress(target):
+                self.api_manager.record_notify(
+                    target.server_type,
+                    target.library_config.server_name,
+                    "scan_in_progress",
+                    self.clock() - current_time
                 )
+                with self.monitor_lock:
+                    self.__return_ready_target(key, target, current_time)
+                return
+
+            with self.monitor_lock:
+                for limiter in self.__get_target_limiters(key):
+                    limiter.consume(current_time)
+            result = self.__notify_target(target)
+            with self.monitor_lock:
+                if result == SCAN_SUCCESS:
+                    self.server_retries.pop(key[:2], None)
+                    self.__record_target_done(key)
+                elif result == SCAN_REJECTED:
+                    # The library is missing or the API key was refused so retrying can not help.
+                    # The media server answered so its other libraries are not held back
+                    self.server_retries.pop(key[:2], None)
+                    self.__drop_ready_target(key, target, "library not found or not allowed")
+                else:
+                    self.__retry_ready_target(key, target, self.clock())
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._log_error(
+                f"Notify failed {utils.get_tag("server", target.library_config.server_name)} {utils.get_tag("library", target.library_config.library)} {utils.get_tag("error", e)}"
+            )
+            with self.monitor_lock:
+                self.__retry_ready_target(key, target, self.clock())
+        finally:
+            # Release the next target of the media server without waiting for the next monitor pass.
+            # While stopping the drain releases the targets and the rest stay journaled for the next start
+            with self.monitor_lock:
+                self.notifying_servers.discard(key[:2])
+                released = []
+                if not self.stop_threads:
+                    released = self.__release_ready_targets(self.clock())
+            for released_key, released_target, release_time in released:
+                self.notifier.submit(released_key[:2], released_key, released_target, release_time)
 
     def __monitor(self, condition: Condition):
         """ Thread to process new monitors """
         while not self.stop_threads:
-            # If no monitors sleep until notified
-            if len(self.monitors) == 0:
+            # If no monitors, targets, quarantines, sleeping disks or folder statistics sleep until notified
+            if (
+                len(self.monitors) == 0
+                and len(self.ready_targets) == 0
+                and len(self.quarantined_directories) == 0
+                and len(self.deferred_devices) == 0
+                and self.hot_directories.total_count == 0
+            ):
                 with condition:
                     condition.wait()
-                    
+
             # Process any monitors currently in the system
-            with self.monitor_lock:
-                if len(self.monitors) > 0:
-                    current_time = time.time()
-                    if current_time - self.last_notify_time >= self.seconds_between_notifies:
-                        current_monitor: ScanConfigInfo = None
-                        for monitor in self.monitors:
-                            if (current_time - monitor.time) >= self.seconds_before_notify:
-                                current_monitor = monitor
-                                self.last_notify_time = current_time
-                                break
-
-                        # A monitor was finished and servers notified remove it from the list
-                        if current_monitor is not None:
-                            # If servers were just notified for this name remove all monitors for the same name since
-                            # the server refresh is by library not by item
-                            new_monitors: list[ScanConfigInfo] = []
-                            for monitor in self.monitors:
-                                if monitor.name != current_monitor.name:
-                                    new_monitors.append(monitor)
-
-                            self.__notify_media_servers(current_monitor)
-                            self.monitors = new_monitors
+            self.process_monitors()
+            self.process_hot_directories()
+            self.process_deferred_devices()
+
+            # Records are synced once per pass outside the monitor lock
+            if self.journal is not None:
+                self.journal.sync()
 
             time.sleep(self.seconds_monitor_rate)
 
         self._log_info("Stopping monitor thread")
 
-    def __log_scan_moved_to_monitor(self, name: str, path: str):
-        """ Log when a scan has moved to a monitor"""
+    def process_monitors(self):
+        """ Move finished monitors to the ready queue and hand the ready targets to the notifier """
+        released: list[tuple[tuple[str, str, str], NotifyTarget, float]] = []
+        with self.monitor_lock:
+            current_time = self.clock()
+            if len(self.monitors) > 0:
+                # Move every monitor that finished waiting to the ready queue
+                waiting_monitors: list[ScanConfigInfo] = []
+                for monitor in self.monitors:
+                    if (current_time - monitor.time) >= self.seconds_before_notify:
+                        self.debounce_wait_histogram.observe(current_time - monitor.start_time)
+                        self.__add_ready_targets(monitor)
+                        if self.journal is not None:
+                            self.journal.record_monitor_done(monitor.name)
+                    else:
+                        waiting_monitors.append(monitor)
+                self.monitors = waiting_monitors
+
+            # Independent media servers and libraries are released in the same pass
+            if len(self.ready_targets) > 0:
+                released = self.__release_ready_targets(current_time)
+
+            # Nothing is pending or being notified so the journal no longer needs any of its records
+            if (
+                self.journal is not None
+                and len(self.monitors) == 0
+                and len(self.ready_targets) == 0
+                and len(self.notifying_servers) == 0
+            ):
+                self.journal.reset()
+
+        # The media servers are called by the notifier without holding the monitor lock
+        for key, target, release_time in released:
+            self.notifier.submit(key[:2], key, target, release_time)
+
+    def process_hot_directories(self):
+        """ Restore the watches of the finished quarantines and report the folders with the most events """
+        current_time = self.clock()
+        if len(self.quarantined_directories) > 0:
+            released_trees: list[external.PyInotify.inotify.adapters.InotifyTrees] = []
+            with self.watch_lock:
+                for path, quarantined_directory in list(self.quarantined_directories.items()):
+                    if current_time >= quarantined_directory.release_time:
+                        del self.quarantined_directories[path]
+                        inotify_trees = self.inotify_trees.get(quarantined_directory.scan_name)
+                        if inotify_trees is not None:
+                            self.watch_requests.setdefault(quarantined_directory.scan_name, []).append(
+                                WatchRequest("add", path)
+                            )
+                            released_trees.append(inotify_trees)
+                        self._log_info(
+                            f"Released hot directory {utils.get_tag("name", quarantined_directory.scan_name)} {utils.get_tag("path", path)}"
+                        )
+            # The watch threads restore the watches they own
+            for inotify_trees in released_trees:
+                inotify_trees.inotify.wakeup()
+
+        if self.seconds_hot_directory_window == 0:
+            return
+        if self.hot_directory_window_end == 0.0:
+            self.hot_directory_window_end = current_time + self.seconds_hot_directory_window
+        elif current_time >= self.hot_directory_window_end:
+            if self.hot_directories.total_count > 0:
+                self.__log_hot_directories()
+            self.hot_directories.reset()
+            self.hot_directory_window_end = current_time + self.seconds_hot_directory_window
+
+    def __log_hot_directories(self):
+        """ Log the folders with the most events in the window """
         self._log_info(
-            f"➡️ Scan moved to monitor {utils.get_tag('name', name)} {utils.get_tag("folder", self.__get_folder_name(path))}"
+            f"Hot directories {utils.get_tag("window_seconds", self.seconds_hot_directory_window)} {utils.get_tag("events", self.hot_directories.total_count)}"
         )
+        for hot_directory in self.hot_directories.get_top(HOT_DIRECTORY_REPORT_COUNT):
+            self._log_info(
+                f"Hot directory {utils.get_tag("path", hot_directory.path)} {utils.get_tag("events", hot_directory.count)} {utils.get_tag("share", f"{100 * hot_directory.count // self.hot_directories.total_count}%")}"
+            )
+
+    def __record_hot_directories(self, scan_config: ScanConfigInfo, events: list[tuple[str, str]]):
+        """ Count the events of each folder and quarantine the folders past the threshold """
+        if self.seconds_hot_directory_window == 0:
+            return
+
+        folder_counts: dict[str, int] = {}
+        for path, _filename in events:
+            folder_counts[path] = folder_counts.get(path, 0) + 1
+        for path, count in folder_counts.items():
+            event_count = self.hot_directories.add(path, count)
+            if 0 < self.hot_directory_quarantine_events <= event_count:
+                self.__quarantine_directory(scan_config, path, event_count)
+
+    def __quarantine_directory(self, scan_config: ScanConfigInfo, path: str, event_count: int):
+        """ Remove the watches of a folder with too many events until the quarantine ends """
+        # A scan path is never quarantined since that would stop the whole scan
+        if path in scan_config.paths or path in self.quarantined_directories:
+            return
+
+        with self.watch_lock:
+            # Shard workers own their watches so folders watched by a shard are only reported
+            inotify_trees = self.inotify_trees.get(scan_config.name)
+            if inotify_trees is None:
+                return
+            self.quarantined_directories[path] = QuarantinedDirectory(
+                scan_config.name,
+                self.clock() + self.seconds_hot_directory_quarantine,
+                event_count
+            )
+            self.watch_requests.setdefault(scan_config.name, []).append(WatchRequest("remove", path))
+            self.quarantined_count += 1
+
+        # The watch thread removes the watches it owns
+        inotify_trees.inotify.wakeup()
+        self._log_warning(
+            f"Quarantined hot directory {utils.get_tag("name", scan_config.name)} {utils.get_tag("path", path)} {utils.get_tag("events", event_count)} {utils.get_tag("seconds", self.seconds_hot_directory_quarantine)}"
+        )
+
+    def __rename_quarantined_directories(self, scan_name: str, renames: list[tuple[str, str]]):
+        """ Move the quarantines of renamed folders to their new paths so they are released there """
+        with self.watch_lock:
+            for old_path, new_path in renames:
+                prefix = f"{old_path}/"
+                for watch_request in self.watch_requests.get(scan_name, []):
+                    if watch_request.path == old_path or watch_request.path.startswith(prefix):
+                        watch_request.path = new_path + watch_request.path[len(old_path):]
+
+                for path, quarantined_directory in list(self.quarantined_directories.items()):
+                    if quarantined_directory.scan_name == scan_name and (
+                        path == old_path or path.startswith(prefix)
+                    ):
+                        renamed_path = new_path + path[len(old_path):]
+                        del self.quarantined_directories[path]
+                        self.quarantined_directories[renamed_path] = quarantined_directory
+                        # The watch thread watches a renamed folder that was not watched so it is removed again
+                        self.watch_requests.setdefault(scan_name, []).append(WatchRequest("remove", renamed_path))
+                        self._log_info(
+                            f"Moved quarantine of renamed hot directory {utils.get_tag("name", scan_name)} {utils.get_tag("path", path)} {utils.get_tag("new_path", renamed_path)}"
+                        )
+
+    def __apply_watch_requests(
+        self,
+        scan_name: str,
+        inotify_trees: "external.PyInotify.inotify.adapters.InotifyTrees"
+    ):
+        """ Change the watches of quarantined folders and woken disks on the watch thread """
+        with self.watch_lock:
+            watch_requests = self.watch_requests.pop(scan_name, [])
+        synthetic_event_count = inotify_trees.synthetic_event_count
+        for watch_request in watch_requests:
+            if watch_request.action == "add":
+                # Entries changed during the quarantine are reported with the next batch
+                inotify_trees.add_watch_tree(watch_request.path)
+            elif watch_request.action == "remove":
+                inotify_trees.remove_watch_tree(watch_request.path)
+            else:
+                self.__walk_deferred_path(scan_name, inotify_trees, watch_request.path, watch_request.defer_time)
+
+        # The synthesized entries are only yielded with a batch so the watch is woken instead of waiting for a real event
+        if inotify_trees.synthetic_event_count != synthetic_event_count:
+            inotify_trees.inotify.wakeup()
+
+    def __log_scan_moved_to_monitor(self, name: str, path: str, folder_count: int):
+        """ Log when a scan has moved to a monitor summarizing the folders past log_folder_limit """
+        if self.log_folder_limit == 0 or folder_count <= self.log_folder_limit:
+            self._log_info(
+                f"➡️ Scan moved to monitor {utils.get_tag('name', name)} {utils.get_tag("folder", self.__get_folder_name(path))}"
+            )
+        elif folder_count == self.log_folder_limit + 1:
+            self._log_info(
+                f"➡️ Scan moved to monitor {utils.get_tag('name', name)} more folders are summarized when the monitor finishes"
+            )
 
     def __add_file_monitor(
         self,
@@ -369,7 +1140,7 @@ class Remotescan(ServiceBase):
     ):
         """ Add a path to a monitor """
         monitor_found: bool = False
-        current_time: float = time.time()
+        current_time: float = self.clock()
 
         # Check if this path or library already exists in the list
         # If the library already exists just update the time to wait since we can only notify per library to update not per item
@@ -379,15 +1150,16 @@ class Remotescan(ServiceBase):
                 if monitor.name == scan.name:
                     monitor_found = True
 
-                    path_in_monitor = False
-                    for monitor_path in monitor.paths:
-                        if monitor_path == path:
-                            path_in_monitor = True
-                            break
-
-                    if not path_in_monitor:
-                        monitor.paths.append(path)
-                        self.__log_scan_moved_to_monitor(monitor.name, path)
+                    # Folders already covered by the monitor, or every folder once it covers the whole library, are skipped
+                    whole_library = monitor.paths.whole_library
+                    if monitor.paths.add(path):
+                        if self.journal is not None:
+                            self.journal.record_monitor(monitor.name, path, monitor.start_time)
+                        self.__log_scan_moved_to_monitor(monitor.name, path, len(monitor.paths))
+                        if monitor.paths.whole_library and not whole_library:
+                            self._log_info(
+                                f"➡️ Monitor covers the whole library {utils.get_tag("name", monitor.name)} {utils.get_tag("monitor_path_limit", self.monitor_path_limit)}"
+                            )
 
                     monitor.time = current_time
 
@@ -400,67 +1172,584 @@ class Remotescan(ServiceBase):
             monitor_info.plex_library_list = scan.plex_library_list
             monitor_info.emby_library_list = scan.emby_library_list
             monitor_info.jellyfin_library_list = scan.jellyfin_library_list
-            monitor_info.paths.append(path)
+            monitor_info.paths = PathSet(self.monitor_path_limit, scan.paths, [path])
+            monitor_info.start_time = current_time
             with self.monitor_lock:
                 self.monitors.append(monitor_info)
+                if self.journal is not None:
+                    self.journal.record_monitor(monitor_info.name, path, current_time)
                 with monitor_condition:
                     monitor_condition.notify()
 
-            self.__log_scan_moved_to_monitor(monitor_info.name, path)
+            self.__log_scan_moved_to_monitor(monitor_info.name, path, 1)
+
+    def __get_device_lock(self, device: int) -> threading.Lock:
+        """ Get the lock held while a device is walked so its walks never overlap """
+        with self.watch_lock:
+            return self.device_walk_locks.setdefault(device, threading.Lock())
 
-    def __monitor_path(
+    def __get_folder_times(self, folders: list[str]) -> dict[str, int]:
+        """ Get the modification time of watched folders whose inodes are held in memory by their watches """
+        folder_times: dict[str, int] = {}
+        for folder in folders:
+            try:
+                folder_times[folder] = os.stat(folder).st_mtime_ns
+            except OSError:
+                pass
+        return folder_times
+
+    def __save_tree_snapshot(self, path: str, folder_times: dict[str, int]):
+        """ Save the folders of a walked scan path keeping the watches when the snapshot can not be written """
+        try:
+            self.tree_snapshot.set_folders(path, folder_times)
+        except OSError as e:
+            self._log_warning(
+                f"Unable to save tree snapshot {utils.get_tag("path", self.tree_snapshot.snapshot_path)} {utils.get_tag("error", e)}"
+            )
+
+    def __defer_sleeping_paths(self, scan_name: str, device: int, paths: list[str]) -> list[str]:
+        """ Defer the walk of the scan paths on a spinning disk until it wakes and return the paths to walk now """
+        if not self.defer_sleeping_devices:
+            return paths
+
+        disk = self.device_map.get_disk(device)
+        if disk is None or not self.device_map.get_rotational(disk):
+            return paths
+        io_count = self.device_map.get_io_count(disk)
+        if io_count < 0:
+            return paths
+
+        with self.watch_lock:
+            deferred_device = self.deferred_devices.get(device)
+            if deferred_device is None:
+                deferred_device = DeferredDevice(disk, io_count, time.time())
+                self.deferred_devices[device] = deferred_device
+            deferred_device.roots.extend((scan_name, path) for path in paths)
+
+        for path in paths:
+            self._log_info(
+                f"Deferring walk until the disk wakes {utils.get_tag("name", scan_name)} {utils.get_tag("path", path)} {utils.get_tag("disk", disk)}"
+            )
+
+        # The monitor thread checks the disk for activity
+        with self.monitor_condition:
+            self.monitor_condition.notify()
+        return []
+
+    def __walk_device_paths(
+        self,
+        inotify_trees: "external.PyInotify.inotify.adapters.InotifyTrees",
+        device: int,
+        paths: list[str]
+    ):
+        """ Watch the scan paths of one device one after another """
+        with self.__get_device_lock(device):
+            for path in paths:
+                folders = inotify_trees.add_watch_tree(path, synthesize_entries=False)
+                if len(folders) == 0:
+                    self._log_warning(
+                        f"Unable to watch scan path {utils.get_tag("path", path)}"
+                    )
+                elif self.tree_snapshot is not None:
+                    self.__save_tree_snapshot(path, self.__get_folder_times(folders))
+
+    def __walk_scan_paths(
         self,
         scan_config: ScanConfigInfo,
-        monitor_condition: Condition
+        inotify_trees: "external.PyInotify.inotify.adapters.InotifyTrees"
     ):
-        """ Setup the monitor for a scan configuration """
-        scanner_mask = (
-            external.PyInotify.inotify.constants.IN_MODIFY | external.PyInotify.inotify.constants.IN_MOVED_FROM
-            | external.PyInotify.inotify.constants.IN_MOVED_TO | external.PyInotify.inotify.constants.IN_CREATE
-            | external.PyInotify.inotify.constants.IN_DELETE
+        """ Watch the scan paths walking different devices in parallel and deferring sleeping disks """
+        walk_threads: list[Thread] = []
+        for device, paths in self.device_map.group_paths(scan_config.paths).items():
+            paths = self.__defer_sleeping_paths(scan_config.name, device, paths)
+            if len(paths) > 0:
+                thread = Thread(target=self.__walk_device_paths, args=(inotify_trees, device, paths))
+                thread.start()
+                walk_threads.append(thread)
+
+        for thread in walk_threads:
+            thread.join()
+
+    def __walk_deferred_path(
+        self,
+        scan_name: str,
+        inotify_trees: "external.PyInotify.inotify.adapters.InotifyTrees",
+        path: str,
+        defer_time: float
+    ):
+        """ Watch a scan path of a disk that woke up and report the folders changed while it was not watched """
+        with self.__get_device_lock(self.device_map.get_device(path)):
+            folders = inotify_trees.add_watch_tree(path, synthesize_entries=False)
+        folder_times = self.__get_folder_times(folders)
+
+        # Without a snapshot only the changes made since the walk was deferred are found
+        saved_times = self.tree_snapshot.get_folders(path) if self.tree_snapshot is not None else None
+        if saved_times is None:
+            defer_time_ns = int(defer_time * 1000000000)
+            changed_folders = [folder for folder, mtime in folder_times.items() if mtime >= defer_time_ns]
+        else:
+            changed_folders = [folder for folder, mtime in folder_times.items() if saved_times.get(folder) != mtime]
+        if self.tree_snapshot is not None:
+            self.__save_tree_snapshot(path, folder_times)
+
+        # The files of the changed folders go through the filters like the events they stand in for
+        event_paths: list[str] = []
+        event_filenames: list[str] = []
+        for folder in changed_folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if not entry.is_dir():
+                            event_paths.append(folder)
+                            event_filenames.append(entry.name)
+            except OSError:
+                continue
+        self.event_buffer.put(scan_name, event_paths, event_filenames)
+
+        self._log_info(
+            f"Walked woken disk {utils.get_tag("name", scan_name)} {utils.get_tag("path", path)} {utils.get_tag("folders", len(folders))} {utils.get_tag("changed", len(changed_folders))}"
         )
 
-        # Make a copy of the paths to send to inotify since these will get deleted
-        inotify_paths: list[str] = []
+    def process_deferred_devices(self):
+        """ Hand the scan paths of the deferred disks that woke up to their watch threads """
+        if len(self.deferred_devices) == 0:
+            return
+
+        woken_trees: list[external.PyInotify.inotify.adapters.InotifyTrees] = []
+        with self.watch_lock:
+            for device, deferred_device in list(self.deferred_devices.items()):
+                # Any read or write means the disk spins so walking it no longer wakes it
+                if self.device_map.get_io_count(deferred_device.disk) == deferred_device.io_count:
+                    continue
+                # Wait for the other scan paths of the scans to be watched
+                if any(scan_name not in self.inotify_trees for scan_name, _path in deferred_device.roots):
+                    continue
+
+                del self.deferred_devices[device]
+                for scan_name, path in deferred_device.roots:
+                    self.watch_requests.setdefault(scan_name, []).append(
+                        WatchRequest("walk", path, deferred_device.defer_time)
+                    )
+                    woken_trees.append(self.inotify_trees[scan_name])
+                self._log_info(
+                    f"Disk woke up {utils.get_tag("disk", deferred_device.disk)} {utils.get_tag("paths", len(deferred_device.roots))}"
+                )
+
+        # The watch threads walk the scan paths they own
+        for inotify_trees in woken_trees:
+            inotify_trees.inotify.wakeup()
+
+    def __monitor_path(self, scan_config: ScanConfigInfo, stop_event: threading.Event):
+        """ Setup the monitor for a scan configuration """
         for scan_path in scan_config.paths:
             self._log_info(
                 f"Starting monitor {utils.get_tag("name", scan_config.name)} {utils.get_tag("path", scan_path)}"
             )
-            inotify_paths.append(scan_path)
 
         # Setup the inotify watches for the current folder and all sub-folders
+        # The watch blocks until an event arrives or it is interrupted to stop
         i = external.PyInotify.inotify.adapters.InotifyTrees(
             logger=self.log_manager.get_logger(),
-            paths=inotify_paths,
-            mask=scanner_mask
+            paths=[],
+            mask=SCANNER_MASK,
+            block_duration_s=None
         )
+        self.scan_filter.apply_to_watch(i.inotify)
+        self.__walk_scan_paths(scan_config, i)
+        with self.watch_lock:
+            if stop_event.is_set():
+                return
+            self.inotify_trees[scan_config.name] = i
+
+        for batch in i.event_batch_gen():
+            if self.stop_threads or stop_event.is_set():
+                break
+
+            self.event_buffer.put(scan_config.name, batch.path, batch.name)
+            if len(batch.renames) > 0 and len(self.quarantined_directories) > 0:
+                self.__rename_quarantined_directories(scan_config.name, batch.renames)
+            if scan_config.name in self.watch_requests:
+                self.__apply_watch_requests(scan_config.name, i)
+
+        for scan_path in scan_config.paths:
+            self._log_info(
+                f"Stopping watch {utils.get_tag("name", scan_config.name)} {utils.get_tag("path", scan_path)}"
+            )
+        with self.watch_lock:
+            if self.inotify_trees.get(scan_config.name) is i:
+                del self.inotify_trees[scan_config.name]
+
+    def __start_watch(self, scan_config: ScanConfigInfo):
+        """ Start the watch thread for a scan configuration """
+        stop_event = threading.Event()
+        with self.watch_lock:
+            self.watch_stop_events[scan_config.name] = stop_event
+        thread = Thread(
+            target=self.__monitor_path,
+            args=(scan_config, stop_event)
+        )
+        thread.start()
+
+        self.threads.append(thread)
+
+    def __stop_watch(self, scan_name: str):
+        """ Stop the watch thread for a scan configuration """
+        with self.watch_lock:
+            stop_event = self.watch_stop_events.pop(scan_name, None)
+            if stop_event is not None:
+                stop_event.set()
+                inotify_trees = self.inotify_trees.pop(scan_name, None)
+                if inotify_trees is not None:
+                    inotify_trees.inotify.interrupt()
+
+            # A restarted watch starts with every folder watched or deferred again
+            self.watch_requests.pop(scan_name, None)
+            for device, deferred_device in list(self.deferred_devices.items()):
+                deferred_device.roots = [root for root in deferred_device.roots if root[0] != scan_name]
+                if len(deferred_device.roots) == 0:
+                    del self.deferred_devices[device]
+            for path, quarantined_directory in list(self.quarantined_directories.items()):
+                if quarantined_directory.scan_name == scan_name:
+                    del self.quarantined_directories[path]
+
+    def process_event(
+        self,
+        scan_config: ScanConfigInfo,
+        path: str,
+        filename: str
+    ) -> bool:
+        """ Add an event to a monitor if the folder and file extension are valid """
+        # Make sure this is valid path to monitor and the extension is valid add the file monitor
+        if self.scan_filter.get_event_valid(path, filename):
+            if self.trace_recorder is not None:
+                self.trace_recorder.record(self.clock(), scan_config.name, path, filename)
+            self.__record_hot_directories(scan_config, [(path, filename)])
+            if len(self.__remove_suppressed_events(scan_config.name, [(path, filename)])) == 0:
+                return False
+
+            self.accepted_event_counts[scan_config.name] = self.accepted_event_counts.get(
+                scan_config.name, 0) + 1
+            self.__add_file_monitor(path, scan_config, self.monitor_condition)
+            return True
+        return False
+
+    def __remove_suppressed_events(self, scan_name: str, events: list[tuple[str, str]]) -> list[tuple[str, str]]:
+        """ Remove the changes a media server most likely wrote after it was notified """
+        if not self.scan_suppressor.get_enabled():
+            return events
+
+        current_time = self.clock()
+        kept_events = [
+            (path, filename) for path, filename in events
+            if not self.scan_suppressor.get_suppressed(path, filename, current_time)
+        ]
+        if len(kept_events) < len(events):
+            self.suppressed_event_counts[scan_name] = self.suppressed_event_counts.get(
+                scan_name, 0) + len(events) - len(kept_events)
+        return kept_events
+
+    def process_events(
+        self,
+        scan_config: ScanConfigInfo,
+        paths: list[str],
+        filenames: list[str]
+    ) -> int:
+        """ Add a batch of events to a monitor adding each changed folder once """
+        valid_events = self.scan_filter.filter_events(paths, filenames)
+        if len(valid_events) == 0:
+            return 0
+
+        # The trace holds the events before suppression so a replay can compare suppression settings
+        if self.trace_recorder is not None:
+            event_time = self.clock()
+            for path, filename in valid_events:
+                self.trace_recorder.record(event_time, scan_config.name, path, filename)
+        self.__record_hot_directories(scan_config, valid_events)
+        valid_events = self.__remove_suppressed_events(scan_config.name, valid_events)
+        if len(valid_events) == 0:
+            return 0
 
-        for event in i.event_gen(yield_nones=False):
-            if self.stop_threads:
-                for scan_path in scan_config.paths:
+        self.accepted_event_counts[scan_config.name] = self.accepted_event_counts.get(
+            scan_config.name, 0) + len(valid_events)
+
+        for path in dict.fromkeys(path for path, _filename in valid_events):
+            self.__add_file_monitor(path, scan_config, self.monitor_condition)
+        return len(valid_events)
+
+    def __process_buffered_events(self):
+        """ Thread to add the events read by the watches to the monitors """
+        while True:
+            batches = self.event_buffer.get()
+            if batches is None:
+                break
+
+            scan_events: dict[str, tuple[list[str], list[str]]] = {}
+            for scan_name, paths, filenames in batches:
+                scan_paths, scan_filenames = scan_events.setdefault(scan_name, ([], []))
+                scan_paths.extend(paths)
+                scan_filenames.extend(filenames)
+            for scan_config in self.scan_configs:
+                if scan_config.name in scan_events:
+                    # A bad event only loses its own batch and never stops the thread
+                    try:
+                        self.process_events(scan_config, *scan_events[scan_config.name])
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        self._log_error(
+                            f"Processing events failed {utils.get_tag("name", scan_config.name)} {utils.get_tag("error", e)}"
+                        )
+
+        self._log_info("Stopping event processing thread")
+
+    def __start_shards(self):
+        """ Start the worker processes watching the scans and the thread receiving their updates """
+        # Imported here since the workers are only used on linux and when shard_workers is set
+        from service.shard_worker import ShardScanInfo, run_shard_worker  # pylint: disable=import-outside-toplevel
+
+        shard_count = min(self.shard_workers, len(self.scan_configs))
+        shard_scans: list[list[ShardScanInfo]] = [[] for _ in range(shard_count)]
+        for index, scan_config in enumerate(self.scan_configs):
+            shard_scans[index % shard_count].append(
+                ShardScanInfo(scan_config.name, list(scan_config.paths))
+            )
+
+        # Spawn so the workers do not inherit the threads and locks of this process
+        context = multiprocessing.get_context("spawn")
+        if self.shard_queue is None:
+            self.shard_queue = context.Queue()
+        self.shard_stop_event = context.Event()
+        for shard_id, scans in enumerate(shard_scans):
+            for scan in scans:
+                for scan_path in scan.paths:
                     self._log_info(
-                        f"Stopping watch {utils.get_tag("name", scan_config.name)} {utils.get_tag("path", scan_path)}"
+                        f"Starting monitor {utils.get_tag("shard", shard_id)} {utils.get_tag("name", scan.name)} {utils.get_tag("path", scan_path)}"
                     )
+            process = context.Process(
+                target=run_shard_worker,
+                args=(
+                    shard_id,
+                    scans,
+                    self.ignore_folder_list,
+                    self.valid_file_extension_list,
+                    self.shard_coalesce_seconds,
+                    self.shard_queue,
+                    self.shard_stop_event
+                ),
+                name=f"remotescan-shard{shard_id}",
+                daemon=True
+            )
+            process.start()
+            self.shard_processes.append(process)
+
+        # The receive thread keeps running when the shards are restarted by a reload
+        if self.shard_receive_thread is None:
+            self.shard_receive_thread = Thread(target=self.__receive_shard_updates)
+            self.shard_receive_thread.start()
+            self.threads.append(self.shard_receive_thread)
+
+    def __receive_shard_updates(self):
+        """ Thread to add the folder updates of the shard workers to the monitors """
+        while not self.stop_threads:
+            message = self.shard_queue.get()
+            message_type, shard_id = message[0], message[1]
+            if message_type == "stop":
                 break
+            if message_type == "folders":
+                scan_events: dict[str, tuple[list[str], list[str]]] = {}
+                for scan_name, path, filename in message[2]:
+                    paths, filenames = scan_events.setdefault(scan_name, ([], []))
+                    paths.append(path)
+                    filenames.append(filename)
+                for scan_name, (paths, filenames) in scan_events.items():
+                    self.event_buffer.put(scan_name, paths, filenames)
+            elif message_type == "stats":
+                self.shard_stats[shard_id] = message[2:]
+            elif message_type == "ready":
+                self.shard_stats[shard_id] = (0, 0, message[2], 0)
+                self._log_info(
+                    f"Shard ready {utils.get_tag("shard", shard_id)} {utils.get_tag("watches", message[2])}"
+                )
+            elif message_type == "error":
+                self._log_error(
+                    f"Shard stopped {utils.get_tag("shard", shard_id)} {utils.get_tag("error", message[2])}"
+                )
 
-            (_, _type_names, path, filename) = event
-            if filename != "":
-                # Make sure this is valid path to monitor and the extension is valid add the file monitor
-                if (
-                    self.__get_scan_path_valid(path)
-                    and self.__get_scan_extension_valid(filename)
-                ):
-                    self.__add_file_monitor(path, scan_config, monitor_condition)
+        self._log_info("Stopping shard receive thread")
 
-    def init_scheduler_jobs(self):
-        for scan_config in self.scan_configs:
-            thread = Thread(
-                target=self.__monitor_path,
-                args=(scan_config, self.monitor_condition,)
+    def __stop_shards(self):
+        """ Stop the shard worker processes """
+        if self.shard_stop_event is not None:
+            self.shard_stop_event.set()
+        for process in self.shard_processes:
+            process.join(max(self.shard_coalesce_seconds * 4, 2))
+            if process.is_alive():
+                process.terminate()
+        self.shard_processes.clear()
+        self.shard_stats.clear()
+
+    def collect_metrics(self) -> list[MetricFamily]:
+        """ Get the event, watch, monitor and notify metrics of the service """
+        events_read = MetricFamily(
+            "remotescan_events_read_total",
+            "counter",
+            "Raw inotify events read for a scan or shard"
+        )
+        events_accepted = MetricFamily(
+            "remotescan_events_accepted_total",
+            "counter",
+            "Events for a scan that passed the ignore folder and extension filters"
+        )
+        epoll_wakeups = MetricFamily(
+            "remotescan_epoll_wakeups_total",
+            "counter",
+            "Times the watcher for a scan or shard woke from epoll"
+        )
+        events_suppressed = MetricFamily(
+            "remotescan_events_suppressed_total",
+            "counter",
+            "Events for a scan ignored as changes written by a media server after a notify"
+        )
+        for scan_name, suppressed_count in list(self.suppressed_event_counts.items()):
+            events_suppressed.add_sample({"scan": scan_name}, suppressed_count)
+        events_synthesized = MetricFamily(
+            "remotescan_events_synthesized_total",
+            "counter",
+            "Events synthesized for entries found when a new directory was watched"
+        )
+        watches = MetricFamily(
+            "remotescan_watches",
+            "gauge",
+            "Inotify watches registered for a scan or shard"
+        )
+        for scan_name, tree in list(self.inotify_trees.items()):
+            labels = {"scan": scan_name}
+            events_read.add_sample(labels, tree.inotify.event_count)
+            events_accepted.add_sample(labels, self.accepted_event_counts.get(scan_name, 0))
+            epoll_wakeups.add_sample(labels, tree.inotify.epoll_wakeup_count)
+            events_synthesized.add_sample(labels, tree.synthetic_event_count)
+            watches.add_sample(labels, tree.inotify.watch_count)
+
+        buffered_events = MetricFamily(
+            "remotescan_event_buffer_events",
+            "gauge",
+            "Events read by the watches waiting to be added to the monitors"
+        )
+        buffered_events.add_sample({}, self.event_buffer.event_count)
+        buffer_high_water_mark = MetricFamily(
+            "remotescan_event_buffer_high_water_mark",
+            "gauge",
+            "Most events ever waiting in the event buffer"
+        )
+        buffer_high_water_mark.add_sample({}, self.event_buffer.high_water_mark)
+        buffer_coalesced = MetricFamily(
+            "remotescan_event_buffer_coalesced_total",
+            "counter",
+            "Events coalesced per folder because the event buffer was full"
+        )
+        buffer_coalesced.add_sample({}, self.event_buffer.coalesced_count)
+
+        pending_monitors = MetricFamily(
+            "remotescan_pending_monitors",
+            "gauge",
+            "Monitors waiting for seconds_before_notify to pass"
+        )
+        pending_monitors.add_sample({}, len(self.monitors))
+        ready_targets = MetricFamily(
+            "remotescan_ready_targets",
+            "gauge",
+            "Media server libraries waiting for their rate limit or a running scan"
+        )
+        ready_targets.add_sample({}, len(self.ready_targets))
+        notify_queue = MetricFamily(
+            "remotescan_notify_queue",
+            "gauge",
+            "Media server libraries handed to the notifier and not yet notified"
+        )
+        notify_queue.add_sample({}, self.notifier.get_pending_count())
+        hot_directory_events = MetricFamily(
+            "remotescan_hot_directory_events",
+            "gauge",
+            "Events of the folders with the most events in the current window"
+        )
+        for hot_directory in self.hot_directories.get_top(HOT_DIRECTORY_REPORT_COUNT):
+            hot_directory_events.add_sample({"folder": hot_directory.path}, hot_directory.count)
+        quarantined_directories = MetricFamily(
+            "remotescan_quarantined_directories",
+            "gauge",
+            "Folders whose watches are removed because they had too many events"
+        )
+        quarantined_directories.add_sample({}, len(self.quarantined_directories))
+        quarantined_total = MetricFamily(
+            "remotescan_quarantined_directories_total",
+            "counter",
+            "Folders quarantined because they had too many events"
+        )
+        quarantined_total.add_sample({}, self.quarantined_count)
+        deferred_paths = MetricFamily(
+            "remotescan_deferred_paths",
+            "gauge",
+            "Scan paths waiting for their sleeping disk to wake before they are walked"
+        )
+        for deferred_device in list(self.deferred_devices.values()):
+            deferred_paths.add_sample({"disk": deferred_device.disk}, len(deferred_device.roots))
+
+        debounce_wait = MetricFamily(
+            "remotescan_debounce_wait_seconds",
+            "histogram",
+            "Time from the first event of a monitor until it was ready to notify"
+        )
+        debounce_wait.add_histogram({}, self.debounce_wait_histogram)
+        event_to_notify = MetricFamily(
+            "remotescan_event_to_notify_seconds",
+            "histogram",
+            "Time from the first event of a monitor until the media server was notified"
+        )
+        for (server_type, server_name), histogram in list(self.event_to_notify_histograms.items()):
+            event_to_notify.add_histogram(
+                {"server_type": server_type, "server": server_name},
+                histogram
             )
-            thread.start()
 
-            self.threads.append(thread)
+        for shard_id, (event_count, epoll_wakeup_count, watch_count, synthetic_event_count) in list(self.shard_stats.items()):
+            labels = {"shard": str(shard_id)}
+            events_read.add_sample(labels, event_count)
+            epoll_wakeups.add_sample(labels, epoll_wakeup_count)
+            events_synthesized.add_sample(labels, synthetic_event_count)
+            watches.add_sample(labels, watch_count)
+        if len(self.shard_stats) > 0:
+            for scan_name, accepted_count in list(self.accepted_event_counts.items()):
+                events_accepted.add_sample({"scan": scan_name}, accepted_count)
+
+        return [
+            events_read,
+            events_accepted,
+            epoll_wakeups,
+            events_suppressed,
+            events_synthesized,
+            watches,
+            buffered_events,
+            buffer_high_water_mark,
+            buffer_coalesced,
+            pending_monitors,
+            ready_targets,
+            notify_queue,
+            hot_directory_events,
+            quarantined_directories,
+            quarantined_total,
+            deferred_paths,
+            debounce_wait,
+            event_to_notify
+        ]
+
+    def init_scheduler_jobs(self):
+        self.event_thread = Thread(target=self.__process_buffered_events)
+        self.event_thread.start()
+        self.notifier.start()
+
+        if self.shard_workers > 0 and len(self.scan_configs) > 0:
+            self.__start_shards()
+        else:
+            for scan_config in self.scan_configs:
+                self.__start_watch(scan_config)
 
         # Start the monitor thread
         # This thread is responsible for running at a periodic rate
@@ -471,33 +1760,192 @@ class Remotescan(ServiceBase):
         )
         self.monitor_thread.start()
 
+    def __get_libraries_changed(self, current: ScanConfigInfo, new: ScanConfigInfo) -> bool:
+        """ Get if the media server libraries of a scan changed """
+        return (
+            current.plex_library_list != new.plex_library_list
+            or current.emby_library_list != new.emby_library_list
+            or current.jellyfin_library_list != new.jellyfin_library_list
+        )
+
+    def reload(self, config: dict):
+        """ Reload the configuration only changing the watches of scans that changed """
+        if "remote_scan" not in config:
+            self._log_error("Configuration reload problem no remote_scan data found!")
+            return
+
+        remote_scan_config = config["remote_scan"]
+        new_scan_configs = self.__get_scan_configs(remote_scan_config)
+        current_scans = {scan_config.name: scan_config for scan_config in self.scan_configs}
+        new_scans = {scan_config.name: scan_config for scan_config in new_scan_configs}
+
+        previous_filter = (self.ignore_folder_list, self.valid_file_extension_list)
+        previous_shards = (self.shard_workers, self.shard_coalesce_seconds)
+        previous_rates = (
+            self.seconds_between_notifies,
+            self.seconds_between_library_notifies,
+            self.notify_burst
+        )
+
+        added_names = [name for name in new_scans if name not in current_scans]
+        removed_names = [name for name in current_scans if name not in new_scans]
+        changed_names = [
+            name for name in new_scans
+            if name in current_scans and new_scans[name].paths != current_scans[name].paths
+        ]
+
+        with self.monitor_lock:
+            previous_settings = dict(self.__dict__)
+            try:
+                self.__load_settings(remote_scan_config)
+            except Exception:
+                # A setting with the wrong type leaves every current setting in place
+                self.__dict__.update(previous_settings)
+                raise
+            if previous_rates != (
+                self.seconds_between_notifies,
+                self.seconds_between_library_notifies,
+                self.notify_burst
+            ):
+                self.server_limiters.clear()
+                self.library_limiters.clear()
+
+            # Pending monitors are kept for every scan that still exists with its new libraries
+            monitors: list[ScanConfigInfo] = []
+            for monitor in self.monitors:
+                if monitor.name in new_scans:
+                    monitor.plex_library_list = new_scans[monitor.name].plex_library_list
+                    monitor.emby_library_list = new_scans[monitor.name].emby_library_list
+                    monitor.jellyfin_library_list = new_scans[monitor.name].jellyfin_library_list
+                    monitors.append(monitor)
+            self.monitors = monitors
+
+            # Ready targets are dropped only when their media server is no longer configured
+            for key in list(self.ready_targets):
+                if self.__get_target_api(key[0], key[1]) is None:
+                    del self.ready_targets[key]
+
+            # A reload can fix the url or api key of a failing media server so its backoff starts over
+            self.server_retries.clear()
+
+            # Scans with unchanged paths keep their watch and only update the libraries
+            scan_configs: list[ScanConfigInfo] = []
+            for name, new_scan in new_scans.items():
+                if name in current_scans and name not in changed_names:
+                    current_scan = current_scans[name]
+                    if self.__get_libraries_changed(current_scan, new_scan):
+                        current_scan.plex_library_list = new_scan.plex_library_list
+                        current_scan.emby_library_list = new_scan.emby_library_list
+                        current_scan.jellyfin_library_list = new_scan.jellyfin_library_list
+                        self._log_info(f"Reloaded libraries {utils.get_tag("name", name)}")
+                    current_scan.plex_paths = new_scan.plex_paths
+                    scan_configs.append(current_scan)
+                else:
+                    scan_configs.append(new_scan)
+            self.scan_configs = scan_configs
+
+        self.__load_trace(remote_scan_config)
+
+        if len(self.shard_processes) > 0 or self.shard_workers > 0:
+            # Shard workers hold their own copy of the scans and filters so they are restarted
+            if (
+                len(added_names) > 0
+                or len(removed_names) > 0
+                or len(changed_names) > 0
+                or previous_filter != (self.ignore_folder_list, self.valid_file_extension_list)
+                or previous_shards != (self.shard_workers, self.shard_coalesce_seconds)
+            ):
+                self.__stop_shards()
+                for name in list(self.watch_stop_events):
+                    self.__stop_watch(name)
+                if self.shard_workers > 0 and len(self.scan_configs) > 0:
+                    self.__start_shards()
+                else:
+                    for scan_config in self.scan_configs:
+                        self.__start_watch(scan_config)
+        else:
+            for name in removed_names + changed_names:
+                self.__stop_watch(name)
+            for name in added_names + changed_names:
+                self.__start_watch(new_scans[name])
+
+        self._log_info(
+            f"Configuration reloaded {utils.get_tag("added", len(added_names))} {utils.get_tag("removed", len(removed_names))} {utils.get_tag("changed", len(changed_names))}"
+        )
+
+    def __drain_monitors(self):
+        """ Notify the due and near due monitors until the shutdown drain deadline """
+        deadline = time.monotonic() + self.seconds_shutdown_drain
+        with self.monitor_lock:
+            # Monitors that would be due within the drain window are released now
+            current_time = self.clock()
+            waiting_monitors: list[ScanConfigInfo] = []
+            for monitor in self.monitors:
+                if (current_time - monitor.time) >= self.seconds_before_notify - self.seconds_shutdown_drain:
+                    self.__add_ready_targets(monitor)
+                    if self.journal is not None:
+                        self.journal.record_monitor_done(monitor.name)
+                else:
+                    waiting_monitors.append(monitor)
+            self.monitors = waiting_monitors
+
+        while (len(self.ready_targets) > 0 or len(self.notifying_servers) > 0) and time.monotonic() < deadline:
+            with self.monitor_lock:
+                released = self.__release_ready_targets(self.clock())
+            for key, target, release_time in released:
+                self.notifier.submit(key[:2], key, target, release_time)
+            if len(self.ready_targets) > 0 or len(self.notifying_servers) > 0:
+                time.sleep(min(self.seconds_monitor_rate, max(deadline - time.monotonic(), 0)))
+
+        if (
+            self.journal is not None
+            and len(self.monitors) == 0
+            and len(self.ready_targets) == 0
+            and len(self.notifying_servers) == 0
+        ):
+            self.journal.reset()
+
+        self._log_info(
+            f"Shutdown drain finished {utils.get_tag("monitors", len(self.monitors))} {utils.get_tag("targets", len(self.ready_targets))}"
+        )
+
     def shutdown(self):
         """ Shutdown all monitors and threads """
         self.stop_threads = True
-        
+
         with self.monitor_condition:
             self.monitor_condition.notify()
 
-        # Create a temp file to notify the inotify adapters
-        temp_file_path = "/temp.txt"
-        for scan in self.scan_configs:
-            for path in scan.paths:
-                temp_file = f"{path}{temp_file_path}"
-                with open(temp_file, "w", encoding="utf-8") as file:
-                    file.write("BREAK")
-                    break
+        # Wake every watch so it stops without touching the media folders
+        if len(self.shard_processes) > 0:
+            self.__stop_shards()
+        if self.shard_queue is not None:
+            self.shard_queue.put(("stop", None))
+        for scan_name in list(self.watch_stop_events):
+            self.__stop_watch(scan_name)
 
-        # allow time for the events
-        time.sleep(1)
+        # Events already read are added to the monitors before they are drained or journaled
+        if self.shard_receive_thread is not None:
+            self.shard_receive_thread.join()
+        self.event_buffer.close()
+        if self.event_thread is not None:
+            self.event_thread.join()
 
-        # clean up the temp files
-        for scan in self.scan_configs:
-            for path in scan.paths:
-                temp_file = f"{path}{temp_file_path}"
-                os.remove(temp_file)
-                break
+        if self.seconds_shutdown_drain > 0:
+            self.__drain_monitors()
+
+        # Targets already handed to the notifier are sent before the journal is closed
+        self.notifier.stop()
 
+        # Work still pending stays in the journal and is restored at the next start
         with self.monitor_lock:
             self.monitors.clear()
+            self.ready_targets.clear()
+
+        if self.journal is not None:
+            self.journal.close()
+
+        if self.trace_recorder is not None:
+            self.trace_recorder.close()
 
         self._log_info("Successful shutdown")
@@ -0,0 +1,100 @@
+""" Scan filter deciding which file system events should start a monitor """
+
+import os
+
+import external.PyInotify.inotify.constants
+
+# Events that can change the contents of a media library
+SCANNER_MASK: int = (
+    external.PyInotify.inotify.constants.IN_MODIFY | external.PyInotify.inotify.constants.IN_MOVED_FROM
+    | external.PyInotify.inotify.constants.IN_MOVED_TO | external.PyInotify.inotify.constants.IN_CREATE
+    | external.PyInotify.inotify.constants.IN_DELETE
+)
+
+
+class ScanFilter:
+    """
+    Filters events by ignored folders and valid file extensions.
+    """
+
+    def __init__(
+        self,
+        ignore_folder_list: list[str],
+        valid_file_extension_list: list[str]
+    ):
+        """
+        Initializes the ScanFilter.
+
+        Args:
+            ignore_folder_list (list[str]): Paths containing any of these folders are ignored.
+            valid_file_extension_list (list[str]): File extensions to accept. All are accepted if empty.
+        """
+        self.ignore_folder_list = ignore_folder_list
+        self.valid_file_extension_list = valid_file_extension_list
+        self.valid_file_extensions: tuple[str, ...] = tuple(valid_file_extension_list)
+        self.valid_name_suffixes: tuple[bytes, ...] = tuple(
+            os.fsencode(extension) for extension in valid_file_extension_list
+        )
+
+    def apply_to_watch(self, inotify: "external.PyInotify.inotify.adapters.Inotify"):
+        """
+        Filters the events of a watch on their raw bytes before the filenames are decoded.
+
+        The events dropped are the ones filter_events would reject, so only
+        the events that can start a monitor are decoded and buffered.
+
+        Args:
+            inotify (Inotify): The watch to filter.
+        """
+        inotify.set_event_filter(self.valid_name_suffixes, self.ignore_folder_list)
+
+    def get_path_valid(self, path: str) -> bool:
+        """ Get if the path is valid or should be ignored """
+        for folder_name in self.ignore_folder_list:
+            if folder_name in path:
+                return False
+        return True
+
+    def get_extension_valid(self, filename: str) -> bool:
+        """ Get if the filename contains a valid extension """
+        if len(self.valid_file_extensions) > 0:
+            return filename.endswith(self.valid_file_extensions)
+
+        # No valid file extensions defined so all extensions are valid
+        return True
+
+    def get_event_valid(self, path: str, filename: str) -> bool:
+        """ Get if an event for the filename in the path should be added to a monitor """
+        return (
+            filename != ""
+            and self.get_path_valid(path)
+            and self.get_extension_valid(filename)
+        )
+
+    def filter_events(self, paths: list[str], filenames: list[str]) -> list[tuple[str, str]]:
+        """
+        Filters a batch of events read together.
+
+        The events of a read are mostly in the same few folders so the ignored
+        folder check is done once per folder instead of once per event.
+
+        Args:
+            paths (list[str]): The folder of each event.
+            filenames (list[str]): The changed file of each event.
+
+        Returns:
+            list[tuple[str, str]]: The folder and filename of every valid event in order.
+        """
+        path_valid: dict[str, bool] = {}
+        valid_events: list[tuple[str, str]] = []
+        for path, filename in zip(paths, filenames):
+            if filename == "" or not self.get_extension_valid(filename):
+                continue
+
+            valid = path_valid.get(path)
+            if valid is None:
+                valid = self.get_path_valid(path)
+                path_valid[path] = valid
+            if valid:
+                valid_events.append((path, filename))
+        return valid_events
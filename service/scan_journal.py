@@ -0,0 +1,170 @@
+""" Append-only journal of pending scans so they survive a restart """
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass
+class JournalMonitor:
+    """Structure for holding a pending monitor read from the journal. """
+    scan_name: str
+    start_time: float
+    paths: list[str] = field(default_factory=list)
+
+
+@dataclass
+class JournalTarget:
+    """Structure for holding a ready target read from the journal. """
+    server_type: str
+    server_name: str
+    library: str
+    scan_name: str
+    start_time: float
+    paths: list[str] = field(default_factory=list)
+
+
+class ScanJournal:
+    """
+    Append-only journal of monitor and ready target records.
+
+    Records are buffered in memory and written with a single fsync by sync so
+    an event storm costs one disk flush per sync instead of one per event.
+    When nothing is pending the journal is truncated so it only ever holds
+    the work still waiting to be notified.
+
+    Records, one JSON object per line:
+        {"op": "monitor", "scan": ..., "path": ..., "start": ...}
+        {"op": "monitor_done", "scan": ...}
+        {"op": "target", "type": ..., "server": ..., "library": ..., "scan": ..., "path": ..., "start": ...}
+        {"op": "target_done", "type": ..., "server": ..., "library": ...}
+    """
+
+    def __init__(self, journal_path: str):
+        """
+        Initializes the ScanJournal and opens the journal file for appending.
+
+        Args:
+            journal_path (str): The file to write the journal to.
+        """
+        self.journal_path = journal_path
+        self.file = open(journal_path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.pending_lines: list[str] = []
+        self.truncate_pending: bool = False
+        self.sync_count: int = 0
+
+    def __append(self, record: dict):
+        """ Buffer a record until the next sync """
+        line = json.dumps(record, separators=(",", ":"))
+        with self.lock:
+            self.pending_lines.append(f"{line}\n")
+
+    def record_monitor(self, scan_name: str, path: str, start_time: float):
+        """ Record a path added to the pending monitor of a scan """
+        self.__append({"op": "monitor", "scan": scan_name, "path": path, "start": start_time})
+
+    def record_monitor_done(self, scan_name: str):
+        """ Record the monitor of a scan moving to the ready targets """
+        self.__append({"op": "monitor_done", "scan": scan_name})
+
+    def record_target(self, key: tuple[str, str, str], scan_name: str, path: str, start_time: float):
+        """ Record a path added to a ready target """
+        self.__append({
+            "op": "target",
+            "type": key[0],
+            "server": key[1],
+            "library": key[2],
+            "scan": scan_name,
+            "path": path,
+            "start": start_time
+        })
+
+    def record_target_done(self, key: tuple[str, str, str]):
+        """ Record a ready target leaving the ready queue """
+        self.__append({"op": "target_done", "type": key[0], "server": key[1], "library": key[2]})
+
+    def reset(self):
+        """ Discard every record since nothing is pending """
+        with self.lock:
+            self.pending_lines = []
+            self.truncate_pending = True
+
+    def sync(self):
+        """ Write the buffered records and fsync the journal """
+        with self.sync_lock:
+            with self.lock:
+                lines = self.pending_lines
+                truncate = self.truncate_pending
+                self.pending_lines = []
+                self.truncate_pending = False
+
+            if self.file is None or (len(lines) == 0 and not truncate):
+                return
+
+            if truncate:
+                self.file.seek(0)
+                self.file.truncate()
+            self.file.write("".join(lines))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.sync_count += 1
+
+    def close(self):
+        """ Sync and close the journal """
+        self.sync()
+        with self.sync_lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_journal(journal_path: str) -> tuple[list[JournalMonitor], list[JournalTarget]]:
+    """
+    Reads the pending monitors and ready targets left in a journal.
+
+    A partly written last line from a crash is ignored.
+
+    Args:
+        journal_path (str): The journal file to read.
+
+    Returns:
+        tuple[list[JournalMonitor], list[JournalTarget]]: The pending monitors and ready targets.
+    """
+    monitors: dict[str, JournalMonitor] = {}
+    targets: dict[tuple[str, str, str], JournalTarget] = {}
+    if not os.path.exists(journal_path):
+        return [], []
+
+    with open(journal_path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            op = record.get("op")
+            if op == "monitor":
+                monitor = monitors.get(record["scan"])
+                if monitor is None:
+                    monitor = JournalMonitor(record["scan"], record["start"])
+                    monitors[record["scan"]] = monitor
+                if record["path"] not in monitor.paths:
+                    monitor.paths.append(record["path"])
+            elif op == "monitor_done":
+                monitors.pop(record["scan"], None)
+            elif op == "target":
+                key = (record["type"], record["server"], record["library"])
+                target = targets.get(key)
+                if target is None:
+                    target = JournalTarget(*key, record["scan"], record["start"])
+                    targets[key] = target
+                target.start_time = min(target.start_time, record["start"])
+                if record["path"] not in target.paths:
+                    target.paths.append(record["path"])
+            elif op == "target_done":
+                targets.pop((record["type"], record["server"], record["library"]), None)
+
+    return list(monitors.values()), list(targets.values())
@@ -0,0 +1,99 @@
+""" Worker threads sending the media server notifications """
+
+import queue
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from threading import Lock, Thread
+
+
+@dataclass
+class NotifyWorker:
+    """ Worker thread with its own queue of notify jobs """
+    thread: Thread = None
+    jobs: queue.Queue = field(default_factory=queue.Queue)
+    active_count: int = 0
+
+
+class ScanNotifier:
+    """
+    Runs notify jobs on a worker thread per media server, each with its own queue.
+
+    The monitor logic only decides what is due while holding its lock and
+    submits the work here, so a slow or unavailable media server never holds
+    up the watches recording new events or the notifies of other media
+    servers. Until the workers are started jobs are run by the caller, which
+    keeps a replay on a virtual clock deterministic. Once stop has queued its
+    sentinels new jobs are refused until the workers are started again
+    instead of being queued behind them and lost.
+    """
+
+    def __init__(self, notify: Callable[..., None]):
+        """
+        Initializes the ScanNotifier.
+
+        Args:
+            notify (Callable[..., None]): Called with the arguments of each submitted job.
+        """
+        self.notify = notify
+        self.workers: dict[Hashable, NotifyWorker] = {}
+        self.started: bool = False
+        self.stopping: bool = False
+        self.lock = Lock()
+
+    def start(self):
+        """ Start running the jobs on the worker threads """
+        with self.lock:
+            self.started = True
+            self.stopping = False
+
+    def submit(self, worker_key: Hashable, *args) -> bool:
+        """ Queue a notify job on the worker of the key running it immediately if not started, False if it was refused """
+        with self.lock:
+            if self.stopping:
+                return False
+            if self.started:
+                # Workers are created on the first job of each key
+                worker = self.workers.get(worker_key)
+                if worker is None:
+                    worker = NotifyWorker()
+                    worker.thread = Thread(target=self.__run, args=(worker,))
+                    worker.thread.start()
+                    self.workers[worker_key] = worker
+                worker.jobs.put(args)
+                return True
+        self.notify(*args)
+        return True
+
+    def get_pending_count(self) -> int:
+        """ Get the number of jobs queued or running on every worker """
+        with self.lock:
+            workers = list(self.workers.values())
+        return sum(worker.jobs.qsize() + worker.active_count for worker in workers)
+
+    def __run(self, worker: NotifyWorker):
+        """ Worker thread running the queued jobs of its key in order """
+        while True:
+            args = worker.jobs.get()
+            if args is None:
+                break
+
+            worker.active_count = 1
+            try:
+                self.notify(*args)
+            finally:
+                worker.active_count = 0
+
+    def stop(self):
+        """ Run the jobs already queued then stop the worker threads """
+        with self.lock:
+            if not self.started:
+                return
+            self.stopping = True
+            workers = list(self.workers.values())
+            for worker in workers:
+                worker.jobs.put(None)
+        for worker in workers:
+            worker.thread.join()
+        with self.lock:
+            self.workers.clear()
+            self.started = False
@@ -0,0 +1,124 @@
+""" Suppression of the changes media servers write back after being notified """
+
+import fnmatch
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass
+class NotifiedFolder:
+    """Structure for holding a folder a media server was recently told to scan. """
+    expire_time: float
+    fingerprints: dict[str, tuple[int, int, int]] = field(default_factory=dict)
+
+
+class ScanSuppressor:
+    """
+    Ignores the changes a media server makes to a folder it was just told to scan.
+
+    Emby and Jellyfin write nfo, artwork and subtitle files into the media
+    folders after a refresh. Without suppression every refresh starts a new
+    monitor that sends another refresh. For seconds_suppress after a notify
+    changes in the notified folders are ignored when the filename matches a
+    sidecar pattern, or when the file still has the size, modification time
+    and inode it had when the notify was sent.
+    """
+
+    def __init__(self, seconds_suppress: float, sidecar_patterns: list[str]):
+        """
+        Initializes the ScanSuppressor.
+
+        Args:
+            seconds_suppress (float): Seconds after a notify that changes are suppressed. 0 disables suppression.
+            sidecar_patterns (list[str]): Filename patterns such as *.nfo written by the media servers.
+        """
+        self.seconds_suppress = seconds_suppress
+        self.sidecar_patterns = sidecar_patterns
+        self.sidecar_regex: re.Pattern = None
+        if len(sidecar_patterns) > 0:
+            self.sidecar_regex = re.compile(
+                "|".join(fnmatch.translate(pattern.strip().lower()) for pattern in sidecar_patterns)
+            )
+        self.folders: dict[str, NotifiedFolder] = {}
+        self.lock = threading.Lock()
+
+    def get_enabled(self) -> bool:
+        """ Get if changes are suppressed after a notify """
+        return self.seconds_suppress > 0
+
+    def __get_fingerprints(self, path: str) -> dict[str, tuple[int, int, int]]:
+        """ Get the size, modification time and inode of every file in a folder """
+        fingerprints: dict[str, tuple[int, int, int]] = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        fingerprints[entry.name] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        except OSError:
+            pass
+        return fingerprints
+
+    def record_notify(self, paths: list[str], current_time: float):
+        """
+        Remembers the folders a media server was just told to scan.
+
+        Args:
+            paths (list[str]): The folders that were notified.
+            current_time (float): The time of the notify.
+        """
+        if not self.get_enabled():
+            return
+
+        expire_time = current_time + self.seconds_suppress
+        notified_folders = {
+            path: NotifiedFolder(expire_time, self.__get_fingerprints(path)) for path in paths
+        }
+        with self.lock:
+            self.folders = {
+                path: folder for path, folder in self.folders.items() if folder.expire_time > current_time
+            }
+            self.folders.update(notified_folders)
+
+    def __get_folder(self, path: str, current_time: float) -> NotifiedFolder:
+        """ Get the notified folder of a path that is still suppressing changes """
+        with self.lock:
+            folder = self.folders.get(path)
+            if folder is not None and folder.expire_time <= current_time:
+                del self.folders[path]
+                return None
+            return folder
+
+    def get_suppressed(self, path: str, filename: str, current_time: float) -> bool:
+        """
+        Checks if a change was most likely written by a media server after a notify.
+
+        Args:
+            path (str): The folder of the change.
+            filename (str): The changed file.
+            current_time (float): The time of the change.
+
+        Returns:
+            bool: True if the change should be ignored, False otherwise.
+        """
+        if not self.get_enabled() or len(self.folders) == 0:
+            return False
+
+        folder = self.__get_folder(path, current_time)
+        if self.sidecar_regex is not None and self.sidecar_regex.match(filename.lower()):
+            # Artwork is also written to sub-folders of the notified folder
+            search_path = path
+            while folder is None and search_path.rfind("/") > 0:
+                search_path = search_path[:search_path.rfind("/")]
+                folder = self.__get_folder(search_path, current_time)
+            return folder is not None
+
+        if folder is None or filename not in folder.fingerprints:
+            return False
+        try:
+            stat = os.stat(os.path.join(path, filename), follow_symlinks=False)
+        except OSError:
+            return False
+        return folder.fingerprints[filename] == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
@@ -1,8 +1,7 @@
 """ Base class for all services in the application. """
 
-from apscheduler.schedulers.blocking import BlockingScheduler
-
 from common.log_manager import LogManager
+from common.metrics import MetricFamily
 
 class ServiceBase:
     """
@@ -15,11 +14,9 @@ class ServiceBase:
     def __init__(
         self,
         log_manager: LogManager,
-        scheduler: BlockingScheduler,
     ):
-        """Initializes the ServiceBase with a log_manager and scheduler."""
+        """Initializes the ServiceBase with a log_manager."""
         self.log_manager = log_manager
-        self.scheduler = scheduler
 
     def _log_info(self, message: str):
         """ Log an info message. """
@@ -34,7 +31,14 @@ class ServiceBase:
         self.log_manager.log_error(message)
 
     def init_scheduler_jobs(self):
-        """Initializes any scheduler jobs for the service."""
+        """Starts the threads of the service."""
+
+    def reload(self, config: dict):
+        """Applies a reloaded configuration to the service."""
+
+    def collect_metrics(self) -> list[MetricFamily]:
+        """Returns the current metrics for the service."""
+        return []
 
     def shutdown(self):
         """Shuts down the service, performing any necessary cleanup."""
@@ -0,0 +1,148 @@
+""" Sharded watcher process for very large deployments """
+
+import logging
+import time
+from threading import Thread
+from dataclasses import dataclass, field
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Event
+
+import external.PyInotify.inotify.adapters
+from service.scan_filter import SCANNER_MASK, ScanFilter
+
+# Minimum seconds between statistics updates when no folders changed
+STATS_INTERVAL_SECONDS: float = 10.0
+
+
+@dataclass
+class ShardScanInfo:
+    """Structure for holding the scans watched by a shard. """
+    name: str
+    paths: list[str] = field(default_factory=list)
+
+
+def _get_scan_names(roots: list[tuple[str, list[str]]], path: str) -> list[str]:
+    """ Get the names of every scan watching the path """
+    scan_names: list[str] = []
+    for root, root_scan_names in roots:
+        if path == root or path.startswith(f"{root}/"):
+            scan_names.extend(root_scan_names)
+    return scan_names
+
+
+def _interrupt_on_stop(stop_event: Event, inotify: external.PyInotify.inotify.adapters.Inotify):
+    """ Wake the watch of the shard once the coordinator asks it to stop """
+    stop_event.wait()
+    inotify.interrupt()
+
+
+def run_shard_worker(
+    shard_id: int,
+    scans: list[ShardScanInfo],
+    ignore_folder_list: list[str],
+    valid_file_extension_list: list[str],
+    coalesce_seconds: float,
+    update_queue: Queue,
+    stop_event: Event
+):
+    """
+    Watches the paths of a shard of scans and sends coalesced folder updates.
+
+    The worker owns its own inotify instance and filtering. Accepted events are
+    coalesced per scan and folder for coalesce_seconds and sent to the
+    coordinator as a single message so only changed folders cross the process
+    boundary.
+
+    Messages put on the update queue:
+        ("ready", shard_id, watch_count)
+        ("folders", shard_id, [(scan_name, path, filename), ...])
+        ("stats", shard_id, event_count, epoll_wakeup_count, watch_count, synthetic_event_count)
+        ("error", shard_id, message)
+
+    Args:
+        shard_id (int): The id of this shard.
+        scans (list[ShardScanInfo]): The scans watched by this shard.
+        ignore_folder_list (list[str]): Folders to ignore.
+        valid_file_extension_list (list[str]): Valid file extensions.
+        coalesce_seconds (float): How long to coalesce folder updates before sending.
+        update_queue (Queue): Queue to send the updates to the coordinator.
+        stop_event (Event): Set by the coordinator to stop the worker.
+    """
+    logger = logging.getLogger(f"remotescan.shard{shard_id}")
+    scan_filter = ScanFilter(ignore_folder_list, valid_file_extension_list)
+
+    root_scan_names: dict[str, list[str]] = {}
+    for scan in scans:
+        for path in scan.paths:
+            root_scan_names.setdefault(path, []).append(scan.name)
+    roots = list(root_scan_names.items())
+
+    pending_folders: dict[tuple[str, str], str] = {}
+    next_flush_time: float = 0.0
+
+    def get_block_duration() -> float:
+        """ Block until the next flush while folders are coalescing and indefinitely when idle """
+        if len(pending_folders) > 0:
+            return max(next_flush_time - time.monotonic(), 0.0)
+        return None
+
+    def flush_folders():
+        """ Send the coalesced folders to the coordinator """
+        update_queue.put((
+            "folders",
+            shard_id,
+            [(scan_name, path, filename) for (scan_name, path), filename in pending_folders.items()]
+        ))
+        pending_folders.clear()
+
+    try:
+        inotify_trees = external.PyInotify.inotify.adapters.InotifyTrees(
+            logger=logger,
+            paths=list(root_scan_names),
+            mask=SCANNER_MASK,
+            block_duration_s=get_block_duration
+        )
+        inotify = inotify_trees.inotify
+        scan_filter.apply_to_watch(inotify)
+        update_queue.put(("ready", shard_id, inotify.watch_count))
+
+        # The coordinator stop wakes the blocked watch instead of polling for it
+        Thread(target=_interrupt_on_stop, args=(stop_event, inotify), daemon=True).start()
+
+        next_stats_time = time.monotonic() + STATS_INTERVAL_SECONDS
+        for batch in inotify_trees.event_batch_gen(yield_empty=True):
+            if stop_event.is_set():
+                break
+
+            current_time = time.monotonic()
+            valid_events = scan_filter.filter_events(batch.path, batch.name)
+            if len(valid_events) > 0 and len(pending_folders) == 0:
+                next_flush_time = current_time + coalesce_seconds
+            scan_names: dict[str, list[str]] = {}
+            for path, filename in valid_events:
+                if path not in scan_names:
+                    scan_names[path] = _get_scan_names(roots, path)
+                # The first change of a folder is kept since media servers write their sidecar files after it
+                for scan_name in scan_names[path]:
+                    pending_folders.setdefault((scan_name, path), filename)
+
+            if len(pending_folders) > 0 and current_time >= next_flush_time:
+                flush_folders()
+                next_stats_time = current_time
+
+            if current_time >= next_stats_time:
+                update_queue.put((
+                    "stats",
+                    shard_id,
+                    inotify.event_count,
+                    inotify.epoll_wakeup_count,
+                    inotify.watch_count,
+                    inotify_trees.synthetic_event_count
+                ))
+                next_stats_time = current_time + STATS_INTERVAL_SECONDS
+
+        # Send the folders still coalescing so a restart by a reload does not lose them
+        if len(pending_folders) > 0:
+            flush_folders()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        update_queue.put(("error", shard_id, str(e)))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import service.device_map
+from service.device_map import DeviceMap, read_mounts
+
+_MOUNTINFO = (
+    '22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw\n'
+    '30 22 8:17 / /mnt/disk1 rw,relatime shared:2 - xfs /dev/sdb1 rw\n'
+    '31 22 8:33 / /mnt/disk1/Movies\\040HD rw,relatime shared:3 - xfs /dev/sdc1 rw\n'
+    '32 22 0:45 / /mnt/disk1 rw,relatime shared:4 - fuse.mergerfs pool rw\n'
+    'partly written line\n'
+)
+
+
+class TestDeviceMap(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.mountinfo_path = os.path.join(self.temp_dir.name, 'mountinfo')
+        with open(self.mountinfo_path, 'w', encoding='utf-8') as mountinfo_file:
+            mountinfo_file.write(_MOUNTINFO)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __make_block(self, name, stat=None, rotational=None, parent=None):
+        block_path = os.path.join(self.temp_dir.name, 'devices', parent or '', name)
+        os.makedirs(os.path.join(block_path, 'queue'))
+        if parent is not None:
+            open(os.path.join(block_path, 'partition'), 'w').close()
+        if stat is not None:
+            with open(os.path.join(block_path, 'stat'), 'w', encoding='utf-8') as stat_file:
+                stat_file.write(stat)
+        if rotational is not None:
+            with open(os.path.join(block_path, 'queue', 'rotational'), 'w', encoding='utf-8') as rotational_file:
+                rotational_file.write(rotational)
+        return block_path
+
+    def test__read_mounts_orders_the_longest_mount_first(self):
+        mounts = read_mounts(self.mountinfo_path)
+
+        self.assertEqual([(m.mount_point, os.major(m.device), os.minor(m.device)) for m in mounts], [
+            ('/mnt/disk1/Movies HD', 8, 33),
+            ('/mnt/disk1', 0, 45),
+            ('/mnt/disk1', 8, 17),
+            ('/', 8, 1),
+        ])
+
+    def test__folders_are_grouped_by_mount(self):
+        device_map = DeviceMap(self.mountinfo_path)
+
+        groups = device_map.group_paths([
+            '/mnt/disk1/TV', '/mnt/disk1/Movies HD/Film', '/mnt/disk10/TV', '/mnt/disk1'])
+        self.assertEqual(
+            {(os.major(device), os.minor(device)): paths for device, paths in groups.items()},
+            {
+                (0, 45): ['/mnt/disk1/TV', '/mnt/disk1'],
+                (8, 33): ['/mnt/disk1/Movies HD/Film'],
+                (8, 1): ['/mnt/disk10/TV'],
+            })
+
+    def test__missing_mountinfo_falls_back_to_stat(self):
+        device_map = DeviceMap(os.path.join(self.temp_dir.name, 'missing'))
+
+        self.assertEqual(device_map.mounts, [])
+        self.assertEqual(device_map.get_device(self.temp_dir.name), os.stat(self.temp_dir.name).st_dev)
+        self.assertEqual(device_map.get_device(os.path.join(self.temp_dir.name, 'missing')), 0)
+
+    def test__disk_and_counters_are_read_from_sysfs(self):
+        disk_path = self.__make_block('sdb', stat='  120 0 960 30  45 0 360 20 0 50 50\n', rotational='1\n')
+        partition_path = self.__make_block('sdb1', parent='sdb')
+        dev_block_path = os.path.join(self.temp_dir.name, 'dev_block')
+        os.mkdir(dev_block_path)
+        os.symlink(partition_path, os.path.join(dev_block_path, '8:17'))
+        os.symlink(disk_path, os.path.join(dev_block_path, '8:16'))
+
+        device_map = DeviceMap(self.mountinfo_path)
+        with mock.patch.object(service.device_map, 'SYS_DEV_BLOCK_PATH', dev_block_path), \
+             mock.patch.object(service.device_map, 'SYS_BLOCK_PATH', os.path.join(self.temp_dir.name, 'devices')):
+            self.assertEqual(device_map.get_disk(os.makedev(8, 17)), 'sdb')
+            self.assertEqual(device_map.get_disk(os.makedev(8, 16)), 'sdb')
+            self.assertIsNone(device_map.get_disk(os.makedev(0, 45)))
+            self.assertTrue(device_map.get_rotational('sdb'))
+            self.assertEqual(device_map.get_io_count('sdb'), 165)
+            self.assertFalse(device_map.get_rotational('sdz'))
+            self.assertEqual(device_map.get_io_count('sdz'), -1)
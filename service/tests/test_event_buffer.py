@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import unittest
+
+from service.event_buffer import EventBuffer
+from service.scan_filter import ScanFilter
+
+
+class TestEventBuffer(unittest.TestCase):
+    def setUp(self):
+        self.event_buffer = EventBuffer(4, ScanFilter(['/.grab/'], ['.mkv']))
+
+    def test__batches_are_returned_in_order(self):
+        self.event_buffer.put('Movies', ['/m/A', '/m/A'], ['a.mkv', 'a.nfo'])
+        self.event_buffer.put('TV', ['/t/S'], ['e.mkv'])
+        self.event_buffer.put('TV', [], [])
+
+        self.assertEqual(self.event_buffer.get(), [
+            ('Movies', ['/m/A', '/m/A'], ['a.mkv', 'a.nfo']),
+            ('TV', ['/t/S'], ['e.mkv']),
+        ])
+        self.assertEqual(self.event_buffer.event_count, 0)
+        self.assertEqual(self.event_buffer.high_water_mark, 3)
+
+    def test__overflow_is_filtered_and_coalesced_per_folder(self):
+        self.event_buffer.put('Movies', ['/m/A', '/m/B', '/m/C'], ['a.mkv', 'b.mkv', 'c.mkv'])
+        self.event_buffer.put(
+            'Movies',
+            ['/m/D', '/m/D', '/m/E', '/m/.grab/F', '/m/G'],
+            ['first.mkv', 'second.mkv', 'e.mkv', 'f.mkv', 'g.nfo'])
+
+        self.assertEqual(self.event_buffer.coalesced_count, 5)
+        self.assertEqual(self.event_buffer.get(), [
+            ('Movies', ['/m/A', '/m/B', '/m/C'], ['a.mkv', 'b.mkv', 'c.mkv']),
+            ('Movies', ['/m/D', '/m/E'], ['first.mkv', 'e.mkv']),
+        ])
+
+    def test__close_returns_none_once_empty(self):
+        self.event_buffer.put('Movies', ['/m/A'], ['a.mkv'])
+        self.event_buffer.close()
+
+        self.assertEqual(self.event_buffer.get(), [('Movies', ['/m/A'], ['a.mkv'])])
+        self.assertIsNone(self.event_buffer.get())
+
+    def test__get_waits_for_a_batch(self):
+        batches = []
+        thread = threading.Thread(target=lambda: batches.append(self.event_buffer.get()))
+        thread.start()
+
+        self.event_buffer.put('Movies', ['/m/A'], ['a.mkv'])
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(batches, [[('Movies', ['/m/A'], ['a.mkv'])]])
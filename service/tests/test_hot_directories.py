@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from service.hot_directories import HotDirectoryTracker
+
+
+class TestHotDirectoryTracker(unittest.TestCase):
+    def test__counts_folders_within_capacity(self):
+        tracker = HotDirectoryTracker(3)
+        self.assertEqual(tracker.add('/m/A'), 1)
+        self.assertEqual(tracker.add('/m/A', 4), 5)
+        self.assertEqual(tracker.add('/m/B', 2), 2)
+
+        self.assertEqual([(h.path, h.count, h.error) for h in tracker.get_top(5)],
+                         [('/m/A', 5, 0), ('/m/B', 2, 0)])
+        self.assertEqual(tracker.total_count, 7)
+
+    def test__new_folder_replaces_the_lowest_count(self):
+        tracker = HotDirectoryTracker(2)
+        tracker.add('/m/A', 10)
+        tracker.add('/m/B', 3)
+
+        # The new folder inherits the evicted count as its error
+        self.assertEqual(tracker.add('/m/C', 1), 1)
+        self.assertEqual(sorted(tracker.counters), ['/m/A', '/m/C'])
+        self.assertEqual((tracker.counters['/m/C'].count, tracker.counters['/m/C'].error), (4, 3))
+
+    def test__heavy_hitter_survives_a_storm_of_folders(self):
+        tracker = HotDirectoryTracker(4)
+        for index in range(1000):
+            tracker.add('/m/hot')
+            tracker.add(f'/m/cold/{index}')
+
+        self.assertEqual(len(tracker.counters), 4)
+        self.assertEqual(tracker.get_top(1)[0].path, '/m/hot')
+        self.assertGreaterEqual(tracker.counters['/m/hot'].count, 1000)
+        self.assertLessEqual(tracker.add('/m/hot', 0), 1000)
+
+    def test__reset_starts_a_new_window(self):
+        tracker = HotDirectoryTracker(0)
+        tracker.add('/m/A', 5)
+        tracker.reset()
+
+        self.assertEqual(tracker.capacity, 1)
+        self.assertEqual(tracker.get_top(1), [])
+        self.assertEqual(tracker.total_count, 0)
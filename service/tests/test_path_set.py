@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from service.path_set import PathSet
+
+
+class TestPathSet(unittest.TestCase):
+    def test__folders_below_a_folder_are_covered(self):
+        paths = PathSet(0, ['/m'], ['/m/Show/Season 01', '/m/Show'])
+        self.assertFalse(paths.add('/m/Show/Season 02'))
+        self.assertTrue(paths.add('/m/Show 2'))
+
+        self.assertEqual(list(paths), ['/m/Show/Season 01', '/m/Show', '/m/Show 2'])
+        self.assertIn('/m/Show/Season 02', paths)
+        self.assertNotIn('/m/Film', paths)
+
+    def test__deepest_folders_collapse_to_their_parents(self):
+        paths = PathSet(6, ['/m'])
+        for path in ['/m/A/1', '/m/A/2', '/m/A/3', '/m/B/1', '/m/B/2', '/m/B/3', '/m/C']:
+            paths.add(path)
+
+        self.assertEqual(list(paths), ['/m/A', '/m/B', '/m/C'])
+        self.assertFalse(paths.whole_library)
+        self.assertIn('/m/A/3', paths)
+
+    def test__collapse_to_the_scan_paths_switches_to_the_whole_library(self):
+        paths = PathSet(2, ['/m', '/n'])
+        for path in ['/m/A', '/m/B', '/n/C']:
+            paths.add(path)
+
+        self.assertTrue(paths.whole_library)
+        self.assertEqual(list(paths), ['/m', '/n'])
+        self.assertFalse(paths.add('/m/D'))
+        self.assertEqual(len(paths), 2)
+
+    def test__size_stays_bounded(self):
+        paths = PathSet(10, ['/m'])
+        for show in range(50):
+            for season in range(5):
+                paths.add(f'/m/Show {show}/Season {season}')
+                self.assertLessEqual(len(paths), 10)
+
+    def test__update_merges_scan_paths_and_whole_library(self):
+        paths = PathSet(0, ['/m'], ['/m/A'])
+        paths.update(PathSet(0, ['/m'], ['/m/B']))
+        self.assertEqual(list(paths), ['/m/A', '/m/B'])
+
+        whole_library = PathSet(1, ['/n'], ['/n/A', '/n/B'])
+        paths.update(whole_library)
+        self.assertTrue(paths.whole_library)
+        self.assertEqual(list(paths), ['/m', '/n'])
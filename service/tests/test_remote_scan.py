@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from api.api_base import SCAN_FAILED, SCAN_REJECTED
+from benchmarks.replay_trace import ReplayApiManager, ReplayClock
+from common.log_manager import LogManager
+from service.remote_scan import Remotescan
+from service.scan_journal import read_journal
+
+
+def _wait_for(condition, timeout=5.0):
+    """ Wait for a condition set by the service threads """
+    end_time = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= end_time:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _make_scan(name: str, path: str, **servers) -> dict:
+    """ Make a scan configuration notifying the (server name, library) pairs of each server type """
+    scan = {'name': name, 'paths': [{'container_path': path}]}
+    for server_type, libraries in servers.items():
+        scan[server_type] = [{'server_name': server_name, 'library': library} for server_name, library in libraries]
+    return scan
+
+
+def _make_config(scans: list[dict], **settings) -> dict:
+    config = {
+        'scans': scans,
+        'ignore_folders': [],
+        'valid_file_extensions': 'mkv',
+    }
+    config.update(settings)
+    return config
+
+
+class TestRemotescanBase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.movies_path = os.path.join(self.temp_dir.name, 'Movies')
+        os.mkdir(self.movies_path)
+        self.clock = ReplayClock()
+        self.api_manager = ReplayApiManager(self.clock)
+        self.log_manager = LogManager('test', os.path.join(self.temp_dir.name, 'test.log'))
+        self.remote_scan = None
+
+    def tearDown(self):
+        if self.remote_scan is not None:
+            self.remote_scan.shutdown()
+            if self.remote_scan.monitor_thread is not None:
+                self.remote_scan.monitor_thread.join()
+        self.temp_dir.cleanup()
+
+    def _create_remote_scan(self, scans=None, **settings) -> Remotescan:
+        if scans is None:
+            scans = [_make_scan('Movies', self.movies_path, plex=[('Plex', 'Movies')])]
+        self.remote_scan = Remotescan(self.api_manager, _make_config(scans, **settings), self.log_manager)
+        self.remote_scan.clock = self.clock.get_time
+        return self.remote_scan
+
+    def _add_event(self, scan_index: int, folder: str, filename='a.mkv'):
+        scan_config = self.remote_scan.scan_configs[scan_index]
+        self.remote_scan.process_events(scan_config, [os.path.join(scan_config.paths[0], folder)], [filename])
+
+    def _run_monitors(self, seconds: float, step=5.0):
+        """ Advance the clock running a monitor pass every step """
+        end_time = self.clock.now + seconds
+        while self.clock.now < end_time:
+            self.clock.now += step
+            self.remote_scan.process_monitors()
+
+    def _get_scan_requests(self, server_type='plex', server_name='Plex'):
+        api = self.api_manager.apis.get((server_type, server_name))
+        return [] if api is None else api.scan_requests
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is only available on linux')
+class TestHotDirectoryQuarantine(TestRemotescanBase):
+    def test__files_added_during_the_quarantine_are_notified_on_release(self):
+        remote_scan = self._create_remote_scan(
+            seconds_hot_directory_window=20,
+            hot_directory_quarantine_events=5,
+            seconds_hot_directory_quarantine=30,
+            seconds_before_notify=30)
+        hot_path = os.path.join(self.movies_path, 'incomplete')
+        os.mkdir(hot_path)
+        remote_scan.init_scheduler_jobs()
+        self.assertTrue(_wait_for(lambda: 'Movies' in remote_scan.inotify_trees))
+        watches = remote_scan.inotify_trees['Movies'].inotify
+
+        for _ in range(10):
+            open(os.path.join(hot_path, 'part.mkv'), 'w', encoding='utf-8').close()
+            time.sleep(0.02)
+        self.assertTrue(_wait_for(lambda: watches.watch_count == 1))
+
+        # Nothing else changes in the library so only the release can report the new file
+        open(os.path.join(hot_path, 'new.mkv'), 'w', encoding='utf-8').close()
+
+        # The storm ends with the window so the released entries do not quarantine the folder again
+        self.clock.now = 25.0
+        self.assertTrue(_wait_for(lambda: remote_scan.hot_directories.total_count == 0))
+        self.clock.now = 40.0
+        self.assertTrue(_wait_for(lambda: len(self._get_scan_requests()) == 1))
+        self.assertTrue(_wait_for(lambda: len(remote_scan.monitors) == 1))
+        self.assertEqual(watches.watch_count, 2)
+
+        self.clock.now = 80.0
+        self.assertTrue(_wait_for(lambda: len(self._get_scan_requests()) == 2))
+        self.assertEqual(self._get_scan_requests(), [(40.0, 'Movies'), (80.0, 'Movies')])
+
+
+class TestNotifyRetry(TestRemotescanBase):
+    def setUp(self):
+        super().setUp()
+        self.clock.now = 1000.0
+        self.scan_result = None
+        self.scan_results = []
+
+    def __fail_scans(self, api, result):
+        """ Make every scan request of the stub API answer with the result until it is cleared """
+        self.scan_result = result
+        record_scan = api.set_library_scan
+
+        def set_library_scan(library, *args):
+            self.scan_results.append((self.clock.now, library))
+            if self.scan_result is not None:
+                return self.scan_result
+            return record_scan(library, *args)
+        api.set_library_scan = set_library_scan
+
+    def test__failed_notify_is_retried_after_the_backoff(self):
+        remote_scan = self._create_remote_scan(seconds_retry_min=30, seconds_retry_max=120)
+        api = self.api_manager.get_plex_api('Plex')
+        self.__fail_scans(api, SCAN_FAILED)
+        self._add_event(0, 'A')
+
+        self._run_monitors(3600)
+        retry_times = [scan_time for scan_time, _library in self.scan_results]
+        self.assertGreater(len(retry_times), 20)
+        waits = [end - start for start, end in zip(retry_times, retry_times[1:])]
+        self.assertGreaterEqual(min(waits[:2]), 15)
+        self.assertLessEqual(max(waits), 125)
+        self.assertIn(('plex', 'Plex', 'Movies'), remote_scan.ready_targets)
+
+        # Without a retry limit the changes are sent once the media server is back
+        self.scan_result = None
+        self._run_monitors(200)
+        self.assertEqual(len(self._get_scan_requests()), 1)
+        self.assertEqual(remote_scan.ready_targets, {})
+        self.assertEqual(remote_scan.server_retries, {})
+
+    def test__target_is_dropped_after_the_retry_limit(self):
+        journal_path = os.path.join(self.temp_dir.name, 'journal')
+        remote_scan = self._create_remote_scan(notify_retry_limit=2, journal_path=journal_path)
+        self.__fail_scans(self.api_manager.get_plex_api('Plex'), SCAN_FAILED)
+        self._add_event(0, 'A')
+
+        self._run_monitors(3600)
+        self.assertEqual(len(self.scan_results), 3)
+        self.assertEqual(remote_scan.ready_targets, {})
+
+        remote_scan.journal.sync()
+        self.assertEqual(read_journal(journal_path), ([], []))
+
+    def test__rejected_notify_is_dropped_at_once(self):
+        remote_scan = self._create_remote_scan()
+        self.__fail_scans(self.api_manager.get_plex_api('Plex'), SCAN_REJECTED)
+        self._add_event(0, 'A')
+
+        self._run_monitors(3600)
+        self.assertEqual(len(self.scan_results), 1)
+        self.assertEqual(remote_scan.ready_targets, {})
+
+
+class TestNotifyLimits(TestRemotescanBase):
+    def setUp(self):
+        super().setUp()
+        self.clock.now = 1000.0
+        self.tv_path = os.path.join(self.temp_dir.name, 'TV')
+        os.mkdir(self.tv_path)
+
+    def test__servers_are_limited_on_their_own(self):
+        self._create_remote_scan(
+            [
+                _make_scan('Movies', self.movies_path, plex=[('Plex', 'Movies')], emby=[('Emby', 'Movies')]),
+                _make_scan('TV', self.tv_path, plex=[('Plex', 'TV')]),
+            ],
+            seconds_before_notify=30,
+            seconds_between_notifies=60)
+        self._add_event(0, 'A')
+        self._add_event(1, 'Show')
+
+        self._run_monitors(200)
+        plex_requests = self._get_scan_requests()
+        emby_requests = self._get_scan_requests('emby', 'Emby')
+        self.assertEqual(sorted(library for _time, library in plex_requests), ['Movies', 'TV'])
+        self.assertEqual(plex_requests[0][0], 1030.0)
+        self.assertGreaterEqual(plex_requests[1][0] - plex_requests[0][0], 60)
+
+        # A busy Plex does not delay Emby
+        self.assertEqual(emby_requests, [(1030.0, 'Movies')])
+
+    def test__library_waits_between_its_own_notifies(self):
+        self._create_remote_scan(
+            seconds_before_notify=30, seconds_between_notifies=10, seconds_between_library_notifies=300)
+        self._add_event(0, 'A')
+        self._run_monitors(40)
+        self._add_event(0, 'B')
+
+        self._run_monitors(400)
+        self.assertEqual(self._get_scan_requests(), [(1030.0, 'Movies'), (1330.0, 'Movies')])
+
+    def test__burst_sends_back_to_back_notifies(self):
+        self._create_remote_scan(
+            [
+                _make_scan('Movies', self.movies_path, plex=[('Plex', 'Movies')]),
+                _make_scan('TV', self.tv_path, plex=[('Plex', 'TV')]),
+            ],
+            seconds_before_notify=30,
+            seconds_between_notifies=60,
+            notify_burst=2)
+        self._add_event(0, 'A')
+        self._add_event(1, 'Show')
+
+        self._run_monitors(200)
+        self.assertEqual([scan_time for scan_time, _library in self._get_scan_requests()], [1030.0, 1030.0])
+
+
+class TestScanInProgress(TestRemotescanBase):
+    def setUp(self):
+        super().setUp()
+        self.clock.now = 1000.0
+        self.scanning = True
+        self.scan_checks = []
+
+    def __get_library_scan_in_progress(self, library_name):
+        self.scan_checks.append((self.clock.now, library_name))
+        return self.scanning
+
+    def test__one_follow_up_is_sent_once_the_running_scan_finishes(self):
+        self._create_remote_scan(seconds_before_notify=30, seconds_between_scan_checks=60)
+        self.api_manager.get_plex_api('Plex').get_library_scan_in_progress = self.__get_library_scan_in_progress
+        self._add_event(0, 'A')
+        self._run_monitors(50)
+        self._add_event(0, 'B')
+
+        self._run_monitors(150)
+        self.assertEqual(self._get_scan_requests(), [])
+        self.assertEqual([check_time for check_time, _library in self.scan_checks], [1030.0, 1090.0, 1150.0])
+
+        # The changes of both monitors wait in the single follow-up
+        target = self.remote_scan.ready_targets[('plex', 'Plex', 'Movies')]
+        self.assertTrue(target.scan_in_progress)
+        self.assertEqual(sorted(target.paths), [os.path.join(self.movies_path, 'A'), os.path.join(self.movies_path, 'B')])
+
+        self.scanning = False
+        self._run_monitors(200)
+        self.assertEqual(self._get_scan_requests(), [(1210.0, 'Movies')])
+        self.assertEqual(self.remote_scan.ready_targets, {})
+
+
+class TestTargetDeduplication(TestRemotescanBase):
+    def setUp(self):
+        super().setUp()
+        self.clock.now = 1000.0
+        self.uhd_path = os.path.join(self.temp_dir.name, 'Movies 4K')
+        os.mkdir(self.uhd_path)
+
+    def __create_remote_scan(self):
+        self._create_remote_scan(
+            [
+                _make_scan('Movies', self.movies_path, plex=[('Plex', 'Movies')]),
+                _make_scan('Movies 4K', self.uhd_path, plex=[('Plex', 'Movies')], emby=[('Emby', 'Movies 4K')]),
+            ],
+            seconds_before_notify=30)
+
+    def test__library_fed_by_several_scans_is_notified_once(self):
+        self.__create_remote_scan()
+        self._add_event(0, 'A')
+        self._run_monitors(20)
+        self._add_event(1, 'A')
+
+        self._run_monitors(200)
+        self.assertEqual(self._get_scan_requests(), [(1050.0, 'Movies')])
+        self.assertEqual(self._get_scan_requests('emby', 'Emby'), [(1050.0, 'Movies 4K')])
+
+    def test__busy_scan_does_not_hold_the_library_back(self):
+        self.__create_remote_scan()
+        self._add_event(0, 'A')
+        for _ in range(10):
+            self._run_monitors(10)
+            self._add_event(1, 'A')
+
+        # The library waits for the busy scan at most seconds_before_notify once it is ready
+        self.assertEqual(self._get_scan_requests(), [(1060.0, 'Movies')])
+        self.assertEqual(self._get_scan_requests('emby', 'Emby'), [])
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is only available on linux')
+class TestReload(TestRemotescanBase):
+    def setUp(self):
+        super().setUp()
+        self.clock.now = 1000.0
+        self.tv_path = os.path.join(self.temp_dir.name, 'TV')
+        self.music_path = os.path.join(self.temp_dir.name, 'Music')
+        os.mkdir(self.tv_path)
+        os.mkdir(self.music_path)
+
+    def test__pending_monitors_of_kept_scans_survive_a_reload(self):
+        remote_scan = self._create_remote_scan(
+            [
+                _make_scan('Movies', self.movies_path, plex=[('Plex', 'Movies')]),
+                _make_scan('TV', self.tv_path, plex=[('Plex', 'TV')]),
+            ],
+            seconds_before_notify=30)
+        movies_scan = remote_scan.scan_configs[0]
+        self._add_event(0, 'A')
+        self._add_event(1, 'Show')
+
+        remote_scan.reload({'remote_scan': _make_config(
+            [
+                _make_scan('Movies', self.movies_path, plex=[('Plex', 'Movies')], emby=[('Emby', 'Movies')]),
+                _make_scan('Music', self.music_path, plex=[('Plex', 'Music')]),
+            ],
+            seconds_before_notify=30)})
+
+        # The unchanged scan keeps its configuration and only the added scan is watched
+        self.assertIs(remote_scan.scan_configs[0], movies_scan)
+        self.assertEqual([monitor.name for monitor in remote_scan.monitors], ['Movies'])
+        self.assertTrue(_wait_for(lambda: sorted(remote_scan.inotify_trees) == ['Music']))
+
+        self._run_monitors(100)
+        self.assertEqual(self._get_scan_requests(), [(1030.0, 'Movies')])
+        self.assertEqual(self._get_scan_requests('emby', 'Emby'), [(1030.0, 'Movies')])
+
+    def test__reload_with_a_wrong_setting_keeps_the_current_settings(self):
+        remote_scan = self._create_remote_scan(seconds_before_notify=30)
+        self._add_event(0, 'A')
+
+        with self.assertRaises(TypeError):
+            remote_scan.reload({'remote_scan': _make_config(
+                [_make_scan('Movies', self.movies_path, plex=[('Plex', 'Movies')])],
+                seconds_before_notify=60,
+                notify_burst='2')})
+
+        self.assertEqual((remote_scan.seconds_before_notify, remote_scan.notify_burst), (30, 1))
+        self._run_monitors(100)
+        self.assertEqual(self._get_scan_requests(), [(1030.0, 'Movies')])
+
+
+class TestShutdownJournal(TestRemotescanBase):
+    def setUp(self):
+        super().setUp()
+        self.clock.now = 1000.0
+        self.tv_path = os.path.join(self.temp_dir.name, 'TV')
+        os.mkdir(self.tv_path)
+        self.journal_path = os.path.join(self.temp_dir.name, 'journal')
+        self.scans = [
+            _make_scan('Movies', self.movies_path, plex=[('Plex', 'Movies')]),
+            _make_scan('TV', self.tv_path, emby=[('Emby', 'TV')]),
+        ]
+
+    def test__shutdown_drains_due_monitors_and_journals_the_rest(self):
+        remote_scan = self._create_remote_scan(
+            self.scans, seconds_before_notify=60, seconds_shutdown_drain=30, journal_path=self.journal_path)
+        self._add_event(0, 'A')
+        self.clock.now = 1035.0
+        self._add_event(1, 'Show')
+        self.clock.now = 1040.0
+
+        remote_scan.shutdown()
+        self.remote_scan = None
+        self.assertEqual(self._get_scan_requests(), [(1040.0, 'Movies')])
+        self.assertEqual(self._get_scan_requests('emby', 'Emby'), [])
+        monitors, targets = read_journal(self.journal_path)
+        self.assertEqual([(m.scan_name, m.start_time, m.paths) for m in monitors],
+                         [('TV', 1035.0, [os.path.join(self.tv_path, 'Show')])])
+        self.assertEqual(targets, [])
+
+        # The next start restores the monitor that was still waiting
+        remote_scan = self._create_remote_scan(self.scans, seconds_before_notify=60, journal_path=self.journal_path)
+        self.assertEqual([(m.name, m.start_time, list(m.paths)) for m in remote_scan.monitors],
+                         [('TV', 1035.0, [os.path.join(self.tv_path, 'Show')])])
+
+    def test__ready_targets_are_restored_from_the_journal(self):
+        remote_scan = self._create_remote_scan(self.scans, seconds_before_notify=30, journal_path=self.journal_path)
+        self.api_manager.get_plex_api('Plex').get_library_scan_in_progress = lambda _library_name: True
+        self._add_event(0, 'A')
+        self._run_monitors(40)
+        self.assertIn(('plex', 'Plex', 'Movies'), remote_scan.ready_targets)
+
+        remote_scan.shutdown()
+        self.remote_scan = None
+        remote_scan = self._create_remote_scan(self.scans, seconds_before_notify=30, journal_path=self.journal_path)
+        target = remote_scan.ready_targets[('plex', 'Plex', 'Movies')]
+        self.assertEqual((target.scan_name, target.start_time, list(target.paths)),
+                         ('Movies', 1000.0, [os.path.join(self.movies_path, 'A')]))
+
+
+class TestNotifyOutsideLock(TestRemotescanBase):
+    def test__events_are_added_while_a_media_server_is_slow(self):
+        remote_scan = self._create_remote_scan(seconds_before_notify=30)
+        api = self.api_manager.get_plex_api('Plex')
+        record_scan = api.set_library_scan
+        server_answer = threading.Event()
+
+        def set_library_scan(library, *args):
+            server_answer.wait(timeout=5)
+            return record_scan(library, *args)
+        api.set_library_scan = set_library_scan
+        remote_scan.notifier.start()
+        self._add_event(0, 'A')
+        self._run_monitors(40)
+        self.assertTrue(_wait_for(lambda: remote_scan.notifier.get_pending_count() == 1))
+
+        # The notify holds neither the monitor lock nor the event intake
+        self.assertTrue(remote_scan.monitor_lock.acquire(timeout=1))
+        remote_scan.monitor_lock.release()
+        self._add_event(0, 'B')
+        self.assertEqual([list(monitor.paths) for monitor in remote_scan.monitors], [[os.path.join(self.movies_path, 'B')]])
+
+        server_answer.set()
+        self.assertTrue(_wait_for(lambda: len(self._get_scan_requests()) == 1))
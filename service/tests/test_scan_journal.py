@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from service.scan_journal import ScanJournal, read_journal
+
+
+class TestScanJournal(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.temp_dir.name, 'journal')
+        self.journal = ScanJournal(self.journal_path)
+
+    def tearDown(self):
+        self.journal.close()
+        self.temp_dir.cleanup()
+
+    def test__records_are_written_on_sync(self):
+        self.journal.record_monitor('Movies', '/media/Movies/A', 10.0)
+
+        self.assertEqual(read_journal(self.journal_path), ([], []))
+
+        self.journal.sync()
+        monitors, targets = read_journal(self.journal_path)
+        self.assertEqual([(m.scan_name, m.start_time, m.paths) for m in monitors],
+                         [('Movies', 10.0, ['/media/Movies/A'])])
+        self.assertEqual(targets, [])
+
+    def test__replay_keeps_only_pending_work(self):
+        key = ('plex', 'Plex', 'Movies')
+        self.journal.record_monitor('Movies', '/media/Movies/A', 10.0)
+        self.journal.record_monitor('Movies', '/media/Movies/A', 11.0)
+        self.journal.record_monitor_done('Movies')
+        self.journal.record_monitor('Movies', '/media/Movies/B', 20.0)
+        self.journal.record_target(key, 'Movies', '/media/Movies/A', 10.0)
+        self.journal.record_target(key, 'Movies', '/media/Movies/A', 10.0)
+        self.journal.record_target(('emby', 'Emby', 'Movies'), 'Movies', '/media/Movies/A', 10.0)
+        self.journal.record_target_done(('emby', 'Emby', 'Movies'))
+        self.journal.record_target(key, 'Movies', '/media/Movies/C', 5.0)
+        self.journal.sync()
+
+        monitors, targets = read_journal(self.journal_path)
+        self.assertEqual([(m.scan_name, m.start_time, m.paths) for m in monitors],
+                         [('Movies', 20.0, ['/media/Movies/B'])])
+        self.assertEqual(
+            [(t.server_type, t.server_name, t.library, t.start_time, t.paths) for t in targets],
+            [('plex', 'Plex', 'Movies', 5.0, ['/media/Movies/A', '/media/Movies/C'])])
+
+    def test__reset_truncates_the_journal(self):
+        self.journal.record_monitor('Movies', '/media/Movies/A', 10.0)
+        self.journal.sync()
+        self.journal.record_monitor('Movies', '/media/Movies/B', 11.0)
+        self.journal.reset()
+        self.journal.sync()
+
+        self.assertEqual(os.path.getsize(self.journal_path), 0)
+        self.assertEqual(read_journal(self.journal_path), ([], []))
+
+        # Records after a reset start a new journal
+        self.journal.record_monitor('TV', '/media/TV/Show', 12.0)
+        self.journal.sync()
+        monitors, _targets = read_journal(self.journal_path)
+        self.assertEqual([m.paths for m in monitors], [['/media/TV/Show']])
+
+    def test__partly_written_last_line_is_ignored(self):
+        self.journal.record_monitor('Movies', '/media/Movies/A', 10.0)
+        self.journal.sync()
+        with open(self.journal_path, 'a', encoding='utf-8') as journal_file:
+            journal_file.write('{"op": "monitor", "scan": "Movies", "pa')
+
+        monitors, _targets = read_journal(self.journal_path)
+        self.assertEqual([m.paths for m in monitors], [['/media/Movies/A']])
+
+    def test__missing_journal_has_no_work(self):
+        self.assertEqual(read_journal(os.path.join(self.temp_dir.name, 'missing')), ([], []))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+import unittest
+
+from service.scan_notifier import ScanNotifier
+
+
+class TestScanNotifier(unittest.TestCase):
+    def setUp(self):
+        self.jobs = []
+        self.slow_release = threading.Event()
+        self.notifier = ScanNotifier(self.__notify)
+
+    def tearDown(self):
+        self.slow_release.set()
+        self.notifier.stop()
+
+    def __notify(self, name):
+        if name == 'slow':
+            self.slow_release.wait(timeout=5)
+        self.jobs.append(name)
+
+    def test__jobs_run_inline_until_started(self):
+        self.assertTrue(self.notifier.submit(('plex', 'Plex'), 'first'))
+
+        self.assertEqual(self.jobs, ['first'])
+        self.assertEqual(self.notifier.workers, {})
+
+    def test__slow_server_does_not_delay_other_servers(self):
+        self.notifier.start()
+        self.notifier.submit(('plex', 'Plex'), 'slow')
+        self.notifier.submit(('plex', 'Plex'), 'queued')
+        self.notifier.submit(('emby', 'Emby'), 'fast')
+
+        self.assertTrue(self.__wait_for_job('fast'))
+        self.assertEqual(self.notifier.get_pending_count(), 2)
+
+        # The jobs of one server still run in order
+        self.slow_release.set()
+        self.notifier.stop()
+        self.assertEqual(self.jobs, ['fast', 'slow', 'queued'])
+        self.assertEqual(self.notifier.get_pending_count(), 0)
+
+    def test__jobs_are_refused_once_stopped(self):
+        self.notifier.start()
+        self.notifier.submit(('plex', 'Plex'), 'first')
+        self.notifier.stop()
+
+        self.assertFalse(self.notifier.submit(('plex', 'Plex'), 'second'))
+        self.assertEqual(self.jobs, ['first'])
+
+    def __wait_for_job(self, name):
+        for _ in range(100):
+            if name in self.jobs:
+                return True
+            time.sleep(0.05)
+        return False
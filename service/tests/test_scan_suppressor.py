@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from service.scan_suppressor import ScanSuppressor
+
+
+class TestScanSuppressor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.temp_dir.name, 'Film (2020)')
+        os.mkdir(self.folder)
+        self.__write('film.mkv', 'movie')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __write(self, filename, text):
+        with open(os.path.join(self.folder, filename), 'w', encoding='utf-8') as media_file:
+            media_file.write(text)
+
+    def test__unchanged_file_is_suppressed(self):
+        suppressor = ScanSuppressor(60, [])
+        suppressor.record_notify([self.folder], 100.0)
+
+        self.assertTrue(suppressor.get_suppressed(self.folder, 'film.mkv', 110.0))
+
+    def test__changed_or_new_file_is_not_suppressed(self):
+        suppressor = ScanSuppressor(60, [])
+        suppressor.record_notify([self.folder], 100.0)
+
+        self.__write('film.mkv', 'a longer movie')
+        self.__write('extra.mkv', 'extra')
+
+        self.assertFalse(suppressor.get_suppressed(self.folder, 'film.mkv', 110.0))
+        self.assertFalse(suppressor.get_suppressed(self.folder, 'extra.mkv', 110.0))
+
+    def test__replaced_file_is_not_suppressed(self):
+        suppressor = ScanSuppressor(60, [])
+        suppressor.record_notify([self.folder], 100.0)
+
+        # Same size and name but a new inode
+        replacement = os.path.join(self.temp_dir.name, 'replacement.mkv')
+        with open(replacement, 'w', encoding='utf-8') as media_file:
+            media_file.write('MOVIE')
+        os.replace(replacement, os.path.join(self.folder, 'film.mkv'))
+
+        self.assertFalse(suppressor.get_suppressed(self.folder, 'film.mkv', 110.0))
+
+    def test__sidecar_is_suppressed_in_sub_folders(self):
+        suppressor = ScanSuppressor(60, ['*.nfo', ' *.JPG'])
+        suppressor.record_notify([self.folder], 100.0)
+
+        self.assertTrue(suppressor.get_suppressed(self.folder, 'film.nfo', 110.0))
+        self.assertTrue(suppressor.get_suppressed(os.path.join(self.folder, 'extrafanart'), 'fanart1.jpg', 110.0))
+        self.assertFalse(suppressor.get_suppressed(self.temp_dir.name, 'other.nfo', 110.0))
+
+    def test__suppression_expires(self):
+        suppressor = ScanSuppressor(60, ['*.nfo'])
+        suppressor.record_notify([self.folder], 100.0)
+
+        self.assertFalse(suppressor.get_suppressed(self.folder, 'film.mkv', 160.0))
+        self.assertFalse(suppressor.get_suppressed(self.folder, 'film.nfo', 160.0))
+        self.assertEqual(suppressor.folders, {})
+
+    def test__disabled_suppressor_records_nothing(self):
+        suppressor = ScanSuppressor(0, ['*.nfo'])
+        suppressor.record_notify([self.folder], 100.0)
+
+        self.assertFalse(suppressor.get_enabled())
+        self.assertFalse(suppressor.get_suppressed(self.folder, 'film.nfo', 110.0))
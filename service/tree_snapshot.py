@@ -0,0 +1,65 @@
+""" Persisted folders of the watched trees used while a sleeping disk is not walked """
+
+import json
+import os
+import threading
+
+
+class TreeSnapshot:
+    """
+    Folders of each walked scan path and their modification times.
+
+    The snapshot is saved after every walk. When the walk of a sleeping
+    disk is deferred the snapshot stands in for it: once the disk wakes and
+    is walked, every folder missing from the snapshot or with a different
+    modification time is reported as changed, including the changes made
+    while Remotescan was stopped.
+
+    File format, one JSON object:
+        {"trees": {scan path: {folder: modification time in ns, ...}, ...}}
+    """
+
+    def __init__(self, snapshot_path: str):
+        """
+        Initializes the TreeSnapshot and reads the saved snapshot if there is one.
+
+        Args:
+            snapshot_path (str): The file to save the snapshot to.
+        """
+        self.snapshot_path = snapshot_path
+        self.trees: dict[str, dict[str, int]] = {}
+        self.lock = threading.Lock()
+
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding="utf-8") as snapshot_file:
+                self.trees = json.load(snapshot_file)["trees"]
+
+    def get_folders(self, root_path: str) -> dict[str, int]:
+        """
+        Returns the saved folders of a scan path.
+
+        Args:
+            root_path (str): The scan path.
+
+        Returns:
+            dict[str, int]: The modification time of each folder, None if the scan path was never walked.
+        """
+        with self.lock:
+            return self.trees.get(root_path)
+
+    def set_folders(self, root_path: str, folders: dict[str, int]):
+        """
+        Replaces the folders of a scan path and saves the snapshot.
+
+        Args:
+            root_path (str): The scan path.
+            folders (dict[str, int]): The modification time of each folder.
+        """
+        with self.lock:
+            self.trees[root_path] = folders
+
+            # Written to a temporary file first so a crash never leaves a partial snapshot
+            temp_path = f"{self.snapshot_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as snapshot_file:
+                json.dump({"trees": self.trees}, snapshot_file, separators=(",", ":"))
+            os.replace(temp_path, self.snapshot_path)